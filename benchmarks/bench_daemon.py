@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark convert call latency with and without the conversion daemon.
+
+Usage:
+    python benchmarks/bench_daemon.py [--calls 20] [--nodes 10]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+def make_lab(node_count):
+    lines = ["topology:", "  name: bench", "  nodes:"]
+    for i in range(node_count):
+        lines.append(f"    n{i}: {{label: r{i}, node_definition: iosv, x: {i * 100}, y: 0, "
+                     f"configuration: hostname r{i}}}")
+    lines.append("  links:")
+    for i in range(1, node_count):
+        lines.append(f"    l{i}: {{node_a: n{i - 1}, interface_a: GigabitEthernet0/1, "
+                     f"node_b: n{i}, interface_b: GigabitEthernet0/0}}")
+    return "\n".join(lines) + "\n"
+
+
+def time_calls(command, calls, env):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:>6}: median {statistics.median(timings) * 1000:6.0f} ms, "
+          f"p95 {p95 * 1000:6.0f} ms, min {timings[0] * 1000:6.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20, help="Convert calls per mode")
+    parser.add_argument("--nodes", type=int, default=10, help="Nodes in the converted lab")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        lab_file = work_dir / "lab.yaml"
+        lab_file.write_text(make_lab(args.nodes))
+        env = dict(os.environ, NETBRIDGE_DAEMON_SOCKET=str(work_dir / "daemon.sock"))
+        netbridge = [sys.executable, "-m", "netbridge.cli"]
+        convert = netbridge + ["convert", "-i", str(lab_file), "-o", str(work_dir / "out"), "--force"]
+        
+        report("cold", time_calls(convert + ["--no-daemon"], args.calls, env))
+        
+        daemon = subprocess.Popen(netbridge + ["daemon"], env=env, stderr=subprocess.DEVNULL)
+        try:
+            while not (work_dir / "daemon.sock").exists():
+                time.sleep(0.05)
+            report("warm", time_calls(convert, args.calls, env))
+        finally:
+            subprocess.run(netbridge + ["daemon", "--stop"], env=env, stdout=subprocess.DEVNULL)
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark fabric scale-out: expand and render 10,000 node configurations.
+
+Usage:
+    python benchmarks/bench_scale_out.py [--nodes 10000] [--spines 4]
+"""
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from netbridge.parsers.fabric_parser import FabricParser
+
+LEAF_TEMPLATE = """hostname {{ hostname }}
+!
+interface Loopback0
+ ip address 10.255.{{ index // 256 }}.{{ index % 256 }} 255.255.255.255
+!
+{% for interface in interfaces %}
+interface {{ interface.name }}
+ description to {{ interface.peer }} {{ interface.peer_interface }}
+ no shutdown
+!
+{% endfor %}
+router bgp {{ asn + index }}
+{% for interface in interfaces %}
+ neighbor {{ interface.peer }} remote-as {{ spine_asn }}
+{% endfor %}
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=10000, help="Total number of nodes")
+    parser.add_argument("--spines", type=int, default=4, help="Number of spine nodes")
+    args = parser.parse_args()
+    
+    spec = {
+        "fabric": {
+            "name": "bench",
+            "roles": [
+                {
+                    "name": "spine",
+                    "count": args.spines,
+                    "node_definition": "nxosv9000",
+                    "template": "leaf.j2",
+                    "interface_format": "Ethernet1/{port}",
+                    "first_port": 1,
+                    "vars": {"asn": 64512, "spine_asn": 64512},
+                },
+                {
+                    "name": "leaf",
+                    "count": args.nodes - args.spines,
+                    "node_definition": "iosv",
+                    "template": "leaf.j2",
+                    "interface_format": "GigabitEthernet0/{port}",
+                    "vars": {"asn": 65000, "spine_asn": 64512},
+                },
+            ],
+            "links": [{"from": "spine", "to": "leaf", "type": "full-mesh"}],
+        }
+    }
+    
+    with tempfile.TemporaryDirectory() as template_dir:
+        (Path(template_dir) / "leaf.j2").write_text(LEAF_TEMPLATE)
+        
+        start = time.perf_counter()
+        topology = FabricParser(template_dir=template_dir).expand(spec)
+        elapsed = time.perf_counter() - start
+    
+    config_bytes = sum(len(node.configuration) for node in topology.nodes.values())
+    print(f"Rendered {len(topology.nodes)} configs ({config_bytes / 1e6:.1f} MB) "
+          f"and {len(topology.links)} links in {elapsed:.2f}s "
+          f"({len(topology.nodes) / elapsed:,.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,19 @@ import os
 import sys
 import click
 import logging
+import tempfile
 from pathlib import Path
 
-from netbridge.converter import Converter
-from netbridge.utils.config import load_config, DEFAULT_NODE_MAPPINGS
+from netbridge.utils.config import (
+    load_config, DEFAULT_NODE_MAPPINGS, DEFAULT_IMAGE_INDEX, DEFAULT_RESOURCE_STATE, DEFAULT_DAEMON_SOCKET
+)
+from netbridge.utils.compression import COMPRESSIONS
+from netbridge.utils.progress import ProgressReporter, ProgressEvent
+from netbridge.utils.selection import NodeSelection, CUT_MODES
+from netbridge.generators.registry import target_names
+
+# Parsers, generators and clients are imported by the commands using
+# them, so a call forwarded to the conversion daemon never loads them
 
 # Set up logging
 logging.basicConfig(
@@ -45,7 +54,98 @@ def cli(debug):
     "--force/--no-force", default=False,
     help="Overwrite existing output directory"
 )
-def convert(input, output, mapping, force):
+@click.option(
+    "--stream/--no-stream", default=False,
+    help="Use the low-memory streaming parser for CML files"
+)
+@click.option(
+    "--spill-threshold", type=int, default=None,
+    help="With --stream, spill configurations larger than this many characters to disk"
+)
+@click.option(
+    "--image-index", type=click.Path(exists=True),
+    help="Disk image index used to set node images (see index-images)"
+)
+@click.option(
+    "--catalog", type=click.Path(exists=True, file_okay=False),
+    help="Directory of GNS3 appliance files used to map unknown node types"
+)
+@click.option(
+    "--compress", type=click.Choice(COMPRESSIONS), default=None,
+    help="Compress the generated project file and configurations (GNS3 target only)"
+)
+@click.option(
+    "--progress/--no-progress", default=False,
+    help="Report conversion progress on stderr"
+)
+@click.option(
+    "--workers", type=click.IntRange(min=1), default=None,
+    help="Generate nodes and links of large labs in this many worker processes"
+)
+@click.option(
+    "--validate/--no-validate", default=True,
+    help="Check the input and the generated project against the bundled JSON Schemas"
+)
+@click.option(
+    "--select", "select", multiple=True,
+    help="Only convert matching nodes: label:GLOB, id:GLOB, type:GLOB or attr:KEY=GLOB (repeatable)"
+)
+@click.option(
+    "--hops", type=click.IntRange(min=0), default=0,
+    help="With --select, also convert nodes up to this many links away"
+)
+@click.option(
+    "--cut", type=click.Choice(CUT_MODES), default="drop",
+    help="With --select, drop links leaving the selection or end them on Cloud nodes"
+)
+@click.option(
+    "--store", type=click.Path(dir_okay=False),
+    help="Keep the parsed CML lab in this SQLite file instead of memory, reused while the input is unchanged"
+)
+@click.option(
+    "--target", "targets", type=click.Choice(target_names()), multiple=True,
+    help="Output format, repeat to generate several from one parse (one subdirectory each) [default: gns3]"
+)
+@click.option(
+    "--stage-images/--no-stage-images", default=False,
+    help="With --image-index, place the node disk images into the project's images/ directory"
+)
+@click.option(
+    "--image-concurrency", type=click.IntRange(min=1), default=4,
+    help="With --stage-images, number of images placed at the same time"
+)
+@click.option(
+    "--image-bandwidth", type=click.FloatRange(min=0, min_open=True), default=None,
+    help="With --stage-images, limit image copies to this many MB/s in total"
+)
+@click.option(
+    "--bundle/--no-bundle", default=False,
+    help="Convert every document of a multi-document YAML input, --workers of them at a time"
+)
+@click.option(
+    "--allocate-resources/--no-allocate-resources", default=False,
+    help="Give GNS3 nodes console ports and MAC addresses unique across projects converted with the same state"
+)
+@click.option(
+    "--resource-state", type=click.Path(dir_okay=False), default=str(DEFAULT_RESOURCE_STATE),
+    show_default=True, help="With --allocate-resources, console port and MAC address allocation state file"
+)
+@click.option(
+    "--limit", "limits", multiple=True, metavar="NAME=VALUE",
+    help="Reject input crossing a parse limit, repeatable. Names: bytes, depth, aliases, nodes, links, "
+         "config_size, seconds"
+)
+@click.option(
+    "--daemon/--no-daemon", "use_daemon", default=True,
+    help="Forward the conversion to a running conversion daemon (see daemon)"
+)
+@click.option(
+    "--daemon-socket", type=click.Path(dir_okay=False), default=str(DEFAULT_DAEMON_SOCKET),
+    envvar="NETBRIDGE_DAEMON_SOCKET", show_default=True, help="Socket of the conversion daemon"
+)
+def convert(input, output, mapping, force, stream, spill_threshold, image_index, catalog, compress,
+            progress, workers, validate, select, hops, cut, store, targets, stage_images, image_concurrency,
+            image_bandwidth, bundle, allocate_resources, resource_state, limits, use_daemon, daemon_socket):
     """Convert CML/VIRL YAML to GNS3 project."""
     input_path = Path(input)
     output_path = Path(output)
@@ -59,27 +159,709 @@ def convert(input, output, mapping, force):
     if not output_path.exists():
         output_path.mkdir(parents=True)
     
+    options = {
+        "mapping": _absolute(mapping),
+        "stream": stream,
+        "spill_threshold": spill_threshold,
+        "image_index": _absolute(image_index),
+        "catalog": _absolute(catalog),
+        "compress": compress,
+        # Bundle workers convert whole documents instead
+        "workers": None if bundle else workers,
+        "validate": validate,
+        "select": list(select),
+        "hops": hops,
+        "cut": cut,
+        "store": _absolute(store),
+        "targets": list(dict.fromkeys(targets)),
+        "stage_images": stage_images,
+        "image_concurrency": image_concurrency,
+        "image_bandwidth": image_bandwidth,
+        "allocate_resources": allocate_resources,
+        "resource_state": _absolute(resource_state),
+        "limits": list(limits)
+    }
+    
+    # A running daemon has the converter warm. Bundles and worker pools
+    # fork processes, which the daemon's threads must not do.
+    if use_daemon and not bundle and not workers:
+        from netbridge.daemon import request
+        try:
+            reply = request(daemon_socket, "convert", {
+                "input": _absolute(input), "output": _absolute(output), "progress": progress, "converter": options
+            }, on_progress=lambda event: _echo_progress(ProgressEvent(**event)))
+        except (OSError, ValueError) as e:
+            click.echo(f"Error during conversion: {e}")
+            sys.exit(1)
+        if reply is not None:
+            for message in reply["messages"]:
+                click.echo(message)
+            if "error" in reply:
+                click.echo(reply["error"])
+                sys.exit(1)
+            _echo_result(reply["result"], input, output)
+            return
+    
+    try:
+        converter = _build_converter(options, click.echo)
+    except _OptionError as e:
+        click.echo(str(e))
+        sys.exit(1)
+    
+    # Run the conversion
+    try:
+        reporter = ProgressReporter(callback=_echo_progress, interval=1.0) if progress else None
+        if bundle:
+            _convert_bundle(converter, input_path, output_path, workers, reporter)
+            return
+        result = converter.convert(input_path, output_path, progress=reporter)
+        _echo_result(result, input, output)
+    except Exception as e:
+        click.echo(f"Error during conversion: {e}")
+        logger.exception("Conversion error")
+        sys.exit(1)
+
+
+# Lab converted when the daemon starts
+_WARM_UP_LAB = """
+topology:
+  nodes:
+    r1: {label: r1, node_definition: iosv, x: 0, y: 0, configuration: hostname r1}
+    r2: {label: r2, node_definition: iosv, x: 100, y: 0, configuration: hostname r2}
+  links:
+    l1: {node_a: r1, interface_a: GigabitEthernet0/0, node_b: r2, interface_b: GigabitEthernet0/0}
+"""
+
+
+class _OptionError(Exception):
+    """A convert option that cannot be used, with the message to print."""
+
+
+def _absolute(path):
+    """Make a path option absolute, so the daemon resolves it like the caller."""
+    return os.path.abspath(path) if path else path
+
+
+def _build_converter(options, echo):
+    """
+    Build the converter described by the options of the convert command.
+    
+    Args:
+        options (dict): Converter options collected by convert
+        echo (callable): Called with each message to print
+    
+    Returns:
+        Converter: The configured converter
+    
+    Raises:
+        _OptionError: If an option cannot be used
+    """
+    from netbridge.converter import Converter
+    from netbridge.utils.image_index import ImageIndex
+    from netbridge.utils.image_staging import ImageStager
+    from netbridge.utils.resource_allocator import ResourceAllocator
+    from netbridge.utils.appliance_catalog import ApplianceCatalog
+    
     # Load node mappings
-    node_mappings = DEFAULT_NODE_MAPPINGS
-    if mapping:
+    node_mappings = dict(DEFAULT_NODE_MAPPINGS)
+    if options["mapping"]:
         try:
-            custom_mappings = load_config(mapping)
+            custom_mappings = load_config(options["mapping"])
             node_mappings.update(custom_mappings)
+            echo(f"Loaded custom node mappings from {options['mapping']}")
+        except Exception as e:
+            raise _OptionError(f"Error loading custom mappings: {e}")
+    
+    # Load disk image index
+    images = None
+    if options["image_index"]:
+        try:
+            images = ImageIndex(options["image_index"])
+            echo(f"Loaded {len(images)} indexed images from {options['image_index']}")
+        except ValueError as e:
+            raise _OptionError(f"Error loading image index: {e}")
+    
+    stager = None
+    if options["stage_images"]:
+        if images is None:
+            raise _OptionError("Error: --stage-images needs an --image-index to resolve images")
+        bandwidth = options["image_bandwidth"]
+        stager = ImageStager(
+            concurrency=options["image_concurrency"],
+            bandwidth=bandwidth * 1024 * 1024 if bandwidth else None
+        )
+    
+    # Load appliance catalog
+    appliances = None
+    if options["catalog"]:
+        try:
+            appliances = ApplianceCatalog(options["catalog"])
+            appliances.load()
+        except OSError as e:
+            raise _OptionError(f"Error loading appliance catalog: {e}")
+    
+    # Build the node selection and parse limits
+    try:
+        selection = NodeSelection(options["select"], hops=options["hops"], cut=options["cut"]) \
+            if options["select"] else None
+        parse_limits = _parse_limits(options["limits"]) if options["limits"] else None
+    except ValueError as e:
+        raise _OptionError(f"Error: {e}")
+    
+    try:
+        return Converter(
+            node_mappings=node_mappings,
+            streaming=options["stream"],
+            spill_threshold=options["spill_threshold"],
+            image_index=images,
+            catalog=appliances,
+            compression=options["compress"],
+            workers=options["workers"],
+            validate=options["validate"],
+            selection=selection,
+            store=options["store"],
+            targets=options["targets"] or None,
+            image_stager=stager,
+            allocator=ResourceAllocator(options["resource_state"]) if options["allocate_resources"] else None,
+            limits=parse_limits
+        )
+    except ValueError as e:
+        raise _OptionError(f"Error during conversion: {e}")
+
+
+def _echo_result(result, input, output):
+    """Print the summary of a finished conversion."""
+    if len(result["targets"]) == 1:
+        click.echo(f"Successfully converted {input} to {next(iter(result['targets']))} project at {output}")
+        click.echo(f"Created {result['node_count']} nodes and {result['link_count']} links")
+        if "images" in result:
+            staged = result["images"]
+            methods = ", ".join(f"{count} {key}" for key, count in staged.items() if count and key != "bytes")
+            click.echo(f"Staged images: {methods or 'none'} ({staged['bytes'] / 1024 ** 2:.0f} MB copied)")
+    else:
+        click.echo(f"Successfully converted {input} at {output}")
+        for target, stats in result["targets"].items():
+            click.echo(f"  {target}: {stats['project_file']} ({stats['node_count']} nodes, "
+                       f"{stats['link_count']} links, {stats['seconds']:.2f}s)")
+
+
+def _parse_limits(options):
+    """
+    Build parse limits from NAME=VALUE options.
+    
+    Raises:
+        ValueError: If an option is malformed or names an unknown limit
+    """
+    from netbridge.utils.limits import ParseLimits, LIMIT_NAMES
+    
+    values = {}
+    for option in options:
+        name, _, value = option.partition("=")
+        name = f"max_{name.strip().replace('-', '_')}"
+        if name not in LIMIT_NAMES or not value:
+            raise ValueError(f"Invalid parse limit '{option}'")
+        try:
+            values[name] = float(value) if name == "max_seconds" else int(value)
+        except ValueError:
+            raise ValueError(f"Invalid value in parse limit '{option}'")
+    return ParseLimits(**values)
+
+
+def _convert_bundle(converter, input_path, output_path, workers, reporter):
+    """Convert a bundle, printing each document as it finishes."""
+    failed = 0
+    for document in converter.convert_bundle(input_path, output_path, workers=workers, progress=reporter):
+        if document.error is not None:
+            failed += 1
+            click.echo(f"Document {document.index + 1}: error: {document.error}")
+        else:
+            click.echo(f"Document {document.index + 1}: {document.output_dir} "
+                       f"({document.result['node_count']} nodes, {document.result['link_count']} links)")
+    if failed:
+        click.echo(f"{failed} documents of {input_path} failed to convert")
+        sys.exit(1)
+    click.echo(f"Successfully converted {input_path} at {output_path}")
+
+
+def _echo_progress(event):
+    """Print a conversion progress event on stderr."""
+    if event.kind == "stage_start":
+        click.echo(f"{event.stage}...", err=True)
+    else:
+        done = " done" if event.kind == "stage_end" else ""
+        click.echo(f"{event.stage}:{done} {event.nodes} nodes, {event.links} links "
+                   f"({event.elapsed:.1f}s)", err=True)
+
+
+@cli.command()
+@click.option(
+    "--input", "-i", required=True, type=click.Path(exists=True, dir_okay=False),
+    help="Input GNS3 project (.gns3) file path"
+)
+@click.option(
+    "--output", "-o", required=True, type=click.Path(dir_okay=False),
+    help="Output CML YAML file path"
+)
+@click.option(
+    "--mapping", "-m", type=click.Path(exists=True),
+    help="Custom node mapping JSON file"
+)
+@click.option(
+    "--force/--no-force", default=False,
+    help="Overwrite existing output file"
+)
+@click.option(
+    "--compress", type=click.Choice(COMPRESSIONS), default=None,
+    help="Compress the generated CML file"
+)
+@click.option(
+    "--catalog", type=click.Path(exists=True, file_okay=False),
+    help="Directory of GNS3 appliance files used to recognize nodes by their disk image"
+)
+@click.option(
+    "--server", "-s", default=None,
+    help="URL of the GNS3 server the project was created on, to recognize nodes by template ID"
+)
+@click.option("--user", help="GNS3 server user")
+@click.option("--password", help="GNS3 server password")
+def to_cml(input, output, mapping, force, compress, catalog, server, user, password):
+    """Convert a GNS3 project back to CML YAML."""
+    from netbridge.converter import Converter
+    from netbridge.clients.gns3_client import GNS3Client, GNS3APIError
+    from netbridge.utils.appliance_catalog import ApplianceCatalog
+    
+    if Path(output).exists() and not force:
+        click.echo(f"Error: Output file '{output}' already exists. Use --force to overwrite.")
+        sys.exit(1)
+    
+    node_mappings = dict(DEFAULT_NODE_MAPPINGS)
+    if mapping:
+        try:
+            node_mappings.update(load_config(mapping))
             click.echo(f"Loaded custom node mappings from {mapping}")
         except Exception as e:
             click.echo(f"Error loading custom mappings: {e}")
             sys.exit(1)
     
-    # Create converter and run conversion
+    appliances = None
+    if catalog:
+        try:
+            appliances = ApplianceCatalog(catalog)
+            appliances.load()
+        except OSError as e:
+            click.echo(f"Error loading appliance catalog: {e}")
+            sys.exit(1)
+    
+    templates = None
+    if server:
+        client = GNS3Client(server, user=user, password=password)
+        try:
+            templates = client.get_templates()
+        except (OSError, GNS3APIError) as e:
+            click.echo(f"Error reading templates from {server}: {e}")
+            sys.exit(1)
+        finally:
+            client.close()
+    
     try:
-        converter = Converter(node_mappings=node_mappings)
-        result = converter.convert(input_path, output_path)
-        click.echo(f"Successfully converted {input} to GNS3 project at {output}")
-        click.echo(f"Created {result['node_count']} nodes and {result['link_count']} links")
+        converter = Converter(node_mappings=node_mappings, compression=compress, catalog=appliances,
+                              gns3_templates=templates)
+        result = converter.convert_gns3(input, output)
     except Exception as e:
         click.echo(f"Error during conversion: {e}")
         logger.exception("Conversion error")
         sys.exit(1)
+    
+    click.echo(f"Successfully converted {input} to CML topology at {result['project_file']}")
+    click.echo(f"Created {result['node_count']} nodes and {result['link_count']} links")
+
+
+@cli.command()
+@click.option(
+    "--spec", "-s", required=True, type=click.Path(exists=True, dir_okay=False),
+    help="Fabric spec YAML file"
+)
+@click.option(
+    "--templates", "-t", type=click.Path(exists=True, file_okay=False),
+    help="Directory of Jinja2 config templates. Defaults to the spec's directory"
+)
+@click.option(
+    "--output", "-o", required=True, type=click.Path(),
+    help="Output directory for GNS3 project"
+)
+@click.option(
+    "--mapping", "-m", type=click.Path(exists=True),
+    help="Custom node mapping JSON file"
+)
+@click.option(
+    "--force/--no-force", default=False,
+    help="Overwrite existing output directory"
+)
+def scale_out(spec, templates, output, mapping, force):
+    """Generate a GNS3 project from a fabric spec and config templates."""
+    from netbridge.converter import Converter
+    from netbridge.parsers.fabric_parser import FabricParser
+    
+    output_path = Path(output)
+    if output_path.exists() and not force:
+        click.echo(f"Error: Output directory '{output}' already exists. Use --force to overwrite.")
+        sys.exit(1)
+    
+    node_mappings = dict(DEFAULT_NODE_MAPPINGS)
+    if mapping:
+        try:
+            node_mappings.update(load_config(mapping))
+        except Exception as e:
+            click.echo(f"Error loading custom mappings: {e}")
+            sys.exit(1)
+    
+    try:
+        topology = FabricParser(template_dir=templates).parse(spec)
+        result = Converter(node_mappings=node_mappings).convert_topology(topology, output_path)
+    except ValueError as e:
+        click.echo(f"Error during scale-out: {e}")
+        sys.exit(1)
+    
+    click.echo(f"Generated GNS3 project at {output} from {spec}")
+    click.echo(f"Created {result['node_count']} nodes and {result['link_count']} links")
+
+
+@cli.command()
+@click.option(
+    "--dir", "-d", "directories", multiple=True, type=click.Path(exists=True, file_okay=False),
+    help="Image directory to scan (repeatable). Defaults to the previously scanned directories"
+)
+@click.option(
+    "--index", "index_file", type=click.Path(), default=str(DEFAULT_IMAGE_INDEX),
+    show_default=True, help="Image index file"
+)
+def index_images(directories, index_file):
+    """Index local disk images for resolving node image definitions."""
+    from netbridge.utils.image_index import ImageIndex
+    
+    try:
+        index = ImageIndex(index_file)
+        if not directories and not index.directories:
+            click.echo("Error: No image directories given. Use --dir to add one.")
+            sys.exit(1)
+        
+        stats = index.scan(list(directories) if directories else None)
+        index.save()
+    except (OSError, ValueError) as e:
+        click.echo(f"Error indexing images: {e}")
+        sys.exit(1)
+    
+    click.echo(f"Indexed {len(index)} images in {index_file}")
+    click.echo(f"Hashed {stats['hashed']}, unchanged {stats['unchanged']}, removed {stats['removed']}")
+
+
+@cli.command()
+@click.option(
+    "--output", "-o", "outputs", multiple=True, required=True, type=click.Path(),
+    help="Output directory of a converted project (repeatable)"
+)
+@click.option(
+    "--resource-state", type=click.Path(dir_okay=False), default=str(DEFAULT_RESOURCE_STATE),
+    show_default=True, help="Console port and MAC address allocation state file"
+)
+def release_resources(outputs, resource_state):
+    """Release the console ports and MAC addresses reserved for converted projects."""
+    from netbridge.utils.resource_allocator import ResourceAllocator
+    
+    try:
+        allocator = ResourceAllocator(resource_state)
+        for output in outputs:
+            if allocator.release(str(Path(output).resolve())):
+                click.echo(f"Released resources of {output}")
+            else:
+                click.echo(f"No resources reserved for {output}")
+    except (OSError, ValueError) as e:
+        click.echo(f"Error releasing resources: {e}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--dir", "-d", "directory", required=True, type=click.Path(exists=True, file_okay=False),
+    help="Directory of GNS3 appliance (.gns3a) files"
+)
+@click.option(
+    "--cache", type=click.Path(),
+    help="Catalog cache file. Defaults to a file in the appliance directory"
+)
+@click.option(
+    "--workers", type=int, default=None,
+    help="Processes used to parse appliance files"
+)
+def import_catalog(directory, cache, workers):
+    """Import GNS3 appliance files into the appliance catalog."""
+    from netbridge.utils.appliance_catalog import ApplianceCatalog
+    
+    try:
+        catalog = ApplianceCatalog(directory, cache_file=cache, max_workers=workers)
+        stats = catalog.load()
+    except OSError as e:
+        click.echo(f"Error importing appliance catalog: {e}")
+        sys.exit(1)
+    
+    click.echo(f"Catalog contains {len(catalog)} appliances")
+    click.echo(f"Parsed {stats['parsed']}, cached {stats['cached']}, removed {stats['removed']}")
+
+
+@cli.command()
+@click.option(
+    "--project", "-p", required=True, type=click.Path(exists=True, dir_okay=False),
+    help="Converted GNS3 project file (.gns3)"
+)
+@click.option(
+    "--server", "-s", default="http://localhost:3080", show_default=True,
+    help="GNS3 server URL"
+)
+@click.option("--user", help="GNS3 server user")
+@click.option("--password", help="GNS3 server password")
+@click.option(
+    "--concurrency", type=click.IntRange(min=1), default=8, show_default=True,
+    help="Maximum requests in flight at once"
+)
+@click.option(
+    "--rate-limit", type=float, default=None,
+    help="Maximum requests per second"
+)
+@click.option(
+    "--retries", type=click.IntRange(min=0), default=3, show_default=True,
+    help="Retries for failed or throttled requests"
+)
+def push(project, server, user, password, concurrency, rate_limit, retries):
+    """Create a converted GNS3 project on a GNS3 server."""
+    from netbridge.clients.gns3_client import GNS3Client, GNS3APIError
+    
+    client = GNS3Client(
+        server, user=user, password=password, concurrency=concurrency,
+        rate_limit=rate_limit, retries=retries
+    )
+    try:
+        result = client.push_project(project)
+    except (OSError, GNS3APIError) as e:
+        click.echo(f"Error pushing project: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+    
+    click.echo(f"Created project {result['project_id']} on {server}")
+    click.echo(f"Created {result['node_count']} nodes, {result['link_count']} links "
+               f"and uploaded {result['config_count']} configurations")
+
+
+@cli.command()
+@click.option(
+    "--controller", "-c", required=True,
+    help="CML controller URL"
+)
+@click.option("--user", "-u", required=True, help="CML user")
+@click.option(
+    "--password", prompt=True, hide_input=True, envvar="NETBRIDGE_CML_PASSWORD",
+    help="CML password"
+)
+@click.option(
+    "--output", "-o", required=True, type=click.Path(file_okay=False),
+    help="Directory receiving one GNS3 project per lab"
+)
+@click.option(
+    "--lab", "lab_ids", multiple=True,
+    help="Lab ID to pull (repeatable). Defaults to all labs"
+)
+@click.option(
+    "--mapping", "-m", type=click.Path(exists=True),
+    help="Custom node mapping JSON file"
+)
+@click.option(
+    "--concurrency", type=click.IntRange(min=1), default=4, show_default=True,
+    help="Maximum lab downloads in flight at once"
+)
+@click.option(
+    "--insecure", is_flag=True, default=False,
+    help="Do not verify the controller's TLS certificate"
+)
+def pull(controller, user, password, output, lab_ids, mapping, concurrency, insecure):
+    """Pull labs from a CML controller and convert them to GNS3 projects."""
+    import asyncio
+    from netbridge.converter import Converter
+    from netbridge.clients.cml_client import CMLClient, CMLAPIError, pull_labs
+    
+    node_mappings = dict(DEFAULT_NODE_MAPPINGS)
+    if mapping:
+        try:
+            node_mappings.update(load_config(mapping))
+        except ValueError as e:
+            click.echo(f"Error loading custom mappings: {e}")
+            sys.exit(1)
+    
+    client = CMLClient(controller, user, password, concurrency=concurrency, verify_tls=not insecure)
+    converter = Converter(node_mappings=node_mappings)
+    try:
+        results = asyncio.run(pull_labs(client, converter, output, lab_ids=list(lab_ids) or None))
+    except CMLAPIError as e:
+        click.echo(f"Error pulling labs: {e}")
+        sys.exit(1)
+    
+    for result in results:
+        if result["status"] == "converted":
+            click.echo(f"  {result['lab_id']}: converted to {result['project_file']}")
+        else:
+            click.echo(f"  {result['lab_id']}: {result['status']} {result.get('error', '')}".rstrip())
+    
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("converted", "unchanged", "failed")}
+    click.echo(f"Converted {counts['converted']}, unchanged {counts['unchanged']}, failed {counts['failed']}")
+    if counts["failed"]:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--old", required=True, type=click.Path(exists=True, dir_okay=False),
+    help="Earlier CML file, or the hash sidecar of one"
+)
+@click.option(
+    "--new", required=True, type=click.Path(exists=True, dir_okay=False),
+    help="Later CML file, or the hash sidecar of one"
+)
+@click.option(
+    "--sidecar/--no-sidecar", default=True,
+    help="Reuse and write element hashes in a .hashes.json file next to each CML file"
+)
+@click.option(
+    "--json", "as_json", is_flag=True, default=False,
+    help="Print the differences as JSON"
+)
+@click.option(
+    "--exit-code", is_flag=True, default=False,
+    help="Exit with status 1 if the versions differ"
+)
+def diff(old, new, sidecar, as_json, exit_code):
+    """Show the nodes, links and configurations changed between two CML files."""
+    import json
+    from netbridge.parsers.cml_stream_parser import CMLStreamParser
+    from netbridge.utils.topology_hash import hash_topology
+    
+    parser = CMLStreamParser(validate=False)
+    try:
+        changes = hash_topology(old, parser, sidecar=sidecar).diff(hash_topology(new, parser, sidecar=sidecar))
+    except (OSError, ValueError) as e:
+        click.echo(f"Error comparing topologies: {e}")
+        sys.exit(1)
+    
+    if as_json:
+        click.echo(json.dumps(changes._asdict(), indent=2))
+    elif not any(changes):
+        click.echo("No differences")
+    else:
+        if changes.topology:
+            click.echo(f"Topology fields changed: {', '.join(changes.topology)}")
+        sections = (
+            ("Nodes", changes.nodes_added, changes.nodes_removed,
+             sorted(set(changes.nodes_modified) | set(changes.configs_modified))),
+            ("Links", changes.links_added, changes.links_removed, changes.links_modified)
+        )
+        configs = set(changes.configs_modified)
+        fields = set(changes.nodes_modified)
+        for title, added, removed, modified in sections:
+            if not (added or removed or modified):
+                continue
+            click.echo(f"{title}: {len(added)} added, {len(removed)} removed, {len(modified)} modified")
+            for element_id in added:
+                click.echo(f"  + {element_id}")
+            for element_id in removed:
+                click.echo(f"  - {element_id}")
+            for element_id in modified:
+                if title == "Nodes":
+                    parts = [part for part, ids in (("fields", fields), ("configuration", configs)) if element_id in ids]
+                    click.echo(f"  ~ {element_id} ({', '.join(parts)})")
+                else:
+                    click.echo(f"  ~ {element_id}")
+    
+    if exit_code and any(changes):
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--socket", "socket_path", type=click.Path(dir_okay=False), default=str(DEFAULT_DAEMON_SOCKET),
+    envvar="NETBRIDGE_DAEMON_SOCKET", show_default=True, help="Socket to listen on"
+)
+@click.option(
+    "--idle-timeout", type=click.FloatRange(min=0, min_open=True), default=None,
+    help="Exit after this many seconds without a request"
+)
+@click.option(
+    "--stop", is_flag=True, default=False,
+    help="Stop the daemon listening on the socket instead"
+)
+def daemon(socket_path, idle_timeout, stop):
+    """Keep converters warm for convert calls, behind a Unix socket."""
+    from netbridge.daemon import ConversionDaemon, request
+    
+    if stop:
+        try:
+            reply = request(socket_path, "shutdown")
+        except (OSError, ValueError) as e:
+            click.echo(f"Error stopping daemon: {e}")
+            sys.exit(1)
+        click.echo(f"Stopped daemon {reply['pid']}" if reply else f"No daemon listening on {socket_path}")
+        return
+    
+    # Convert a small lab up front, so imports, compiled schemas and
+    # generators are warm for the first request too
+    from netbridge.converter import Converter
+    with tempfile.TemporaryDirectory() as warm_dir:
+        Converter().convert_string(_WARM_UP_LAB, Path(warm_dir), name="warm-up")
+    
+    try:
+        ConversionDaemon(socket_path, _daemon_commands(), idle_timeout=idle_timeout).serve()
+    except (OSError, ValueError) as e:
+        click.echo(f"Error starting daemon: {e}")
+        sys.exit(1)
+
+
+def _daemon_commands():
+    """
+    Get the commands served by the conversion daemon.
+    
+    Returns:
+        dict: Command name -> function(options, progress)
+    """
+    from netbridge.daemon import WarmCache
+    
+    def build(options):
+        messages = []
+        return _build_converter(options, messages.append), messages
+    
+    converters = WarmCache(build)
+    
+    def convert_command(options, progress):
+        converter_options = options["converter"]
+        # Forking from the daemon's request threads could deadlock
+        if converter_options.get("workers"):
+            return {"messages": [], "error": "The conversion daemon does not run worker processes"}
+        try:
+            converter, messages = converters.get(
+                converter_options,
+                [converter_options[key] for key in ("mapping", "image_index", "catalog")]
+            )
+        except _OptionError as e:
+            return {"messages": [], "error": str(e)}
+        
+        reporter = None
+        if options.get("progress"):
+            reporter = ProgressReporter(callback=lambda event: progress(event._asdict()), interval=1.0)
+        try:
+            result = converter.convert(Path(options["input"]), Path(options["output"]), progress=reporter)
+        except Exception as e:
+            logger.exception("Conversion error")
+            return {"messages": messages, "error": f"Error during conversion: {e}"}
+        return {"messages": messages, "result": result}
+    
+    return {"convert": convert_command}
 
 
 @cli.command()
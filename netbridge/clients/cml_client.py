@@ -0,0 +1,410 @@
+"""
+Client for pulling labs from a Cisco Modeling Labs (CML) 2 controller.
+
+Uses asyncio with a small HTTP/1.1 client over a shared pool of keep-alive
+connections, so labs download concurrently without extra dependencies.
+"""
+import re
+import ssl
+import json
+import asyncio
+import logging
+from pathlib import Path
+from urllib.parse import urlsplit, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class CMLAPIError(ValueError):
+    """Raised when the CML controller rejects a request."""
+    
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncConnectionPool:
+    """
+    Pool of keep-alive HTTP/1.1 connections to one server, for use from a
+    single event loop.
+    """
+    
+    def __init__(self, base_url, maxsize=8, timeout=30, verify_tls=True):
+        """
+        Initialize the pool.
+        
+        Args:
+            base_url (str): Server URL, e.g. https://cml.example.com
+            maxsize (int): Maximum number of idle connections kept open
+            timeout (float): Timeout in seconds for each request
+            verify_tls (bool): Verify the server's TLS certificate
+        """
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported controller URL: {base_url}")
+        
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.host_header = url.netloc
+        self.base_path = url.path.rstrip("/")
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.connections_opened = 0
+        self.ssl = None
+        if url.scheme == "https":
+            self.ssl = ssl.create_default_context()
+            if not verify_tls:
+                self.ssl.check_hostname = False
+                self.ssl.verify_mode = ssl.CERT_NONE
+        self._idle = []
+    
+    async def request(self, method, path, headers=None, body=None):
+        """
+        Send a request on a pooled connection.
+        
+        Args:
+            method (str): HTTP method
+            path (str): Request path below the base URL
+            headers (dict): Optional request headers
+            body (bytes): Optional request body
+        
+        Returns:
+            tuple: (status, response headers with lower-case names, body bytes)
+        
+        Raises:
+            OSError, asyncio.TimeoutError: On connection failures
+        """
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await self._connect()
+            try:
+                status, response_headers, data, keep_alive = await asyncio.wait_for(
+                    self._exchange(reader, writer, method, path, headers or {}, body), self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                # The server may have closed an idle connection; retry once fresh
+                if reused:
+                    continue
+                raise ConnectionError(str(e) or "connection closed") from e
+            except BaseException:
+                writer.close()
+                raise
+            
+            if keep_alive and len(self._idle) < self.maxsize:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, response_headers, data
+    
+    def close(self):
+        """Close all idle connections."""
+        while self._idle:
+            self._idle.pop()[1].close()
+    
+    async def _connect(self):
+        self.connections_opened += 1
+        return await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout
+        )
+    
+    async def _exchange(self, reader, writer, method, path, headers, body):
+        lines = [f"{method} {self.base_path}{path} HTTP/1.1", f"Host: {self.host_header}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+        
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        version, status = status_line.decode("latin-1").split(None, 2)[:2]
+        status = int(status)
+        
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        
+        keep_alive = version == "HTTP/1.1" and response_headers.get("connection", "").lower() != "close"
+        
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            data = b""
+        elif "chunked" in response_headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # Skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            data = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        
+        return status, response_headers, data, keep_alive
+
+
+class CMLClient:
+    """
+    Async client for the CML 2 REST API.
+    """
+    
+    def __init__(self, controller_url, username, password, concurrency=4, page_size=100,
+                 retries=3, backoff=0.5, timeout=60, verify_tls=True):
+        """
+        Initialize the client.
+        
+        Args:
+            controller_url (str): CML controller URL
+            username (str): CML user
+            password (str): CML password
+            concurrency (int): Maximum lab downloads in flight at once
+            page_size (int): Labs requested per page when listing
+            retries (int): Retries for failed or throttled requests
+            backoff (float): Initial retry delay in seconds, doubled per retry
+            timeout (float): Timeout in seconds for each request
+            verify_tls (bool): Verify the controller's TLS certificate
+        """
+        self.username = username
+        self.password = password
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = AsyncConnectionPool(controller_url, maxsize=concurrency, timeout=timeout,
+                                        verify_tls=verify_tls)
+        self._token = None
+    
+    async def request(self, method, path, payload=None, headers=None, expect_json=True):
+        """
+        Send an API request, retrying transient failures.
+        
+        Args:
+            method (str): HTTP method
+            path (str): API path, e.g. /api/v0/labs
+            payload: JSON-serializable request body
+            headers (dict): Extra request headers
+            expect_json (bool): Decode the response body as JSON
+        
+        Returns:
+            tuple: (status, response headers, decoded body)
+        
+        Raises:
+            CMLAPIError: If the controller rejects the request
+        """
+        request_headers = {"Accept": "application/json" if expect_json else "*/*"}
+        if self._token:
+            request_headers["Authorization"] = f"Bearer {self._token}"
+        request_headers.update(headers or {})
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode()
+            request_headers["Content-Type"] = "application/json"
+        
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                status, response_headers, data = await self.pool.request(method, path, request_headers, body)
+            except (OSError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise CMLAPIError(f"{method} {path} failed: {str(e) or type(e).__name__}")
+                logger.debug(f"Retrying {method} {path} after error: {str(e)}")
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+            
+            if status in RETRY_STATUSES and attempt < self.retries:
+                logger.debug(f"Retrying {method} {path} after HTTP {status}")
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+            
+            if status >= 400:
+                raise CMLAPIError(
+                    f"{method} {path} failed with HTTP {status}: {data.decode(errors='replace')[:200]}",
+                    status=status
+                )
+            if status == 304:
+                return status, response_headers, None
+            if expect_json:
+                return status, response_headers, json.loads(data) if data else None
+            return status, response_headers, data.decode("utf-8")
+    
+    async def authenticate(self):
+        """Log in and keep the API token for later requests."""
+        _, _, token = await self.request(
+            "POST", "/api/v0/authenticate", {"username": self.username, "password": self.password}
+        )
+        self._token = token
+    
+    async def list_labs(self):
+        """
+        List the IDs of all labs, one page at a time.
+        
+        Yields:
+            str: Lab ID
+        """
+        offset = 0
+        seen = set()
+        while True:
+            query = urlencode({"offset": offset, "limit": self.page_size})
+            _, _, page = await self.request("GET", f"/api/v0/labs?{query}")
+            new = [lab_id for lab_id in page or [] if lab_id not in seen]
+            for lab_id in new:
+                seen.add(lab_id)
+                yield lab_id
+            
+            # Controllers without paging return every lab in the first page
+            if not new or len(page) < self.page_size:
+                return
+            offset += len(page)
+    
+    async def get_lab(self, lab_id):
+        """Get the metadata of a lab."""
+        _, _, lab = await self.request("GET", f"/api/v0/labs/{lab_id}")
+        return lab
+    
+    async def download_lab(self, lab_id, etag=None, last_modified=None):
+        """
+        Download the topology of a lab, unless it has not changed.
+        
+        Args:
+            lab_id (str): Lab ID
+            etag (str): ETag of the previously downloaded topology
+            last_modified (str): Last-Modified of the previous download
+        
+        Returns:
+            tuple: (topology YAML or None if unchanged, ETag, Last-Modified)
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        
+        status, response_headers, content = await self.request(
+            "GET", f"/api/v0/labs/{lab_id}/download", headers=headers, expect_json=False
+        )
+        if status == 304:
+            return None, etag, last_modified
+        return content, response_headers.get("etag"), response_headers.get("last-modified")
+    
+    def close(self):
+        """Close pooled connections."""
+        self.pool.close()
+
+
+class PullState:
+    """
+    Validators (ETag/Last-Modified) of previously pulled labs.
+    """
+    
+    def __init__(self, state_file):
+        """
+        Initialize the state, loading it from disk if it exists.
+        
+        Args:
+            state_file (Path): Location of the persisted state
+        """
+        self.state_file = Path(state_file)
+        self.labs = {}
+        try:
+            with open(self.state_file, 'r') as f:
+                self.labs = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable pull state {self.state_file}: {str(e)}")
+    
+    def save(self):
+        """Write the state to its file."""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_file, 'w') as f:
+            json.dump(self.labs, f, indent=2)
+
+
+def _safe_name(name):
+    """Turn a lab title into a directory name."""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip("._") or "lab"
+
+
+async def pull_labs(client, converter, output_dir, lab_ids=None, state_file=None):
+    """
+    Download labs from a CML controller and convert them to GNS3 projects.
+    
+    Downloaded topologies are handed to the converter in memory. Labs whose
+    ETag/Last-Modified match the previous pull are skipped.
+    
+    Args:
+        client (CMLClient): Client for the controller
+        converter (Converter): Converter used for every lab
+        output_dir (Path): Directory receiving one project per lab
+        lab_ids (list): Labs to pull. Defaults to all labs.
+        state_file (Path): Pull state file. Defaults to a file in output_dir.
+    
+    Returns:
+        list: One result dict per lab, with its status
+    """
+    output_dir = Path(output_dir)
+    state = PullState(state_file or output_dir / ".netbridge-pull.json")
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(client.concurrency)
+    
+    async def pull_one(lab_id):
+        async with semaphore:
+            previous = state.labs.get(lab_id, {})
+            project_dir = output_dir / previous.get("directory", "")
+            try:
+                if previous and not project_dir.exists():
+                    previous = {}
+                content, etag, last_modified = await client.download_lab(
+                    lab_id, previous.get("etag"), previous.get("last_modified")
+                )
+                if content is None:
+                    logger.info(f"Lab {lab_id} unchanged, skipping")
+                    return {"lab_id": lab_id, "status": "unchanged"}
+                
+                lab = await client.get_lab(lab_id)
+                title = (lab or {}).get("lab_title") or lab_id
+                directory = previous.get("directory") or _safe_name(f"{title}_{lab_id}")
+            except CMLAPIError as e:
+                logger.error(f"Error pulling lab {lab_id}: {str(e)}")
+                return {"lab_id": lab_id, "status": "failed", "error": str(e)}
+        
+        # Conversion is CPU bound, run it off the event loop
+        try:
+            result = await loop.run_in_executor(
+                None, converter.convert_string, content, output_dir / directory, title
+            )
+        except (ValueError, OSError) as e:
+            # Reported per lab, so one unwritable output does not abort the pull
+            logger.error(f"Error converting lab {lab_id}: {str(e)}")
+            return {"lab_id": lab_id, "status": "failed", "error": str(e)}
+        
+        state.labs[lab_id] = {"etag": etag, "last_modified": last_modified, "directory": directory}
+        return dict(result, lab_id=lab_id, status="converted")
+    
+    try:
+        await client.authenticate()
+        if lab_ids is None:
+            lab_ids = [lab_id async for lab_id in client.list_labs()]
+        results = await asyncio.gather(*(pull_one(lab_id) for lab_id in lab_ids))
+    finally:
+        client.close()
+        state.save()
+    
+    return list(results)
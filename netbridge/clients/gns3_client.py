@@ -0,0 +1,426 @@
+"""
+Client for pushing GNS3 projects to a GNS3 server over its v2 REST API.
+"""
+import json
+import time
+import base64
+import logging
+import threading
+import http.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urlsplit
+from netbridge.utils.compression import open_input, input_stem
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Statuses after which the server certainly did not apply a request
+UNAPPLIED_STATUSES = (429,)
+
+# Methods that can be sent again without creating anything twice
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+
+class GNS3APIError(ValueError):
+    """Raised when the GNS3 server rejects a request."""
+    
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class RequestNotSentError(ConnectionError):
+    """Raised when a request failed before it reached the server."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP connections to one server.
+    """
+    
+    def __init__(self, base_url, maxsize=8, timeout=30):
+        """
+        Initialize the pool.
+        
+        Args:
+            base_url (str): Server URL, e.g. http://localhost:3080
+            maxsize (int): Maximum number of idle connections kept open
+            timeout (float): Socket timeout in seconds
+        """
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported server URL: {base_url}")
+        
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.base_path = url.path.rstrip("/")
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+    
+    def request(self, method, path, body=None, headers=None):
+        """
+        Send a request on a pooled connection.
+        
+        Args:
+            method (str): HTTP method
+            path (str): Request path below the base URL
+            body (bytes): Optional request body
+            headers (dict): Optional request headers
+        
+        Returns:
+            tuple: (status, response headers, response body bytes)
+        
+        Raises:
+            RequestNotSentError: If the request could not be sent
+            OSError, http.client.HTTPException: If the response could not
+                be read, whether or not the server handled the request
+        """
+        conn = self._get()
+        try:
+            conn.request(method, self.base_path + path, body=body, headers=headers or {})
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise RequestNotSentError(str(e)) from e
+        try:
+            response = conn.getresponse()
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+        
+        if response.will_close:
+            conn.close()
+        else:
+            self._put(conn)
+        return response.status, response.headers, data
+    
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+    
+    def _get(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.connections_opened += 1
+        
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+    
+    def _put(self, conn):
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting requests per second.
+    """
+    
+    def __init__(self, rate, burst=None):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rate (float): Requests allowed per second
+            burst (int): Requests allowed back to back. Defaults to the rate.
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class GNS3Client:
+    """
+    Client for the GNS3 server v2 REST API.
+    """
+    
+    def __init__(self, server_url, user=None, password=None, concurrency=8,
+                 rate_limit=None, retries=3, backoff=0.5, timeout=30):
+        """
+        Initialize the client.
+        
+        Args:
+            server_url (str): GNS3 server URL, e.g. http://localhost:3080
+            user (str): Optional user for HTTP basic authentication
+            password (str): Optional password for HTTP basic authentication
+            concurrency (int): Maximum requests in flight at once
+            rate_limit (float): Optional maximum requests per second
+            retries (int): Retries for failed or throttled requests
+            backoff (float): Initial retry delay in seconds, doubled per retry
+            timeout (float): Socket timeout in seconds
+        """
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = ConnectionPool(server_url, maxsize=concurrency, timeout=timeout)
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.headers = {}
+        if user:
+            token = base64.b64encode(f"{user}:{password or ''}".encode()).decode()
+            self.headers["Authorization"] = f"Basic {token}"
+    
+    def request(self, method, path, payload=None, data=None, idempotent=None):
+        """
+        Send an API request, retrying transient failures.
+        
+        A request that is not idempotent, such as a POST creating a node,
+        is only sent again if it never reached the server or was throttled,
+        so a failure after the server applied it cannot create a duplicate.
+        
+        Args:
+            method (str): HTTP method
+            path (str): API path, e.g. /v2/projects
+            payload: JSON-serializable request body
+            data (bytes): Raw request body, used instead of payload
+            idempotent (bool): Whether the request may be repeated after
+                any failure. Defaults to True for GET, HEAD, PUT and DELETE.
+        
+        Returns:
+            The decoded JSON response, or None for empty responses
+        
+        Raises:
+            GNS3APIError: If the server rejects the request
+        """
+        headers = dict(self.headers)
+        if data is not None:
+            body = data
+            headers["Content-Type"] = "application/octet-stream"
+        elif payload is not None:
+            body = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+        else:
+            body = None
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        delay = self.backoff
+        
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            
+            try:
+                status, response_headers, response = self.pool.request(method, path, body, headers)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.retries or not (idempotent or isinstance(e, RequestNotSentError)):
+                    raise GNS3APIError(f"{method} {path} failed: {str(e)}")
+                logger.debug(f"Retrying {method} {path} after error: {str(e)}")
+                time.sleep(delay)
+                delay *= 2
+                continue
+            
+            if (status in (RETRY_STATUSES if idempotent else UNAPPLIED_STATUSES)
+                    and attempt < self.retries):
+                retry_after = response_headers.get("Retry-After")
+                logger.debug(f"Retrying {method} {path} after HTTP {status}")
+                time.sleep(float(retry_after) if retry_after and retry_after.isdigit() else delay)
+                delay *= 2
+                continue
+            
+            if status >= 400:
+                raise GNS3APIError(
+                    f"{method} {path} failed with HTTP {status}: {response.decode(errors='replace')[:200]}",
+                    status=status
+                )
+            return json.loads(response) if response else None
+    
+    def close(self):
+        """Close pooled connections."""
+        self.pool.close()
+    
+    def get_templates(self):
+        """
+        Get the server's templates.
+        
+        Returns:
+            dict: Template name -> template ID
+        """
+        return {template["name"]: template["template_id"] for template in self.request("GET", "/v2/templates")}
+    
+    def push_project(self, project_file):
+        """
+        Create a converted GNS3 project on the server.
+        
+        Nodes are created concurrently, each link as soon as both of its
+        endpoints exist, and node configurations right after their node.
+        If any of them fails, the partly created project is deleted from
+        the server again.
+        
+        Args:
+            project_file (Path): Path to a .gns3 project written by NetBridge
+        
+        Returns:
+            dict: Statistics about the pushed project
+        
+        Raises:
+            GNS3APIError: If the server rejects the project. The message
+                names the project if it could not be deleted.
+        """
+        project_file = Path(project_file)
+        with open_input(project_file) as f:
+            project = json.load(f)
+        
+        nodes = project["topology"]["nodes"]
+        links = project["topology"]["links"]
+        configs = self._find_configs(project_file.parent / "configs")
+        
+        # Fail before creating anything if the server lacks a template
+        templates = self.get_templates()
+        missing = sorted({node["type"] for node in nodes} - set(templates))
+        if missing:
+            raise GNS3APIError(f"Templates not found on server: {', '.join(missing)}")
+        
+        remote = self.request("POST", "/v2/projects", {"name": project["name"]})
+        project_id = remote["project_id"]
+        logger.info(f"Created project {project['name']} ({project_id}) on server")
+        
+        push = _ProjectPush(self, project_id, templates, links, configs)
+        try:
+            push.run(nodes)
+        except GNS3APIError as e:
+            try:
+                self.request("DELETE", f"/v2/projects/{project_id}")
+            except GNS3APIError as cleanup_error:
+                logger.error(f"Could not delete partly pushed project {project_id}: {str(cleanup_error)}")
+                raise GNS3APIError(f"{str(e)}; partly pushed project {project_id} is left on the server",
+                                   status=e.status) from e
+            logger.info(f"Deleted partly pushed project {project_id}")
+            raise
+        
+        logger.info(f"Pushed {push.node_count} nodes, {push.link_count} links and "
+                    f"{push.config_count} configurations")
+        return {
+            "project_id": project_id,
+            "node_count": push.node_count,
+            "link_count": push.link_count,
+            "config_count": push.config_count
+        }
+    
+    def _find_configs(self, config_dir):
+        """Map local node IDs to the configuration files saved for them."""
+        configs = {}
+        if config_dir.is_dir():
+            for config_file in config_dir.iterdir():
+                # Configurations are saved as <name>_<node id>.cfg, possibly
+                # with a compression suffix
+                name = input_stem(config_file)
+                stem, _, node_id = name.rpartition("_")
+                if stem and config_file.name[len(name):].startswith(".cfg"):
+                    configs[node_id] = config_file
+        return configs
+
+
+class _ProjectPush:
+    """
+    State of one project push.
+    """
+    
+    def __init__(self, client, project_id, templates, links, configs):
+        self.client = client
+        self.project_id = project_id
+        self.templates = templates
+        self.configs = configs
+        self.node_ids = {}  # local node ID -> server node ID
+        self.links_by_node = {}
+        for link in links:
+            for node_id in {end["node_id"] for end in link["nodes"]}:
+                self.links_by_node.setdefault(node_id, []).append(link)
+        self.node_count = 0
+        self.link_count = 0
+        self.config_count = 0
+        self.errors = []
+        self._followups = []
+        self._lock = threading.Lock()
+        self._executor = None
+    
+    def run(self, nodes):
+        """Create all nodes, links and configurations."""
+        with ThreadPoolExecutor(max_workers=self.client.concurrency) as executor:
+            self._executor = executor
+            wait([executor.submit(self._guard, self._create_node, node) for node in nodes])
+            # Every link and config task is submitted by the node tasks
+            with self._lock:
+                followups = list(self._followups)
+            wait(followups)
+        
+        if self.errors:
+            raise GNS3APIError(f"{len(self.errors)} requests failed, first error: {self.errors[0]}")
+    
+    def _guard(self, task, *args):
+        # Futures are only waited on, so every failure has to be recorded
+        # here, including errors reading a configuration file
+        try:
+            task(*args)
+        except Exception as e:
+            logger.error(str(e) if isinstance(e, GNS3APIError) else f"{type(e).__name__}: {str(e)}")
+            with self._lock:
+                self.errors.append(e)
+    
+    def _create_node(self, node):
+        remote = self.client.request(
+            "POST",
+            f"/v2/projects/{self.project_id}/templates/{self.templates[node['type']]}",
+            {"name": node["name"], "x": node["x"], "y": node["y"], "compute_id": node.get("compute_id", "local")}
+        )
+        
+        ready = []
+        with self._lock:
+            self.node_ids[node["id"]] = remote["node_id"]
+            self.node_count += 1
+            for link in self.links_by_node.get(node["id"], []):
+                if all(end["node_id"] in self.node_ids for end in link["nodes"]):
+                    ready.append(link)
+            if node["id"] in self.configs:
+                self._followups.append(self._executor.submit(
+                    self._guard, self._upload_config, remote["node_id"], self.configs[node["id"]]
+                ))
+            for link in ready:
+                self._followups.append(self._executor.submit(self._guard, self._create_link, link))
+    
+    def _create_link(self, link):
+        with self._lock:
+            ends = [dict(end, node_id=self.node_ids[end["node_id"]]) for end in link["nodes"]]
+        self.client.request("POST", f"/v2/projects/{self.project_id}/links", {"nodes": ends})
+        with self._lock:
+            self.link_count += 1
+    
+    def _upload_config(self, node_id, config_file):
+        with open_input(config_file, 'rb') as f:
+            data = f.read()
+        self.client.request(
+            "POST",
+            f"/v2/projects/{self.project_id}/nodes/{node_id}/files/startup-config.cfg",
+            data=data,
+            idempotent=True
+        )
+        with self._lock:
+            self.config_count += 1
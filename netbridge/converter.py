@@ -4,33 +4,131 @@ Main converter module for NetBridge.
 import os
 import logging
 import uuid
+import time
+import tempfile
+import contextlib
+import shutil
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 from netbridge.parsers.cml_parser import CMLParser
+from netbridge.parsers.cml_stream_parser import CMLStreamParser
 from netbridge.parsers.virl_parser import VIRLParser
-from netbridge.generators.gns3_generator import GNS3Generator
+from netbridge.parsers.gns3_parser import GNS3Parser
+from netbridge.models.topology_store import SQLiteTopology, locked_store
+from netbridge.generators.registry import DEFAULT_TARGET, get_generator
+from netbridge.generators.cml_generator import CMLGenerator
+from netbridge.generators.gns3_generator import resource_count
 from netbridge.utils.validators import validate_topology
-from netbridge.utils.node_mappings import map_nodes
+from netbridge.utils.node_mappings import map_nodes, freeze_mappings, InverseNodeMappings
+from netbridge.utils.compression import open_input, input_stem
+from netbridge.utils.bundle import uncompressed_bundle, scan_documents, read_document
+from netbridge.utils.progress import reporter_for, ConversionCancelled
 
 logger = logging.getLogger(__name__)
 
+# Outcome of one document of a bundle: its position in the bundle, where
+# it was written, and the conversion statistics or the error message
+BundleResult = namedtuple("BundleResult", ["index", "output_dir", "result", "error"])
+
+# Converter used by forked bundle workers, inherited from the parent
+# instead of pickled with each document
+_shared_converter = None
+_shared_converter_lock = threading.Lock()
+
 
 class Converter:
     """
     Core converter class that orchestrates the conversion process.
+    
+    A converter holds no per-conversion state, so one instance can be
+    shared by several threads converting at the same time, as long as it
+    does not use worker processes: forking while another thread holds a
+    lock can deadlock the forked worker.
     """
     
-    def __init__(self, node_mappings=None):
+    def __init__(self, node_mappings=None, streaming=False, spill_threshold=None, image_index=None,
+                 catalog=None, compression=None, workers=None, validate=True, selection=None, store=None,
+                 targets=None, image_stager=None, allocator=None, limits=None, gns3_templates=None):
         """
         Initialize the converter with optional node mappings.
         
         Args:
-            node_mappings (dict): Custom node mappings configuration
+            node_mappings (dict): Custom node mappings configuration. A
+                snapshot is taken, so later changes to the dict are ignored.
+            streaming (bool): Parse CML files with the event-driven parser
+            spill_threshold (int): Spill CML configurations larger than this
+                many characters to disk (streaming mode only)
+            image_index (ImageIndex): Disk image index used to resolve the
+                image of each node
+            catalog (ApplianceCatalog): Loaded appliance catalog used to map
+                node types missing from the node mappings
+            compression (str): Compress the generated project file and
+                configurations (gzip, bz2, xz or zstd). Only for targets
+                whose generator supports compression.
+            workers (int): Generate nodes and links of large topologies in
+                this many forked worker processes. Not for converters
+                shared by several threads.
+            validate (bool): Check parsed CML nodes and links and the
+                generated project against the bundled JSON Schemas.
+                Disable for trusted input on hot paths.
+            selection (NodeSelection): Only convert the selected nodes of
+                parsed files
+            store (Path): Keep parsed CML topologies in this SQLite file
+                instead of memory. A store built from the same unchanged
+                input file is reused without parsing it again. The file
+                holds one topology, so conversions using it run one at a
+                time.
+            targets (list): Target formats to generate from the one parsed
+                and mapped topology (see generators.registry). Defaults to
+                GNS3 only. With several targets each is written to a
+                subdirectory of the output named after the target.
+            image_stager (ImageStager): Place the disk images resolved
+                through image_index into the images/ directory of the
+                GNS3 project with this stager
+            allocator (ResourceAllocator): Assign the GNS3 nodes console
+                ports and base MAC addresses reserved from this allocator,
+                held under the output directory until released
+            limits (ParseLimits): Resource limits for parsing CML and VIRL
+                input; a file crossing one is rejected with
+                ParseLimitExceeded
+            gns3_templates (dict): Template name -> template ID of the GNS3
+                server that GNS3 projects converted back were created on
+                (see GNS3Client.get_templates). Without it or a catalog,
+                only nodes of projects NetBridge generated are recognized.
+        
+        Raises:
+            ValueError: If a target format is unknown, or cannot be
+                compressed as requested
         """
-        self.node_mappings = node_mappings or {}
-        self.cml_parser = CMLParser()
-        self.virl_parser = VIRLParser()
-        self.gns3_generator = GNS3Generator()
+        self.node_mappings = freeze_mappings(node_mappings)
+        self.inverse_mappings = InverseNodeMappings(self.node_mappings, templates=gns3_templates, catalog=catalog)
+        self.streaming = streaming
+        self.image_index = image_index
+        self.catalog = catalog
+        self.compression = compression
+        self.workers = workers
+        self.validate = validate
+        self.selection = selection
+        self.store = store
+        self.image_stager = image_stager
+        self.allocator = allocator
+        self.limits = limits
+        if streaming:
+            self.cml_parser = CMLStreamParser(spill_threshold=spill_threshold, validate=validate, limits=limits)
+        else:
+            self.cml_parser = CMLParser(validate=validate, limits=limits)
+        self.virl_parser = VIRLParser(limits=limits)
+        self.gns3_parser = GNS3Parser()
+        self.generators = {target: get_generator(target) for target in (targets or (DEFAULT_TARGET,))}
+        if compression:
+            uncompressed = [target for target, generator in self.generators.items()
+                            if not getattr(generator, "supports_compression", False)]
+            if uncompressed:
+                raise ValueError(f"Compression is not supported for target {', '.join(uncompressed)}")
     
     def _detect_file_type(self, input_file):
         """
@@ -45,34 +143,53 @@ class Converter:
         Raises:
             ValueError: If the file type cannot be determined
         """
-        with open(input_file, 'r') as f:
-            content = f.read(1000)  # Read first 1000 characters
+        with open_input(input_file) as f:
+            content = f.read(1000)  # Read first 1000 (decompressed) characters
+        
+        return self._detect_content_type(content, input_file)
+    
+    def _detect_content_type(self, content, source):
+        """
+        Detect if the start of a document is CML or VIRL format.
+        
+        Args:
+            content (str): First characters of the document
+            source: File path or name used in messages
             
+        Returns:
+            str: "cml" or "virl"
+            
+        Raises:
+            ValueError: If the format cannot be determined
+        """
         if "topology:" in content or "nodes:" in content:
             # Basic CML structure check
-            logger.info(f"Detected CML format for {input_file}")
+            logger.info(f"Detected CML format for {source}")
             return "cml"
         elif "<topology" in content or "<lab" in content:
             # Basic VIRL structure check
-            logger.info(f"Detected VIRL format for {input_file}")
+            logger.info(f"Detected VIRL format for {source}")
             return "virl"
         else:
-            logger.error(f"Could not determine file type for {input_file}")
-            raise ValueError(f"Unknown file format for {input_file}. Must be CML or VIRL.")
+            logger.error(f"Could not determine file type for {source}")
+            raise ValueError(f"Unknown file format for {source}. Must be CML or VIRL.")
     
-    def convert(self, input_file, output_dir):
+    def convert(self, input_file, output_dir, progress=None):
         """
         Convert a CML/VIRL file to GNS3 project.
         
         Args:
             input_file (Path): Path to the input CML/VIRL file
             output_dir (Path): Directory to save the GNS3 project
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation token holder
             
         Returns:
             dict: Statistics about the conversion (nodes, links, etc.)
             
         Raises:
             ValueError: For invalid input or conversion errors
+            ConversionCancelled: If the progress token was cancelled
         """
         input_file = Path(input_file)
         output_dir = Path(output_dir)
@@ -82,21 +199,365 @@ class Converter:
         # Detect file type and parse accordingly
         file_type = self._detect_file_type(input_file)
         
-        # Parse input file
-        if file_type == "cml":
-            topology = self.cml_parser.parse(input_file)
-        else:  # virl
-            topology = self.virl_parser.parse(input_file)
+        def parse(spill_dir, progress):
+            if file_type == "virl":
+                return self.virl_parser.parse(input_file, progress=progress, selection=self.selection)
+            if self.streaming:
+                return self.cml_parser.parse(input_file, spill_dir=spill_dir, progress=progress,
+                                             selection=self.selection, store=self.store)
+            return self.cml_parser.parse(input_file, progress=progress, selection=self.selection, store=self.store)
+        
+        return self._convert(parse, output_dir, progress, self._source_key(input_file, file_type))
+    
+    def convert_string(self, content, output_dir, name=None, progress=None):
+        """
+        Convert CML/VIRL content that is already in memory to GNS3 project.
+        
+        Args:
+            content (str): CML YAML or VIRL XML document
+            output_dir (Path): Directory to save the GNS3 project
+            name (str): Topology name used if the document has none
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation token holder
+            
+        Returns:
+            dict: Statistics about the conversion (nodes, links, etc.)
+            
+        Raises:
+            ValueError: For invalid input or conversion errors
+            ConversionCancelled: If the progress token was cancelled
+        """
+        output_dir = Path(output_dir)
+        source = name or "<string>"
+        
+        logger.info(f"Starting conversion of {source} to {output_dir}")
+        
+        file_type = self._detect_content_type(content[:1000], source)
+        
+        def parse(spill_dir, progress):
+            if file_type == "virl":
+                return self.virl_parser.parse_string(content, name, progress=progress, selection=self.selection)
+            if self.streaming:
+                return self.cml_parser.parse_string(content, name, spill_dir=spill_dir, progress=progress,
+                                                    selection=self.selection, store=self.store)
+            return self.cml_parser.parse_string(content, name, progress=progress, selection=self.selection,
+                                                store=self.store)
+        
+        return self._convert(parse, output_dir, progress)
+    
+    def convert_bundle(self, input_file, output_dir, workers=None, progress=None):
+        """
+        Convert every document of a multi-document CML/VIRL YAML bundle.
+        
+        Document boundaries are found in one scan of the file, then each
+        document is read and converted on its own, across forked worker
+        processes if workers is above 1. Document n is written to
+        <output_dir>/<bundle name>-<n>. Results are yielded as documents
+        finish, not in bundle order; a failed document is reported in its
+        result and does not stop the others.
+        
+        Args:
+            input_file (Path): Path to the bundle, optionally compressed
+            output_dir (Path): Directory to save the GNS3 projects in
+            workers (int): Convert this many documents at the same time in
+                forked worker processes. None or 1 works in-process.
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation token holder
+        
+        Yields:
+            BundleResult: The outcome of each non-empty document
+        
+        Raises:
+            ValueError: If the bundle cannot be read, or a topology store
+                is configured (a store holds a single topology)
+            ConversionCancelled: If the progress token was cancelled
+        """
+        if self.store is not None:
+            raise ValueError("Bundles cannot be converted into a topology store")
+        
+        input_file = Path(input_file)
+        output_dir = Path(output_dir)
+        progress = reporter_for(progress)
+        stem = input_stem(input_file)
+        
+        try:
+            with uncompressed_bundle(input_file) as path:
+                with progress.stage("scan"):
+                    documents = scan_documents(path)
+                logger.info(f"Converting {len(documents)} documents of {input_file} to {output_dir}")
+                
+                width = len(str(len(documents)))
+                jobs = [
+                    (index, path, offset, length, output_dir / f"{stem}-{index + 1:0{width}d}", f"{stem}-{index + 1}")
+                    for index, (offset, length) in enumerate(documents)
+                ]
+                
+                with progress.stage("convert"):
+                    if workers and workers > 1 and len(jobs) > 1:
+                        if "fork" in multiprocessing.get_all_start_methods():
+                            yield from self._convert_bundle_parallel(jobs, workers, progress)
+                            return
+                        logger.warning("Parallel bundle conversion needs the 'fork' start method, "
+                                       "converting in-process")
+                    
+                    for job in jobs:
+                        progress.check()
+                        yield _advance(progress, _convert_document(self, *job))
+        except OSError as e:
+            logger.error(f"Error reading bundle {input_file}: {str(e)}")
+            raise ValueError(f"Error reading bundle {input_file}: {str(e)}")
+    
+    def _convert_bundle_parallel(self, jobs, workers, progress):
+        """Convert bundle documents across forked workers sharing this converter."""
+        global _shared_converter
+        
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # Fork pools start all their workers on the first submit, so
+            # the converter only has to be shared while submitting
+            with _shared_converter_lock:
+                _shared_converter = self
+                try:
+                    futures = [executor.submit(_convert_shared_document, *job) for job in jobs]
+                finally:
+                    _shared_converter = None
+            try:
+                for future in as_completed(futures):
+                    yield _advance(progress, future.result())
+                    progress.check()
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def convert_gns3(self, input_file, output_file, progress=None):
+        """
+        Convert a GNS3 project back to a CML YAML file.
+        
+        The project file is read incrementally and the CML file written
+        entry by entry. Node types are found by looking the GNS3 templates
+        (or the appliances of the nodes' disk images) up in the node
+        mappings; configurations are read from the project directory.
+        
+        Args:
+            input_file (Path): Path to the .gns3 project file
+            output_file (Path): CML YAML file to write, with a compression
+                suffix added if the converter compresses its output
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation token holder
+            
+        Returns:
+            dict: Statistics about the conversion (nodes, links, etc.)
+            
+        Raises:
+            ValueError: For invalid input or conversion errors
+            ConversionCancelled: If the progress token was cancelled
+        """
+        input_file = Path(input_file)
+        progress = reporter_for(progress)
+        
+        logger.info(f"Starting conversion of {input_file} to {output_file}")
+        
+        with progress.stage("parse"):
+            project = self.gns3_parser.parse(input_file, progress=progress)
+        with progress.stage("generate"):
+            result = CMLGenerator().generate(
+                project, output_file, self.inverse_mappings, project_dir=input_file.parent,
+                compression=self.compression, progress=progress
+            )
+        
+        logger.info(f"Conversion complete. Created {result['node_count']} nodes and {result['link_count']} links")
+        return result
+    
+    def convert_topology(self, topology, output_dir, progress=None):
+        """
+        Convert an already parsed topology to GNS3 project.
+        
+        Args:
+            topology: The parsed topology (CMLTopology or VIRLTopology)
+            output_dir (Path): Directory to save the GNS3 project
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation token holder
+            
+        Returns:
+            dict: Statistics about the conversion (nodes, links, etc.) of
+            the first target, and under "targets" the statistics and
+            generation time in seconds of every target
+            
+        Raises:
+            ValueError: For invalid topologies or conversion errors
+            ConversionCancelled: If the progress token was cancelled
+        """
+        progress = reporter_for(progress)
+        output_dir = Path(output_dir)
         
         # Validate the parsed topology
-        validate_topology(topology)
+        with progress.stage("validate"):
+            validate_topology(topology)
         
         # Map nodes to GNS3 templates
-        mapped_topology = map_nodes(topology, self.node_mappings)
+        with progress.stage("map"):
+            mappings = map_nodes(topology, self.node_mappings, catalog=self.catalog, progress=progress)
         
-        # Generate GNS3 project
-        project_uuid = str(uuid.uuid4())
-        result = self.gns3_generator.generate(mapped_topology, output_dir, project_uuid)
+        # Reconverting into the same directory keeps the same reservation
+        resources = None
+        if self.allocator is not None:
+            resources = self.allocator.reserve(str(output_dir.resolve()), resource_count(topology, mappings))
+        
+        # Generate the GNS3 project in a staging directory next to the
+        # output, so a failed or cancelled conversion leaves nothing behind
+        output_dir.parent.mkdir(parents=True, exist_ok=True)
+        staging_dir = output_dir.parent / f".{output_dir.name}.{uuid.uuid4().hex}.tmp"
+        staging_dir.mkdir()
+        try:
+            project_uuid = str(uuid.uuid4())
+            targets = {}
+            for target, generator in self.generators.items():
+                target_dir = staging_dir if len(self.generators) == 1 else staging_dir / target
+                stage = "generate" if len(self.generators) == 1 else f"generate {target}"
+                started = time.perf_counter()
+                with progress.stage(stage):
+                    stats = generator.generate(
+                        topology, target_dir, project_uuid, mappings, image_index=self.image_index,
+                        compression=self.compression, progress=progress, workers=self.workers,
+                        validate=self.validate, resources=resources
+                    )
+                stats["seconds"] = time.perf_counter() - started
+                staged_file = Path(stats["project_file"])
+                stats["project_file"] = str(output_dir / staged_file.relative_to(staging_dir))
+                targets[target] = stats
+                logger.info(f"Generated {target} output in {stats['seconds']:.2f}s")
+                
+                if target == "gns3" and self.image_stager is not None and self.image_index is not None:
+                    # Images are staged with the project; those already in
+                    # the published project are hardlinked from it
+                    with progress.stage("images"):
+                        stats["images"] = generator.stage_images(
+                            topology, staged_file.parent / "images", self.image_index, self.image_stager,
+                            progress, reuse_dir=Path(stats["project_file"]).parent / "images"
+                        )
+            _publish(staging_dir, output_dir)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        
+        # The first target's statistics are reported at the top level
+        result = dict(next(iter(targets.values())), targets=targets)
         
         logger.info(f"Conversion complete. Created {result['node_count']} nodes and {result['link_count']} links")
         return result
+    
+    def _source_key(self, input_file, file_type):
+        """
+        Identify an input file and the options its stored topology depends on.
+        
+        Returns:
+            str: Key matching only unchanged files, or None if the file
+            is not parsed into a store
+        """
+        if self.store is None or file_type != "cml":
+            return None
+        stat = input_file.stat()
+        # A store built under other limits may hold a topology these reject
+        return (f"{input_file.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{self.selection!r}|validate={self.validate}"
+                f"|limits={self.limits!r}")
+    
+    def _convert(self, parse, output_dir, progress, source=None):
+        """
+        Parse and convert a topology.
+        
+        Args:
+            parse (callable): Called with the spill directory (or None) and
+                the progress reporter, returns the parsed topology
+            output_dir (Path): Directory to save the GNS3 project
+            progress (ProgressReporter): Optional progress reporter
+            source (str): Key of the input, used to reuse a finished store
+            
+        Returns:
+            dict: Statistics about the conversion
+        """
+        progress = reporter_for(progress)
+        if self.store is None:
+            return self._parse_and_convert(parse, output_dir, progress, source)
+        # A store holds one topology, so its conversions take turns
+        with locked_store(self.store):
+            return self._parse_and_convert(parse, output_dir, progress, source)
+    
+    def _parse_and_convert(self, parse, output_dir, progress, source):
+        """Parse and convert a topology, reusing or rebuilding the store."""
+        if source is not None:
+            topology = SQLiteTopology.open(self.store, source)
+            if topology is not None:
+                with contextlib.closing(topology):
+                    return self.convert_topology(topology, output_dir, progress)
+        
+        # Spilled configurations only need to live until generation is done
+        if self.streaming and self.cml_parser.spill_threshold is not None and self.store is None:
+            spill_context = tempfile.TemporaryDirectory(prefix="netbridge-spill-")
+        else:
+            spill_context = contextlib.nullcontext()
+        
+        with spill_context as spill_dir:
+            with progress.stage("parse"):
+                topology = parse(spill_dir, progress)
+            if not isinstance(topology, SQLiteTopology):
+                return self.convert_topology(topology, output_dir, progress)
+            
+            with contextlib.closing(topology):
+                topology.commit(source)
+                return self.convert_topology(topology, output_dir, progress)
+
+def _convert_document(converter, index, path, offset, length, output_dir, name):
+    """
+    Convert one document of a bundle.
+    
+    Returns:
+        BundleResult: The statistics of the conversion, or the error that
+        stopped it
+    """
+    try:
+        content = read_document(path, offset, length)
+        result = converter.convert_string(content, output_dir, name=name)
+    except ConversionCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error converting document {index + 1} of the bundle: {str(e)}")
+        return BundleResult(index, str(output_dir), None, str(e))
+    return BundleResult(index, str(output_dir), result, None)
+
+
+def _advance(progress, result):
+    """Count the nodes and links of a converted document."""
+    if result.result is not None:
+        progress.advance(nodes=result.result["node_count"], links=result.result["link_count"])
+    return result
+
+
+def _convert_shared_document(*job):
+    # Documents are already spread across the processes, so each one is
+    # generated in-process
+    _shared_converter.workers = None
+    return _convert_document(_shared_converter, *job)
+
+
+def _publish(staging_dir, output_dir):
+    """
+    Move a finished project from its staging directory into place.
+    
+    A new or empty output directory is replaced by a single rename. Files
+    in an existing output directory are replaced one by one, leaving
+    unrelated files alone.
+    """
+    try:
+        if output_dir.is_dir() and not any(output_dir.iterdir()):
+            output_dir.rmdir()
+        os.rename(staging_dir, output_dir)
+        return
+    except OSError:
+        if not output_dir.is_dir():
+            raise
+    
+    for entry in staging_dir.iterdir():
+        target = output_dir / entry.name
+        if entry.is_dir() and target.is_dir():
+            _publish(entry, target)
+        else:
+            os.replace(entry, target)
@@ -0,0 +1,311 @@
+"""
+Conversion daemon serving warm converters over a Unix domain socket.
+
+A short-lived CLI call spends most of its time importing the parsers,
+generators and schemas and building converters before any work starts.
+The daemon pays for that once: it keeps converters built and cached
+between requests, and the CLI forwards its requests to it when it is
+running, falling back to converting in process when it is not.
+
+The protocol is one JSON object per line. The client sends a single
+request, {"version", "command", "options"}; the daemon answers with any
+number of {"progress": event} lines followed by one {"reply": ...},
+{"error": ...} or {"unavailable": ...} line, and closes the connection.
+
+This module only imports the standard library, so that forwarding a
+request stays cheap.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+from collections import OrderedDict
+from pathlib import Path
+from netbridge import __version__
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a daemon to accept a connection
+CONNECT_TIMEOUT = 1.0
+
+# Converters kept warm, least recently used dropped first
+WARM_CACHE_SIZE = 8
+
+# Seconds a connection may stall while its request is read or its reply
+# written; a command itself may run for any time
+CLIENT_TIMEOUT = 60
+
+
+def request(socket_path, command, options=None, on_progress=None):
+    """
+    Send a request to the daemon listening on a socket.
+    
+    Args:
+        socket_path (Path): Socket of the daemon
+        command (str): Command to run
+        options (dict): JSON-serializable options of the command
+        on_progress (callable): Called with each progress event dict the
+            daemon sends while the command runs
+    
+    Returns:
+        The reply of the command, or None if no daemon is listening on
+        the socket or it runs another NetBridge version
+    
+    Raises:
+        ValueError: If the command failed in the daemon
+        OSError: If the connection broke off before the reply
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout):
+            return None
+        # Commands run as long as they take once accepted
+        sock.settimeout(None)
+        
+        with sock.makefile("rwb") as f:
+            f.write(_encode({"version": __version__, "command": command, "options": options or {}}))
+            f.flush()
+            for line in f:
+                message = json.loads(line)
+                if "progress" in message:
+                    if on_progress is not None:
+                        on_progress(message["progress"])
+                elif "reply" in message:
+                    return message["reply"]
+                elif "error" in message:
+                    raise ValueError(message["error"])
+                else:
+                    logger.info(f"Not using the conversion daemon: {message.get('unavailable')}")
+                    return None
+        raise ConnectionError(f"Conversion daemon at {socket_path} closed the connection")
+    finally:
+        sock.close()
+
+
+def _encode(message):
+    return json.dumps(message, default=str).encode("utf-8") + b"\n"
+
+
+def _file_stamp(path):
+    """Identify the version of a file or directory by path, size and mtime."""
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (str(path), None, None)
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+class WarmCache:
+    """
+    Values built from options and files, kept between requests.
+    
+    A value is rebuilt when its options change or one of the files it was
+    built from is modified.
+    """
+    
+    def __init__(self, build, size=WARM_CACHE_SIZE):
+        """
+        Initialize the cache.
+        
+        Args:
+            build (callable): Builds a value from an options dict
+            size (int): Values kept, least recently used dropped first
+        """
+        self.build = build
+        self.size = size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, options, paths=()):
+        """
+        Get the value built from options, building it if needed.
+        
+        Args:
+            options (dict): JSON-serializable options passed to build
+            paths (iterable): Files the value is built from
+        
+        Returns:
+            The cached or newly built value
+        """
+        key = (json.dumps(options, sort_keys=True, default=str), tuple(_file_stamp(path) for path in paths))
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+        
+        # Built outside the lock, so a slow build does not hold up
+        # requests for other values
+        value = self.build(options)
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > self.size:
+                self._values.popitem(last=False)
+        return value
+    
+    def __len__(self):
+        return len(self._values)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Runs one request and writes its progress and reply."""
+    
+    timeout = CLIENT_TIMEOUT
+    
+    def handle(self):
+        daemon = self.server.conversion_daemon
+        daemon.begin()
+        write_lock = threading.Lock()
+        
+        def send(message):
+            with write_lock:
+                self.wfile.write(_encode(message))
+                self.wfile.flush()
+        
+        try:
+            message = json.loads(self.rfile.readline())
+            if not isinstance(message, dict):
+                raise ValueError("expected a JSON object")
+            if message.get("version") != __version__:
+                send({"unavailable": f"daemon runs NetBridge {__version__}, not {message.get('version')}"})
+                return
+            send(daemon.dispatch(message.get("command"), message.get("options") or {},
+                                 lambda event: send({"progress": event})))
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            logger.warning("Client disconnected before the reply")
+        except ValueError as e:
+            send({"error": f"Invalid request: {str(e)}"})
+        finally:
+            daemon.end()
+
+
+class ConversionDaemon:
+    """
+    Serves commands on a Unix domain socket, one thread per connection.
+    
+    Commands are plain functions taking an options dict and a progress
+    callback and returning a JSON-serializable reply; they must be safe
+    to run from several threads at once. "ping" and "shutdown" are
+    built in.
+    """
+    
+    def __init__(self, socket_path, commands, idle_timeout=None):
+        """
+        Initialize the daemon.
+        
+        Args:
+            socket_path (Path): Socket to listen on
+            commands (dict): Command name -> function(options, progress)
+            idle_timeout (float): Stop after this many seconds without a
+                request. Runs until shut down if None.
+        """
+        self.socket_path = Path(socket_path)
+        self.commands = dict(commands)
+        self.idle_timeout = idle_timeout
+        self.started = None
+        self.requests = 0
+        self._active = 0
+        self._last_activity = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = None
+        self._stopped = threading.Event()
+    
+    def begin(self):
+        """Record the start of a request, which holds off the idle timeout."""
+        with self._lock:
+            self._active += 1
+            self.requests += 1
+    
+    def end(self):
+        """Record the end of a request."""
+        with self._lock:
+            self._active -= 1
+            self._last_activity = time.monotonic()
+    
+    def dispatch(self, command, options, progress):
+        """
+        Run a command.
+        
+        Returns:
+            dict: The {"reply": ...} or {"error": ...} message to send
+        """
+        if command == "ping":
+            return {"reply": {"pid": os.getpid(), "version": __version__, "requests": self.requests,
+                              "uptime": time.monotonic() - self.started}}
+        if command == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"reply": {"pid": os.getpid()}}
+        
+        function = self.commands.get(command)
+        if function is None:
+            return {"error": f"Unknown daemon command '{command}'"}
+        try:
+            return {"reply": function(options, progress)}
+        except Exception as e:
+            logger.exception(f"Daemon command {command} failed")
+            return {"error": str(e)}
+    
+    def serve(self):
+        """
+        Listen and serve requests until shut down or idle.
+        
+        Raises:
+            ValueError: If another daemon is listening on the socket
+        """
+        self._bind()
+        self.started = self._last_activity = time.monotonic()
+        if self.idle_timeout is not None:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        logger.info(f"Conversion daemon {os.getpid()} listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+            logger.info(f"Conversion daemon stopped after {self.requests} requests")
+    
+    def shutdown(self):
+        """Stop serving once the requests in progress have finished."""
+        if self._server is not None:
+            self._server.shutdown()
+    
+    def _bind(self):
+        if self.socket_path.exists():
+            # Left behind by a daemon that did not exit cleanly, unless one
+            # still answers on it
+            if request(self.socket_path, "ping") is not None:
+                raise ValueError(f"A conversion daemon is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        # Only the owner may connect; the daemon reads and writes files
+        # with the owner's permissions
+        umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+        self._server.conversion_daemon = self
+    
+    def _watch_idle(self):
+        while not self._stopped.wait(min(self.idle_timeout, 1.0)):
+            with self._lock:
+                idle = not self._active and time.monotonic() - self._last_activity > self.idle_timeout
+            if idle:
+                logger.info(f"Conversion daemon idle for {self.idle_timeout} seconds, stopping")
+                self.shutdown()
+                return
+    
+    def __repr__(self):
+        return f"ConversionDaemon(socket_path={self.socket_path})"
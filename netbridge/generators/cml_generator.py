@@ -0,0 +1,239 @@
+"""
+Generator for CML topology files from GNS3 projects.
+"""
+import os
+import re
+import uuid
+import logging
+from pathlib import Path
+from netbridge.utils.node_mappings import InverseNodeMappings
+from netbridge.utils.progress import reporter_for
+from netbridge.utils.interface_names import format_interface
+from netbridge.utils.compression import open_input, open_output, compressed_path, SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+# CML node definitions of built-in GNS3 node types without a mapping
+BUILTIN_NODE_DEFINITIONS = {
+    "cloud": "external_connector",
+    "nat": "external_connector",
+    "ethernet_switch": "unmanaged_switch",
+    "ethernet_hub": "unmanaged_switch",
+    "vpcs": "server",
+}
+
+# Node definition used for templates without a mapping
+DEFAULT_NODE_DEFINITION = "server"
+
+# Interface naming of node definitions whose mapping has no "cml" section
+DEFAULT_INTERFACE_FORMATS = {
+    "external_connector": "port",
+    "unmanaged_switch": "port{0}",
+}
+DEFAULT_INTERFACE_FORMAT = "eth{0}"
+
+# Characters that cannot appear as they are in a YAML scalar: those
+# outside the printable set, and line breaks other than \n
+_UNPRINTABLE = "[^\\x09\\x0a\\x20-\\x7e\\xa0-\\ud7ff\\ue000-\\ufffd\\U00010000-\\U0010ffff]|[\\x85\\u2028\\u2029\\ufeff]"
+_BLOCK_UNSAFE = re.compile(_UNPRINTABLE)
+_QUOTE_ESCAPES = re.compile(f'{_UNPRINTABLE}|[\\\\"\\x09\\x0a]')
+
+
+def _escape(match):
+    character = match.group(0)
+    if character in '\\"':
+        return "\\" + character
+    code = ord(character)
+    if code < 0x100:
+        return f"\\x{code:02x}"
+    return f"\\u{code:04x}" if code < 0x10000 else f"\\U{code:08x}"
+
+
+def _quote(value):
+    """Quote a string as a YAML double-quoted scalar on one line."""
+    return '"' + _QUOTE_ESCAPES.sub(_escape, str(value)) + '"'
+
+
+def _write_text(f, key, text, indent):
+    """
+    Write a multi-line string as a YAML literal block.
+    
+    An explicit indentation indicator keeps leading spaces and empty first
+    lines intact; the chomping indicator keeps the trailing newlines.
+    Text a literal block cannot hold is written double-quoted.
+    """
+    text = text.replace("\r\n", "\n")
+    body = text.rstrip("\n")
+    if not body or _BLOCK_UNSAFE.search(text):
+        f.write(f"{indent}{key}: {_quote(text)}\n")
+        return
+    
+    trailing = len(text) - len(body)
+    chomping = "-" if trailing == 0 else "" if trailing == 1 else "+"
+    f.write(f"{indent}{key}: |2{chomping}\n")
+    for line in body.split("\n") + [""] * (trailing - 1):
+        f.write(f"{indent}  {line}\n" if line else "\n")
+
+
+class _ConfigFiles:
+    """
+    Startup configurations found in a GNS3 project directory, by node ID.
+    
+    NetBridge projects keep them as configs/<name>_<node ID>.cfg, GNS3 as
+    project-files/<node type>/<node ID>/startup-config.cfg.
+    """
+    
+    def __init__(self, project_dir):
+        self.paths = {}
+        if project_dir is None:
+            return
+        project_dir = Path(project_dir)
+        
+        config_dir = project_dir / "configs"
+        if config_dir.is_dir():
+            for path in config_dir.iterdir():
+                name = path.name
+                for suffix in SUFFIXES.values():
+                    if name.endswith(suffix):
+                        name = name[:-len(suffix)]
+                        break
+                if name.endswith(".cfg") and "_" in name:
+                    self.paths[name[:-len(".cfg")].rsplit("_", 1)[1]] = path
+        
+        files_dir = project_dir / "project-files"
+        if files_dir.is_dir():
+            for path in files_dir.glob("*/*/startup-config.cfg"):
+                self.paths.setdefault(path.parent.name, path)
+    
+    def read(self, node_id):
+        """Get the configuration of a node, or None."""
+        path = self.paths.get(str(node_id))
+        if path is None:
+            return None
+        with open_input(path) as f:
+            return f.read()
+
+
+class CMLGenerator:
+    """
+    Generator for CML YAML topology files from parsed GNS3 projects.
+    
+    Node types are found by looking up each node's template, or failing
+    that its disk image, in an inverse index of the node mappings. Interface names come from the "cml" section
+    of a type's mapping, e.g. {"interface_format": "GigabitEthernet0/{0}"}.
+    """
+    
+    def generate(self, project, output_file, inverse_mappings=None, project_dir=None, compression=None,
+                 progress=None):
+        """
+        Generate a CML topology file from a GNS3 project.
+        
+        The file is written entry by entry, so the topology is never held
+        in memory as a document.
+        
+        Args:
+            project (GNS3Project): The parsed project
+            output_file (Path): CML YAML file to write
+            inverse_mappings (InverseNodeMappings): Index of the node
+                mappings by GNS3 template. Built-in defaults if None.
+            project_dir (Path): Project directory to read node
+                configurations from
+            compression (str): Compress the written file
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+        
+        Returns:
+            dict: Statistics about the generated topology
+        """
+        output_file = compressed_path(Path(output_file), compression)
+        logger.info(f"Generating CML topology {output_file}")
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        progress = reporter_for(progress)
+        if inverse_mappings is None:
+            inverse_mappings = InverseNodeMappings({})
+        configs = _ConfigFiles(project_dir)
+        
+        # Written under a temporary name, so a failed conversion never
+        # leaves a truncated topology behind
+        tmp_file = output_file.with_name(f".{output_file.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open_output(tmp_file, compression) as f:
+                f.write(f"topology:\n  name: {_quote(project.name)}\n")
+                if project.project_id:
+                    f.write(f"  description: {_quote(f'Converted from GNS3 project {project.project_id}')}\n")
+                nodes = self._write_nodes(f, project, inverse_mappings, configs, progress)
+                link_count = self._write_links(f, project, nodes, progress)
+            os.replace(tmp_file, output_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+        
+        logger.info(f"Created CML topology file: {output_file}")
+        return {
+            "project_file": str(output_file),
+            "node_count": len(nodes),
+            "link_count": link_count
+        }
+    
+    def _write_nodes(self, f, project, inverse_mappings, configs, progress):
+        """
+        Write the nodes section.
+        
+        Returns:
+            dict: GNS3 node ID -> (CML node ID, interface format, first
+            interface name)
+        """
+        nodes = {}
+        unmapped = set()
+        f.write("  nodes:" + ("\n" if project.nodes else " {}\n"))
+        for node in project.nodes.values():
+            node_definition, mapping = inverse_mappings.for_node(node)
+            if node_definition is None:
+                node_definition = BUILTIN_NODE_DEFINITIONS.get(str(node.node_type).lower(), DEFAULT_NODE_DEFINITION)
+                if node.node_type not in unmapped:
+                    unmapped.add(node.node_type)
+                    logger.warning(f"No mapping found for GNS3 template '{node.node_type}', "
+                                   f"using node definition {node_definition}")
+            settings = (mapping or {}).get("cml", {})
+            interface_format = settings.get(
+                "interface_format", DEFAULT_INTERFACE_FORMATS.get(node_definition, DEFAULT_INTERFACE_FORMAT)
+            )
+            
+            cml_id = f"n{len(nodes)}"
+            nodes[node.node_id] = (cml_id, interface_format, settings.get("first_interface_name"))
+            f.write(f"    {cml_id}:\n      label: {_quote(node.name)}\n"
+                    f"      node_definition: {_quote(node_definition)}\n"
+                    f"      x: {int(node.x)}\n      y: {int(node.y)}\n")
+            configuration = configs.read(node.node_id)
+            if configuration is not None:
+                _write_text(f, "configuration", configuration, "      ")
+            progress.advance(nodes=1)
+        return nodes
+    
+    def _write_links(self, f, project, nodes, progress):
+        """
+        Write the links section.
+        
+        Returns:
+            int: Number of links written
+        """
+        link_count = 0
+        f.write("  links:" + ("\n" if project.links else " {}\n"))
+        for link in project.links.values():
+            progress.advance(links=1)
+            ends = ((link.node1_id, link.adapter1, link.interface1), (link.node2_id, link.adapter2, link.interface2))
+            if any(node_id not in nodes for node_id, _, _ in ends):
+                logger.warning(f"Skipping link {link.link_id}: endpoint not found in node map")
+                continue
+            
+            f.write(f"    l{link_count}:\n")
+            for side, (node_id, adapter, port) in zip("ab", ends):
+                cml_id, interface_format, first_name = nodes[node_id]
+                # QEMU nodes number their NICs by adapter, NetBridge
+                # projects by port
+                port = adapter if adapter else port
+                f.write(f"      node_{side}: {cml_id}\n"
+                        f"      interface_{side}: {_quote(format_interface(interface_format, port, first_name))}\n")
+            link_count += 1
+        return link_count
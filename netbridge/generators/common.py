@@ -0,0 +1,55 @@
+"""
+Helpers shared by the project generators.
+"""
+import contextlib
+
+
+@contextlib.contextmanager
+def config_chunks(node):
+    """
+    Open the configuration of a node for writing elsewhere.
+    
+    Spilled configurations are streamed line by line from their spill file
+    instead of being loaded.
+    
+    Args:
+        node: A CMLNode or VIRLNode
+    
+    Yields:
+        Iterable of configuration text, or None if the node has none
+    """
+    spilled_config = getattr(node, 'config_file', None)
+    if spilled_config:
+        with open(spilled_config, 'r') as src:
+            yield src
+    elif node.configuration:
+        yield (node.configuration,)
+    else:
+        yield None
+
+
+def write_config(f, chunks, rename=None):
+    """
+    Write a configuration with normalized line endings.
+    
+    Line endings are written as newlines (universal newline reading
+    already converts them for spilled files) and a final newline is added
+    if missing.
+    
+    Args:
+        f: Text file to write
+        chunks: Iterable of configuration text, e.g. the lines of a file
+        rename (callable): Optional interface renamer applied to each chunk
+    """
+    last = ""
+    for chunk in chunks:
+        # Only copy the chunk for its line endings if it has any to convert
+        if "\r" in chunk:
+            chunk = chunk.replace("\r\n", "\n")
+        if rename is not None:
+            chunk = rename(chunk)
+        if chunk:
+            f.write(chunk)
+            last = chunk
+    if not last.endswith("\n"):
+        f.write("\n")
@@ -0,0 +1,142 @@
+"""
+Generator for containerlab topology files.
+"""
+import re
+import json
+import logging
+from pathlib import Path
+from netbridge.utils.node_mappings import map_nodes
+from netbridge.utils.progress import reporter_for
+from netbridge.utils.interface_names import interface_port, format_interface
+from netbridge.generators.common import config_chunks, write_config
+
+logger = logging.getLogger(__name__)
+
+# Kind used for node types without containerlab settings
+DEFAULT_KIND = "linux"
+
+# Interface naming of containerlab nodes; eth0 is the management interface
+DEFAULT_INTERFACE_FORMAT = "eth{port1}"
+
+
+def _name(text):
+    """Make a name usable in containerlab node and container names."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", str(text)).strip("-") or "node"
+
+
+def _scalar(value):
+    """Quote a string as a YAML scalar (JSON strings are valid YAML)."""
+    return json.dumps(str(value))
+
+
+class ContainerlabGenerator:
+    """
+    Generator for containerlab topology files from parsed CML/VIRL topologies.
+    
+    Node kinds, images and interface names come from the "containerlab"
+    section of each node type's mapping, e.g.
+    {"kind": "cisco_csr1000v", "image": "vrnetlab/vr-csr:17.03", "interface_format": "eth{port1}"}.
+    """
+    
+    # containerlab only reads plain topology and startup configuration files
+    supports_compression = False
+    
+    def generate(self, topology, output_dir, project_id=None, node_mappings=None, progress=None, **options):
+        """
+        Generate a containerlab topology from a parsed topology.
+        
+        The topology file is written line by line, so large labs are
+        never held in memory as a document. Node configurations are
+        written to configs/ and used as startup configurations.
+        
+        Args:
+            topology: The parsed topology (CMLTopology or VIRLTopology)
+            output_dir (Path): Directory to save the topology file
+            project_id (str): Unused, accepted for a common generator interface
+            node_mappings (NodeMappingResult): Result of map_nodes for the
+                topology
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            **options: Other GNS3Generator.generate options, ignored.
+                Converter rejects compression for this target.
+        
+        Returns:
+            dict: Statistics about the generated topology
+        """
+        logger.info(f"Generating containerlab topology in {output_dir}")
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        progress = reporter_for(progress)
+        if node_mappings is None:
+            node_mappings = map_nodes(topology, {})
+        
+        lab_name = _name(topology.name)
+        topology_file = output_dir / f"{lab_name}.clab.yml"
+        names = {}  # node ID -> (containerlab name, interface format)
+        used = set()
+        missing_kinds = set()
+        link_count = 0
+        
+        with open(topology_file, "w") as f:
+            f.write(f"name: {_scalar(lab_name)}\ntopology:\n  nodes:")
+            for node in topology.nodes.values():
+                settings = node_mappings.for_node(node).targets.get("containerlab", {})
+                if "kind" not in settings and node.node_type not in missing_kinds:
+                    missing_kinds.add(node.node_type)
+                    logger.warning(f"No containerlab kind for node type '{node.node_type}', using {DEFAULT_KIND}")
+                
+                name = _name(node.label)
+                while name in used:
+                    name = f"{name}-{len(used)}"
+                used.add(name)
+                names[node.id] = (name, settings.get("interface_format", DEFAULT_INTERFACE_FORMAT))
+                
+                f.write(f"\n    {_scalar(name)}:\n      kind: {_scalar(settings.get('kind', DEFAULT_KIND))}")
+                if settings.get("image"):
+                    f.write(f"\n      image: {_scalar(settings['image'])}")
+                if self._write_startup_config(node, output_dir, name):
+                    f.write(f"\n      startup-config: {_scalar(f'configs/{name}.cfg')}")
+                f.write(f"\n      labels:\n        netbridge.node-id: {_scalar(node.id)}")
+                progress.advance(nodes=1)
+            if not names:
+                f.write(" {}")
+            
+            f.write("\n  links:")
+            for link in topology.links.values():
+                progress.advance(links=1)
+                if link.node1_id not in names or link.node2_id not in names:
+                    logger.warning(f"Skipping link {link.id}: endpoint not found in node map")
+                    continue
+                endpoints = ", ".join(
+                    _scalar(f"{names[node_id][0]}:{format_interface(names[node_id][1], interface_port(interface))}")
+                    for node_id, interface in ((link.node1_id, link.interface1), (link.node2_id, link.interface2))
+                )
+                f.write(f"\n    - endpoints: [{endpoints}]")
+                link_count += 1
+            if not link_count:
+                f.write(" []")
+            f.write("\n")
+        
+        logger.info(f"Created containerlab topology file: {topology_file}")
+        return {
+            "project_file": str(topology_file),
+            "node_count": len(names),
+            "link_count": link_count
+        }
+    
+    def _write_startup_config(self, node, output_dir, name):
+        """
+        Write the configuration of a node to configs/.
+        
+        Returns:
+            bool: True if the node has a configuration
+        """
+        with config_chunks(node) as chunks:
+            if chunks is None:
+                return False
+            config_dir = output_dir / "configs"
+            config_dir.mkdir(exist_ok=True)
+            with open(config_dir / f"{name}.cfg", "w") as f:
+                write_config(f, chunks)
+        return True
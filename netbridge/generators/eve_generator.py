@@ -0,0 +1,190 @@
+"""
+Generator for EVE-NG lab files.
+"""
+import re
+import base64
+import logging
+from pathlib import Path
+from xml.sax.saxutils import quoteattr, escape
+from netbridge.utils.node_mappings import map_nodes
+from netbridge.utils.progress import reporter_for
+from netbridge.utils.interface_names import interface_port
+from netbridge.generators.common import config_chunks
+
+logger = logging.getLogger(__name__)
+
+# Template used for node types without EVE-NG settings
+DEFAULT_TEMPLATE = "linux"
+
+# Margin kept between the nodes and the top left corner of the canvas
+CANVAS_MARGIN = 50
+
+
+def _attrs(**attrs):
+    """Format XML attributes, skipping unset ones."""
+    return "".join(f" {key}={quoteattr(str(value))}" for key, value in attrs.items() if value is not None)
+
+
+class EVENGGenerator:
+    """
+    Generator for EVE-NG .unl lab files from parsed CML/VIRL topologies.
+    
+    Node templates and images come from the "eve-ng" section of each node
+    type's mapping, e.g. {"template": "vios", "image": "vios-adventerprisek9-m.SPA.159-3.M6"}.
+    A mapping with a "network" (e.g. "pnet0") turns the node into an EVE-NG
+    cloud network instead. Every other link becomes a hidden bridge network.
+    """
+    
+    # EVE-NG only imports plain .unl files
+    supports_compression = False
+    
+    def generate(self, topology, output_dir, project_id=None, node_mappings=None, progress=None, **options):
+        """
+        Generate an EVE-NG lab from a parsed topology.
+        
+        Args:
+            topology: The parsed topology (CMLTopology or VIRLTopology)
+            output_dir (Path): Directory to save the lab file
+            project_id (str): Optional lab UUID
+            node_mappings (NodeMappingResult): Result of map_nodes for the
+                topology
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            **options: Other GNS3Generator.generate options, ignored.
+                Converter rejects compression for this target.
+        
+        Returns:
+            dict: Statistics about the generated lab
+        """
+        logger.info(f"Generating EVE-NG lab in {output_dir}")
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        progress = reporter_for(progress)
+        if node_mappings is None:
+            node_mappings = map_nodes(topology, {})
+        
+        # First pass: number nodes and cloud networks, find the canvas origin
+        node_numbers = {}  # node ID -> EVE node ID
+        clouds = {}  # node ID -> (EVE network ID, network type, label, x, y)
+        min_x = min_y = 0
+        for node in topology.nodes.values():
+            settings = self._settings(node_mappings, node)
+            if settings.get("network"):
+                clouds[node.id] = (len(clouds) + 1, settings["network"], node.label, node.x, node.y)
+            else:
+                node_numbers[node.id] = len(node_numbers) + 1
+            min_x = min(min_x, int(node.x))
+            min_y = min(min_y, int(node.y))
+            progress.advance(nodes=1)
+        
+        # Attach every link end to a network: the cloud it leads to, or a
+        # bridge network of its own
+        interfaces = {}  # EVE node ID -> [(port, interface name, network ID)]
+        bridges = []  # (network ID, name)
+        link_count = 0
+        for link in topology.links.values():
+            progress.advance(links=1)
+            ends = ((link.node1_id, link.interface1), (link.node2_id, link.interface2))
+            if any(node_id not in node_numbers and node_id not in clouds for node_id, _ in ends):
+                logger.warning(f"Skipping link {link.id}: endpoint not found in node map")
+                continue
+            cloud_ends = [node_id for node_id, _ in ends if node_id in clouds]
+            if len(cloud_ends) == 2:
+                logger.warning(f"Skipping link {link.id}: it connects two cloud networks")
+                continue
+            if cloud_ends:
+                network_id = clouds[cloud_ends[0]][0]
+            else:
+                network_id = len(clouds) + len(bridges) + 1
+                bridges.append((network_id, f"Net-{link.id}"))
+            for node_id, interface in ends:
+                if node_id in node_numbers:
+                    interfaces.setdefault(node_numbers[node_id], []).append(
+                        (interface_port(interface), interface, network_id)
+                    )
+            link_count += 1
+        
+        lab_file = output_dir / f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', topology.name)}.unl"
+        has_configs = False
+        with open(lab_file, "w") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n')
+            f.write(f"<lab{_attrs(name=topology.name, id=project_id, version=1, scripttimeout=300, lock=0)}>\n")
+            if getattr(topology, 'description', None):
+                f.write(f"  <description>{escape(topology.description)}</description>\n")
+            f.write("  <topology>\n    <nodes>\n")
+            for node in topology.nodes.values():
+                number = node_numbers.get(node.id)
+                if number is None:
+                    continue
+                has_config = self._has_config(node)
+                has_configs = has_configs or has_config
+                self._write_node(f, node, number, self._settings(node_mappings, node), interfaces.get(number, ()),
+                                 has_config, min_x, min_y)
+            f.write("    </nodes>\n    <networks>\n")
+            for network_id, network_type, label, x, y in clouds.values():
+                position = _attrs(left=int(x) - min_x + CANVAS_MARGIN, top=int(y) - min_y + CANVAS_MARGIN)
+                f.write(f"      <network{_attrs(id=network_id, type=network_type, name=label)}{position}"
+                        f"{_attrs(visibility=1)}/>\n")
+            for network_id, name in bridges:
+                f.write(f"      <network{_attrs(id=network_id, type='bridge', name=name, visibility=0)}/>\n")
+            f.write("    </networks>\n  </topology>\n")
+            
+            # Configurations are embedded base64 encoded, read again one
+            # node at a time
+            if has_configs:
+                f.write("  <objects>\n    <configs>\n")
+                for node in topology.nodes.values():
+                    if node.id not in node_numbers:
+                        continue
+                    with config_chunks(node) as chunks:
+                        if chunks is None:
+                            continue
+                        text = "".join(chunks).replace("\r\n", "\n")
+                    encoded = base64.b64encode(text.encode("utf-8")).decode("ascii")
+                    f.write(f"      <config{_attrs(id=node_numbers[node.id])}>{encoded}</config>\n")
+                f.write("    </configs>\n  </objects>\n")
+            f.write("</lab>\n")
+        
+        logger.info(f"Created EVE-NG lab file: {lab_file}")
+        return {
+            "project_file": str(lab_file),
+            "node_count": len(node_numbers) + len(clouds),
+            "link_count": link_count
+        }
+    
+    @staticmethod
+    def _settings(node_mappings, node):
+        return node_mappings.for_node(node).targets.get("eve-ng", {})
+    
+    @staticmethod
+    def _has_config(node):
+        return bool(node.configuration or getattr(node, 'config_file', None))
+    
+    def _write_node(self, f, node, number, settings, node_interfaces, has_config, min_x, min_y):
+        """Write a node element with its interfaces."""
+        ports = max((port for port, _, _ in node_interfaces), default=-1) + 1
+        attrs = _attrs(
+            id=number,
+            name=node.label,
+            type=settings.get("type", "qemu"),
+            template=settings.get("template", DEFAULT_TEMPLATE),
+            image=settings.get("image"),
+            console=settings.get("console", "telnet"),
+            cpu=settings.get("cpu", 1),
+            ram=settings.get("ram", 1024),
+            ethernet=max(ports, settings.get("ethernet", 4)),
+            delay=0,
+            icon=settings.get("icon", "Router.png"),
+            config=1 if has_config else 0,
+            left=int(node.x) - min_x + CANVAS_MARGIN,
+            top=int(node.y) - min_y + CANVAS_MARGIN
+        )
+        if not node_interfaces:
+            f.write(f"      <node{attrs}/>\n")
+            return
+        f.write(f"      <node{attrs}>\n")
+        for port, name, network_id in node_interfaces:
+            name = name if name is not None else port
+            f.write(f"        <interface{_attrs(id=port, name=name, type='ethernet', network_id=network_id)}/>\n")
+        f.write("      </node>\n")
@@ -3,32 +3,131 @@ Generator for GNS3 project files.
 """
 import os
 import json
-import shutil
-import logging
 import uuid
+import logging
+import threading
+import multiprocessing
+from collections import namedtuple
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from netbridge.models.gns3_model import GNS3Project, GNS3Node, GNS3Link
+from netbridge.utils.node_mappings import map_nodes
+from netbridge.utils.compression import open_output, compressed_path
+from netbridge.utils.progress import reporter_for
+from netbridge.utils.schemas import validate_element, validate_document
+from netbridge.utils.interface_names import interface_port, format_interface, interface_renamer
+from netbridge.utils.image_staging import ImageStager
+from netbridge.generators.common import config_chunks, write_config
 
 logger = logging.getLogger(__name__)
 
+# Nodes or links handled per task
+CHUNK_SIZE = 2000
+
+# Indentation of node and link entries in the project file
+FRAGMENT_INDENT = " " * 6
+
+# Everything a chunk of nodes or links needs. Process pool workers inherit
+# it from the parent when they are forked instead of receiving a pickled
+# copy with each chunk.
+_GenerateState = namedtuple("_GenerateState", [
+    "generator", "nodes", "links", "node_ids", "link_map", "index", "project_id",
+    "mappings", "image_index", "compression", "output_dir", "validate", "resources"
+])
+
+_shared_state = None
+_shared_state_lock = threading.Lock()
+
+# Built-in GNS3 templates. None of them runs an emulator taking a base MAC
+# address, and some have no console either.
+_BUILTIN_TEMPLATES = frozenset({
+    "cloud", "nat", "ethernet switch", "ethernet hub", "vpcs", "frame relay switch", "atm switch", "traceng"
+})
+_CONSOLELESS_TEMPLATES = frozenset({"cloud", "nat", "ethernet hub", "frame relay switch", "atm switch"})
+
+
+def resource_needs(mapping):
+    """
+    Get the resources a GNS3 node uses.
+    
+    Args:
+        mapping (NodeMapping): Mapping of the node
+    
+    Returns:
+        tuple: Whether the node uses a console port and whether it uses a
+        base MAC address
+    """
+    template = str(mapping.gns3_template).casefold().replace("_", " ")
+    console = mapping.console_type != "none" and template not in _CONSOLELESS_TEMPLATES
+    return console, template not in _BUILTIN_TEMPLATES
+
+
+def resource_count(topology, node_mappings):
+    """
+    Get the number of nodes to reserve resources for (see ResourceAllocator).
+    
+    Console ports and MAC address blocks are reserved in pairs, so this is
+    the larger of the number of nodes using either.
+    
+    Args:
+        topology: The parsed topology
+        node_mappings (NodeMappingResult): Result of map_nodes for the
+            topology
+    
+    Returns:
+        int: Number of resource pairs the topology's nodes use
+    """
+    consoles = macs = 0
+    for node in topology.nodes.values():
+        console, mac = resource_needs(node_mappings.for_node(node))
+        consoles += console
+        macs += mac
+    return max(consoles, macs)
+
 
 class GNS3Generator:
     """
     Generator for GNS3 project files from parsed CML/VIRL topologies.
     """
     
+    # GNS3 reads compressed project files and configurations
+    supports_compression = True
+    
     def __init__(self):
         """Initialize the GNS3 generator."""
         pass
     
-    def generate(self, topology, output_dir, project_id=None):
+    def generate(self, topology, output_dir, project_id=None, node_mappings=None, image_index=None,
+                 compression=None, progress=None, workers=None, validate=True, resources=None):
         """
         Generate a GNS3 project from a parsed topology.
         
+        Node and link IDs are derived from the project ID and the source
+        IDs, so the same project ID always produces the same project file.
+        
         Args:
             topology: The parsed topology (CMLTopology or VIRLTopology)
             output_dir (Path): Directory to save the GNS3 project
             project_id (str): Optional project UUID
+            node_mappings (NodeMappingResult): Result of map_nodes for the
+                topology. Nodes are mapped to generic QEMU nodes if omitted.
+            image_index (ImageIndex): Optional index used to set the disk
+                image of each node from its image definition
+            compression (str): Compress the project file and configurations
+                with gzip, bz2, xz or zstd. None writes them uncompressed.
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            workers (int): Process nodes and links in chunks across this
+                many forked worker processes. None or 1 works in-process.
+                Forking is only safe while no other thread of the process
+                may hold a lock, so do not use workers from threads.
+            validate (bool): Check each generated node and link against the
+                GNS3 project schema. Disable on trusted hot paths.
+            resources (Reservation): Console ports and base MAC addresses
+                reserved for the nodes using them, in topology order (see
+                ResourceAllocator and resource_count). None leaves both to
+                the GNS3 server.
             
         Returns:
             dict: Statistics about the generated project
@@ -39,68 +138,345 @@ class GNS3Generator:
         logger.info(f"Generating GNS3 project in {output_dir}")
         output_dir = Path(output_dir)
         
+        progress = reporter_for(progress)
+        if node_mappings is None:
+            node_mappings = map_nodes(topology, {})
+        
         # Create output directory if needed
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Create GNS3 project structure
         project = GNS3Project(
             name=topology.name,
             project_id=project_id or str(uuid.uuid4())
         )
+        state = _GenerateState(
+            generator=self,
+            nodes=_sequence(topology.nodes.values()),
+            links=_sequence(topology.links.values()),
+            node_ids=topology.nodes.keys(),
+            link_map=topology.links,
+            index=topology.index,
+            project_id=project.project_id,
+            mappings=node_mappings,
+            image_index=image_index,
+            compression=compression,
+            output_dir=output_dir,
+            validate=validate,
+            resources=resources
+        )
         
-        # Map nodes from source topology to GNS3 nodes
-        node_map = {}  # Maps original node IDs to GNS3 node UUIDs
+        node_chunks = _node_chunks(state)
+        link_chunks = [(start, min(start + CHUNK_SIZE, len(state.links)))
+                       for start in range(0, len(state.links), CHUNK_SIZE)]
         
-        for node in topology.nodes.values():
-            # Create a GNS3 node from the topology node
-            gns3_node = GNS3Node(
-                name=node.label,
-                node_type=node.gns3_template if hasattr(node, 'gns3_template') else "qemu",
-                node_id=str(uuid.uuid4()),
-                console_type=node.console_type if hasattr(node, 'console_type') else "telnet",
-                x=int(node.x),
-                y=int(node.y)
-            )
-            
-            project.add_node(gns3_node)
-            node_map[node.id] = gns3_node.node_id
-            
-            # If node has configuration, save it to project directory
-            if node.configuration:
-                config_dir = output_dir / "configs"
-                config_dir.mkdir(exist_ok=True)
-                
-                config_file = config_dir / f"{gns3_node.name}_{gns3_node.node_id}.cfg"
-                with open(config_file, 'w') as f:
-                    f.write(node.configuration)
-                
-                logger.debug(f"Saved configuration for node {node.id} to {config_file}")
-        
-        # Create links between GNS3 nodes
-        for link in topology.links.values():
-            # Check if both endpoints exist in our node map
-            if link.node1_id in node_map and link.node2_id in node_map:
-                gns3_link = GNS3Link(
-                    link_id=str(uuid.uuid4()),
-                    node1_id=node_map[link.node1_id],
-                    node2_id=node_map[link.node2_id],
-                    interface1=link.interface1,
-                    interface2=link.interface2
+        if workers and workers > 1 and len(node_chunks) + len(link_chunks) > 1:
+            if "fork" in multiprocessing.get_all_start_methods():
+                return self._write_parallel(project, state, node_chunks, link_chunks, workers, progress)
+            logger.warning("Parallel generation needs the 'fork' start method, generating in-process")
+        
+        node_results = (_render_nodes(state, *chunk) for chunk in node_chunks)
+        link_results = (_render_links(state, *chunk) for chunk in link_chunks)
+        return self._write_project(project, state, node_results, link_results, progress)
+    
+    def _write_parallel(self, project, state, node_chunks, link_chunks, workers, progress):
+        """Render chunks across forked workers sharing the generation state."""
+        global _shared_state
+        
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # Fork pools start all their workers on the first submit, so
+            # the state only has to be shared while submitting
+            with _shared_state_lock:
+                _shared_state = state
+                try:
+                    node_futures = [executor.submit(_render_shared_nodes, *chunk) for chunk in node_chunks]
+                    link_futures = [executor.submit(_render_shared_links, *chunk) for chunk in link_chunks]
+                finally:
+                    _shared_state = None
+            try:
+                # Results are merged in submission order, however the
+                # workers finish
+                return self._write_project(
+                    project, state,
+                    (future.result() for future in node_futures),
+                    (future.result() for future in link_futures),
+                    progress
                 )
-                project.add_link(gns3_link)
-            else:
-                logger.warning(f"Skipping link {link.id}: endpoint not found in node map")
+            finally:
+                for future in node_futures + link_futures:
+                    future.cancel()
+    
+    def _write_project(self, project, state, node_results, link_results, progress):
+        """
+        Write the project file from rendered node and link fragments.
         
-        # Write project file
-        project_file = output_dir / f"{project.name}.gns3"
-        with open(project_file, 'w') as f:
-            json.dump(project.to_dict(), f, indent=2)
+        The output matches json.dump(project.to_dict(), indent=2) for the
+        same nodes and links.
+        """
+        envelope = project.to_dict()
+        if state.validate:
+            validate_document("gns3", envelope)
+        del envelope["topology"]
+        
+        project_file = compressed_path(state.output_dir / f"{project.name}.gns3", state.compression)
+        with open_output(project_file, state.compression) as f:
+            f.write(json.dumps(envelope, indent=2)[:-2] + ',\n  "topology": {\n    "nodes": ')
+            node_count = self._write_fragments(f, node_results, progress, "nodes")
+            f.write(',\n    "links": ')
+            link_count = self._write_fragments(f, link_results, progress, "links")
+            f.write("\n  }\n}")
         
         logger.info(f"Created GNS3 project file: {project_file}")
         
         # Return statistics
         return {
             "project_file": str(project_file),
-            "node_count": len(project.nodes),
-            "link_count": len(project.links)
-        }
\ No newline at end of file
+            "node_count": node_count,
+            "link_count": link_count
+        }
+    
+    def _write_fragments(self, f, results, progress, kind):
+        """Write a JSON list from chunks of rendered fragments."""
+        count = 0
+        for fragments, written, processed in results:
+            if written:
+                f.write(",\n" if count else "[\n")
+                f.write(fragments)
+                count += written
+            progress.advance(**{kind: processed})
+            progress.check()
+        f.write("\n    ]" if count else "[]")
+        return count
+    
+    def stage_images(self, topology, images_dir, image_index, stager=None, progress=None, reuse_dir=None):
+        """
+        Place the disk images used by a topology's nodes into a directory.
+        
+        Images are resolved like the hda_disk_image of the generated
+        nodes, and each image is staged once however many nodes use it.
+        
+        Args:
+            topology: The parsed topology (CMLTopology or VIRLTopology)
+            images_dir (Path): Directory to place the images in, normally
+                images/ next to the project file
+            image_index (ImageIndex): Index to resolve images against
+            stager (ImageStager): Stager with the concurrency and bandwidth
+                limits to use. Defaults to ImageStager().
+            progress (ProgressReporter): Optional cancellation check
+            reuse_dir (Path): Images directory of an earlier staging to
+                hardlink current images from, see ImageStager.stage
+        
+        Returns:
+            dict: Staging statistics, see ImageStager.stage
+        
+        Raises:
+            ValueError: If an image cannot be staged
+        """
+        images = {}  # file name -> (path, index entry)
+        resolved = set()
+        for node in topology.nodes.values():
+            image_name = getattr(node, 'image_definition', None) or getattr(node, 'image', None)
+            if not image_name or image_name in resolved:
+                continue
+            resolved.add(image_name)
+            match = image_index.resolve(image_name)
+            if match is None:
+                continue
+            
+            path, entry = match
+            name = os.path.basename(path)
+            if name in images and images[name][0] != path:
+                # Nodes name their image by file name only
+                logger.warning(f"Not staging {path}: {images[name][0]} has the same file name")
+                continue
+            images[name] = (path, entry)
+        
+        return (stager or ImageStager()).stage(images, images_dir, progress, reuse_dir=reuse_dir)
+    
+    def _image_properties(self, node, image_index):
+        """
+        Resolve the disk image properties of a node.
+        
+        Args:
+            node: A CMLNode or VIRLNode
+            image_index (ImageIndex): Index to resolve images against
+            
+        Returns:
+            dict: GNS3 node properties for the image, empty if unresolved
+        """
+        if image_index is None:
+            return {}
+        
+        # CML nodes name an image definition, VIRL nodes an image
+        image_name = getattr(node, 'image_definition', None) or getattr(node, 'image', None)
+        resolved = image_index.resolve(image_name)
+        if resolved is None:
+            if image_name:
+                logger.warning(f"No indexed image found for '{image_name}' (node ID: {node.id})")
+            return {}
+        
+        path, entry = resolved
+        return {
+            "hda_disk_image": os.path.basename(path),
+            "hda_disk_image_md5sum": entry["md5"]
+        }
+
+def _sequence(values):
+    """
+    Get nodes or links as a sequence chunks can be sliced from.
+    
+    Stored topologies return sequences that read each slice from their
+    store; other topologies are copied into a list.
+    """
+    return values if isinstance(values, Sequence) else list(values)
+
+
+def _node_uuid(project_id, node_id):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{project_id}/nodes/{node_id}"))
+
+
+def _fragment(data):
+    """Serialize a node or link as an indented project file entry."""
+    return FRAGMENT_INDENT + json.dumps(data, indent=2).replace("\n", "\n" + FRAGMENT_INDENT)
+
+
+def _node_chunks(state):
+    """
+    Split the nodes into chunks.
+    
+    Returns:
+        list: (start, end, console index, MAC index) of each chunk, the
+        indexes being the first reserved console port and MAC block its
+        nodes use
+    """
+    chunks = []
+    consoles = macs = 0
+    for start in range(0, len(state.nodes), CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, len(state.nodes))
+        chunks.append((start, end, consoles, macs))
+        if state.resources is not None:
+            for node in state.nodes[start:end]:
+                console, mac = resource_needs(state.mappings.for_node(node))
+                consoles += console
+                macs += mac
+    return chunks
+
+
+def _render_nodes(state, start, end, console_index=0, mac_index=0):
+    """
+    Map a chunk of nodes, write their configurations and serialize them.
+    
+    Nodes using a console or base MAC address take the reserved ones in
+    turn, starting at the given indexes of the reservation.
+    
+    Returns:
+        tuple: The joined JSON fragments, their number and the number of
+        nodes processed
+    """
+    fragments = []
+    config_dir = state.output_dir / "configs"
+    
+    for node in state.nodes[start:end]:
+        # Create a GNS3 node from the topology node
+        mapping = state.mappings.for_node(node)
+        properties = state.generator._image_properties(node, state.image_index)
+        console = None
+        if state.resources is not None:
+            uses_console, uses_mac = resource_needs(mapping)
+            if uses_console:
+                console = state.resources.console_port(console_index)
+                console_index += 1
+            if uses_mac:
+                properties["mac_address"] = state.resources.mac_address(mac_index)
+                mac_index += 1
+        gns3_node = GNS3Node(
+            name=str(node.label),
+            node_type=mapping.gns3_template,
+            node_id=_node_uuid(state.project_id, node.id),
+            console_type=mapping.console_type,
+            x=int(node.x),
+            y=int(node.y),
+            properties=properties,
+            console=console
+        )
+        data = gns3_node.to_dict()
+        if state.validate:
+            validate_element("gns3", "node", data, f"generated node {node.id}")
+        fragments.append(_fragment(data))
+        
+        # If node has configuration, save it to project directory
+        with config_chunks(node) as chunks:
+            if chunks is None:
+                continue
+            config_dir.mkdir(exist_ok=True)
+            
+            config_file = compressed_path(
+                config_dir / f"{gns3_node.name}_{gns3_node.node_id}.cfg", state.compression
+            )
+            rename = interface_renamer(_interface_renames(state, node, mapping))
+            with open_output(config_file, state.compression) as f:
+                write_config(f, chunks, rename)
+        
+        logger.debug(f"Saved configuration for node {node.id} to {config_file}")
+    
+    return ",\n".join(fragments), len(fragments), end - start
+
+
+def _render_links(state, start, end):
+    """
+    Resolve the endpoints of a chunk of links and serialize them.
+    
+    Returns:
+        tuple: The joined JSON fragments, their number and the number of
+        links processed
+    """
+    fragments = []
+    for link in state.links[start:end]:
+        # Check if both endpoints exist in the topology
+        if link.node1_id in state.node_ids and link.node2_id in state.node_ids:
+            gns3_link = GNS3Link(
+                link_id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{state.project_id}/links/{link.id}")),
+                node1_id=_node_uuid(state.project_id, link.node1_id),
+                node2_id=_node_uuid(state.project_id, link.node2_id),
+                interface1=link.interface1,
+                interface2=link.interface2
+            )
+            data = gns3_link.to_dict()
+            if state.validate:
+                validate_element("gns3", "link", data, f"generated link {link.id}")
+            fragments.append(_fragment(data))
+        else:
+            logger.warning(f"Skipping link {link.id}: endpoint not found in node map")
+    
+    return ",\n".join(fragments), len(fragments), end - start
+
+
+def _render_shared_nodes(start, end, console_index, mac_index):
+    return _render_nodes(_shared_state, start, end, console_index, mac_index)
+
+
+def _render_shared_links(start, end):
+    return _render_links(_shared_state, start, end)
+
+
+def _interface_renames(state, node, mapping):
+    """
+    Get the new names of a node's linked interfaces under its mapping.
+    
+    Returns:
+        dict: Old interface name -> name following the mapping's
+        interface format, empty if the mapping has no format
+    """
+    if not mapping.interface_format:
+        return {}
+    
+    renames = {}
+    for link_id in state.index.incident_links(node.id):
+        link = state.link_map[link_id]
+        for node_id, interface in ((link.node1_id, link.interface1), (link.node2_id, link.interface2)):
+            if node_id == node.id and isinstance(interface, str):
+                renames[interface] = format_interface(
+                    mapping.interface_format, interface_port(interface), mapping.first_interface_name
+                )
+    return renames
+
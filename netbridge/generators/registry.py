@@ -0,0 +1,60 @@
+"""
+Registry of the project generators by target format.
+"""
+import importlib
+
+DEFAULT_TARGET = "gns3"
+
+# Built-in generators are named by "module:class" and imported on first
+# use, so listing the targets stays cheap for the CLI
+_GENERATORS = {
+    "gns3": "netbridge.generators.gns3_generator:GNS3Generator",
+    "containerlab": "netbridge.generators.containerlab_generator:ContainerlabGenerator",
+    "eve-ng": "netbridge.generators.eve_generator:EVENGGenerator"
+}
+
+
+def register_generator(target, generator_class):
+    """
+    Register a generator for a target format.
+    
+    Generator classes are instantiated without arguments and must provide
+    generate(topology, output_dir, project_id, node_mappings, progress=None,
+    **options) returning a dict with project_file, node_count and
+    link_count. Generators that can write compressed output set the class
+    attribute supports_compression to True.
+    
+    Args:
+        target (str): Target format name, e.g. "containerlab"
+        generator_class (type): Generator class, replacing any registered
+            for the target
+    """
+    _GENERATORS[target] = generator_class
+
+
+def get_generator(target):
+    """
+    Create the generator of a target format.
+    
+    Args:
+        target (str): Target format name
+    
+    Returns:
+        A new generator instance
+    
+    Raises:
+        ValueError: If no generator is registered for the target
+    """
+    try:
+        generator_class = _GENERATORS[target]
+    except KeyError:
+        raise ValueError(f"Unknown target '{target}', expected one of {', '.join(target_names())}")
+    if isinstance(generator_class, str):
+        module_name, class_name = generator_class.split(":")
+        generator_class = _GENERATORS[target] = getattr(importlib.import_module(module_name), class_name)
+    return generator_class()
+
+
+def target_names():
+    """Get the names of the registered target formats."""
+    return list(_GENERATORS)
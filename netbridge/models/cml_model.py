@@ -1,6 +1,7 @@
 """
 Models for CML topologies.
 """
+from netbridge.models.topology_index import TopologyIndex
 
 
 class CMLTopology:
@@ -22,14 +23,35 @@ class CMLTopology:
         self.notes = notes or ""
         self.nodes = {}  # id -> CMLNode
         self.links = {}  # id -> CMLLink
+        self._index = None
+    
+    @property
+    def index(self):
+        """
+        Adjacency index of the topology, built on first use.
+        
+        Kept up to date by add_node/add_link; changing nodes or links
+        directly requires calling reset_index().
+        """
+        if self._index is None:
+            self._index = TopologyIndex(self)
+        return self._index
+    
+    def reset_index(self):
+        """Drop the adjacency index so it is rebuilt on next use."""
+        self._index = None
     
     def add_node(self, node):
         """Add a node to the topology."""
         self.nodes[node.id] = node
+        if self._index is not None:
+            self._index.add_node(node.id)
     
     def add_link(self, link):
         """Add a link to the topology."""
         self.links[link.id] = link
+        if self._index is not None:
+            self._index.add_link(link)
     
     def __repr__(self):
         return f"CMLTopology(name={self.name}, nodes={len(self.nodes)}, links={len(self.links)})"
@@ -62,9 +84,8 @@ class CMLNode:
         self.image_definition = image_definition
         self.interfaces = []
         
-        # Will be filled in during node mapping
-        self.gns3_template = None
-        self.console_type = None
+        # Path of a spilled configuration, set by CMLStreamParser
+        self.config_file = None
     
     def add_interface(self, interface_id):
         """Add an interface to the node."""
@@ -2,6 +2,7 @@
 Models for GNS3 projects.
 """
 import json
+from netbridge.utils.interface_names import interface_port
 
 
 class GNS3Project:
@@ -61,7 +62,8 @@ class GNS3Node:
     Model for a GNS3 node.
     """
     
-    def __init__(self, name=None, node_type=None, node_id=None, console_type="telnet", x=0, y=0):
+    def __init__(self, name=None, node_type=None, node_id=None, console_type="telnet", x=0, y=0, properties=None,
+                 console=None, template_id=None):
         """
         Initialize a GNS3 node.
         
@@ -72,6 +74,10 @@ class GNS3Node:
             console_type (str): Console type (telnet, vnc, etc.)
             x (int): X position
             y (int): Y position
+            properties (dict): Node properties (disk images, base MAC
+                address, etc.)
+            console (int): Console port. None lets the GNS3 server pick one.
+            template_id (str): Template ID, derived from node_type if None
         """
         self.name = name
         self.node_type = node_type
@@ -79,6 +85,41 @@ class GNS3Node:
         self.console_type = console_type
         self.x = x
         self.y = y
+        self.properties = properties or {}
+        self.console = console
+        self.template_id = template_id
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create a node from a GNS3 project file entry.
+        
+        Accepts the entries written by NetBridge ("id", "type" holding the
+        template name) and by GNS3 itself ("node_id", "node_type").
+        
+        Args:
+            data (dict): Node entry of a project file
+        
+        Returns:
+            GNS3Node: The node
+        
+        Raises:
+            ValueError: If the entry has no node ID
+        """
+        node_id = data.get("node_id", data.get("id"))
+        if not node_id:
+            raise ValueError(f"GNS3 node {data.get('name')!r} has no ID")
+        return cls(
+            name=data.get("name") or str(node_id),
+            node_type=data.get("type") or data.get("node_type"),
+            node_id=node_id,
+            console_type=data.get("console_type") or "none",
+            x=int(data.get("x") or 0),
+            y=int(data.get("y") or 0),
+            properties=data.get("properties"),
+            console=data.get("console"),
+            template_id=data.get("template_id")
+        )
     
     def to_dict(self):
         """
@@ -87,11 +128,11 @@ class GNS3Node:
         Returns:
             dict: GNS3 node dictionary
         """
-        return {
+        data = {
             "id": self.node_id,
             "name": self.name,
             "type": self.node_type,
-            "template_id": f"template-{self.node_type.lower()}",
+            "template_id": self.template_id or f"template-{self.node_type.lower()}",
             "compute_id": "local",
             "console_type": self.console_type,
             "console_auto_start": False,
@@ -99,8 +140,11 @@ class GNS3Node:
             "x": self.x,
             "y": self.y,
             "z": 1,
-            "properties": {}
+            "properties": dict(self.properties)
         }
+        if self.console is not None:
+            data["console"] = self.console
+        return data
     
     def __repr__(self):
         return f"GNS3Node(name={self.name}, type={self.node_type})"
@@ -111,7 +155,8 @@ class GNS3Link:
     Model for a GNS3 link.
     """
     
-    def __init__(self, link_id=None, node1_id=None, node2_id=None, interface1=None, interface2=None):
+    def __init__(self, link_id=None, node1_id=None, node2_id=None, interface1=None, interface2=None,
+                 adapter1=0, adapter2=0):
         """
         Initialize a GNS3 link.
         
@@ -121,12 +166,46 @@ class GNS3Link:
             interface1 (str): Interface on first node
             node2_id (str): ID of second node
             interface2 (str): Interface on second node
+            adapter1 (int): Adapter number on first node
+            adapter2 (int): Adapter number on second node
         """
         self.link_id = link_id
         self.node1_id = node1_id
         self.interface1 = interface1
         self.node2_id = node2_id
         self.interface2 = interface2
+        self.adapter1 = adapter1
+        self.adapter2 = adapter2
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create a link from a GNS3 project file entry.
+        
+        The interfaces of the link are the port numbers of its ends.
+        
+        Args:
+            data (dict): Link entry of a project file
+        
+        Returns:
+            GNS3Link: The link
+        
+        Raises:
+            ValueError: If the entry does not connect two nodes
+        """
+        link_id = data.get("link_id", data.get("id"))
+        ends = data.get("nodes") or []
+        if len(ends) != 2 or not all(isinstance(end, dict) and end.get("node_id") for end in ends):
+            raise ValueError(f"GNS3 link {link_id} does not connect two nodes")
+        return cls(
+            link_id=link_id,
+            node1_id=ends[0]["node_id"],
+            node2_id=ends[1]["node_id"],
+            interface1=int(ends[0].get("port_number") or 0),
+            interface2=int(ends[1].get("port_number") or 0),
+            adapter1=int(ends[0].get("adapter_number") or 0),
+            adapter2=int(ends[1].get("adapter_number") or 0)
+        )
     
     def to_dict(self):
         """
@@ -141,12 +220,12 @@ class GNS3Link:
             "nodes": [
                 {
                     "node_id": self.node1_id,
-                    "adapter_number": 0,
+                    "adapter_number": self.adapter1,
                     "port_number": self._interface_to_port(self.interface1)
                 },
                 {
                     "node_id": self.node2_id,
-                    "adapter_number": 0,
+                    "adapter_number": self.adapter2,
                     "port_number": self._interface_to_port(self.interface2)
                 }
             ],
@@ -163,23 +242,7 @@ class GNS3Link:
         Returns:
             int: Port number
         """
-        if interface is None:
-            return 0
-            
-        # Try to extract a number from the interface
-        if isinstance(interface, (int, float)):
-            return int(interface)
-            
-        # Try to extract number from interface name (e.g., GigabitEthernet0/1 -> 1)
-        import re
-        match = re.search(r'(\d+)/?(\d+)?$', str(interface))
-        if match:
-            if match.group(2):
-                return int(match.group(2))
-            return int(match.group(1))
-        
-        # Default to 0 if no number found
-        return 0
+        return interface_port(interface)
     
     def __repr__(self):
         return f"GNS3Link(id={self.link_id}, {self.node1_id}:{self.interface1} <-> {self.node2_id}:{self.interface2})"
\ No newline at end of file
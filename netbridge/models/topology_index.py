@@ -0,0 +1,137 @@
+"""
+Adjacency index for CML/VIRL topologies.
+"""
+
+
+class TopologyIndex:
+    """
+    Adjacency index over the nodes and links of a topology.
+    
+    Answers neighbor, incident link and degree queries in O(1)/O(degree)
+    instead of scanning every link. Topologies build it lazily and keep it
+    up to date as nodes and links are added.
+    """
+    
+    def __init__(self, topology=None):
+        """
+        Initialize the index.
+        
+        Args:
+            topology: Optional topology (CMLTopology or VIRLTopology) to index
+        """
+        self._incident = {}  # node_id -> {link_id: None}, insertion ordered
+        self._neighbors = {}  # node_id -> {neighbor_id: link count}
+        self._endpoints = {}  # link_id -> (node1_id, node2_id)
+        self._pairs = {}  # sorted endpoint pair -> [link_id, ...]
+        
+        if topology is not None:
+            for node_id in topology.nodes:
+                self.add_node(node_id)
+            for link in topology.links.values():
+                self.add_link(link)
+    
+    def add_node(self, node_id):
+        """Add a node to the index."""
+        self._incident.setdefault(node_id, {})
+        self._neighbors.setdefault(node_id, {})
+    
+    def add_link(self, link):
+        """
+        Add a link to the index, replacing any indexed link with its ID.
+        
+        Args:
+            link: A CMLLink or VIRLLink
+        """
+        if link.id in self._endpoints:
+            self.remove_link(link.id)
+        
+        a, b = link.node1_id, link.node2_id
+        self._endpoints[link.id] = (a, b)
+        self._pairs.setdefault(self._pair(a, b), []).append(link.id)
+        
+        for node_id, other in ((a, b), (b, a)) if a != b else ((a, a),):
+            self.add_node(node_id)
+            self._incident[node_id][link.id] = None
+            neighbors = self._neighbors[node_id]
+            neighbors[other] = neighbors.get(other, 0) + 1
+    
+    def remove_link(self, link_id):
+        """Remove a link from the index."""
+        a, b = self._endpoints.pop(link_id)
+        pair = self._pair(a, b)
+        self._pairs[pair].remove(link_id)
+        if not self._pairs[pair]:
+            del self._pairs[pair]
+        
+        for node_id, other in ((a, b), (b, a)) if a != b else ((a, a),):
+            del self._incident[node_id][link_id]
+            neighbors = self._neighbors[node_id]
+            neighbors[other] -= 1
+            if not neighbors[other]:
+                del neighbors[other]
+    
+    def neighbors(self, node_id):
+        """Get the IDs of the nodes linked to a node."""
+        return list(self._neighbors.get(node_id, ()))
+    
+    def incident_links(self, node_id):
+        """Get the IDs of the links touching a node."""
+        return list(self._incident.get(node_id, ()))
+    
+    def degree(self, node_id):
+        """
+        Get the degree of a node.
+        
+        Self-loops count twice, once for each end.
+        """
+        incident = self._incident.get(node_id, ())
+        return len(incident) + sum(1 for link_id in incident if self.is_self_loop(link_id))
+    
+    def is_self_loop(self, link_id):
+        """Check if both ends of a link are on the same node."""
+        a, b = self._endpoints[link_id]
+        return a == b
+    
+    def is_parallel(self, link_id):
+        """Check if another link connects the same two nodes."""
+        a, b = self._endpoints[link_id]
+        return len(self._pairs[self._pair(a, b)]) > 1
+    
+    def self_loops(self):
+        """Get the IDs of all self-loop links."""
+        return [link_id for link_id, (a, b) in self._endpoints.items() if a == b]
+    
+    def parallel_links(self):
+        """Get groups of link IDs that connect the same two nodes."""
+        return [list(link_ids) for link_ids in self._pairs.values() if len(link_ids) > 1]
+    
+    def connected_components(self):
+        """
+        Get the connected components of the topology.
+        
+        Returns:
+            list: Sets of node IDs, largest component first
+        """
+        seen = set()
+        components = []
+        for start in self._neighbors:
+            if start in seen:
+                continue
+            component = {start}
+            stack = [start]
+            while stack:
+                for neighbor in self._neighbors[stack.pop()]:
+                    if neighbor not in component:
+                        component.add(neighbor)
+                        stack.append(neighbor)
+            seen |= component
+            components.append(component)
+        components.sort(key=len, reverse=True)
+        return components
+    
+    @staticmethod
+    def _pair(a, b):
+        return (a, b) if str(a) <= str(b) else (b, a)
+    
+    def __repr__(self):
+        return f"TopologyIndex(nodes={len(self._incident)}, links={len(self._endpoints)})"
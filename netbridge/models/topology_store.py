@@ -0,0 +1,422 @@
+"""
+SQLite backed storage for very large CML topologies.
+
+An SQLiteTopology behaves like a CMLTopology, but keeps its nodes, links
+and configurations in an indexed SQLite database instead of memory.
+Nodes and links are written in batches as the parsers produce them and
+read back in batches through cursors, so converting a lab needs about the
+same memory whatever its size. A finished store records the input it was
+built from and can be reopened by later conversions of the same file.
+
+A store file holds one topology at a time; conversions using the same
+file are serialized with locked_store().
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+import contextlib
+from collections.abc import Mapping, Sequence, ItemsView
+from netbridge.models.cml_model import CMLNode, CMLLink
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Rows written per executemany call and read per fetchmany call
+BATCH_SIZE = 1000
+
+STORE_VERSION = 1
+
+# Columns are declared without a type so values keep their YAML type
+# (a node ID 1 stays an int, "1" a string), as they would in a dict
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+CREATE TABLE IF NOT EXISTS nodes (
+    seq INTEGER PRIMARY KEY, id UNIQUE NOT NULL, label, node_type, x, y,
+    image_definition, interfaces, config_file, configuration
+);
+CREATE TABLE IF NOT EXISTS links (
+    seq INTEGER PRIMARY KEY, id UNIQUE NOT NULL, node1_id, interface1, node2_id, interface2
+);
+CREATE INDEX IF NOT EXISTS links_node1 ON links (node1_id);
+CREATE INDEX IF NOT EXISTS links_node2 ON links (node2_id);
+"""
+
+# Store path -> lock held by the thread using the store
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+_NODE_COLUMNS = ("id", "label", "node_type", "x", "y", "image_definition", "interfaces", "config_file",
+                 "configuration")
+_LINK_COLUMNS = ("id", "node1_id", "interface1", "node2_id", "interface2")
+
+
+def _node_row(node):
+    return (node.id, node.label, node.node_type, node.x, node.y, node.image_definition,
+            json.dumps(node.interfaces), node.config_file, node.configuration)
+
+
+def _node_from_row(row):
+    node_id, label, node_type, x, y, image_definition, interfaces, config_file, configuration = row
+    node = CMLNode(id=node_id, label=label, node_type=node_type, x=x, y=y,
+                   configuration=configuration, image_definition=image_definition)
+    node.interfaces = json.loads(interfaces)
+    node.config_file = config_file
+    return node
+
+
+def _link_row(link):
+    return (link.id, link.node1_id, link.interface1, link.node2_id, link.interface2)
+
+
+def _link_from_row(row):
+    return CMLLink(*row)
+
+
+def _upsert(table, columns):
+    """Build an insert keeping the position of a replaced row."""
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}")
+
+
+class SQLiteTopology:
+    """
+    CML topology stored in an SQLite database.
+    
+    Use create() to start a new store and open() to reuse a finished one.
+    The nodes and links attributes are read-only mappings queried on
+    demand; add_node/add_link buffer writes until the next read or
+    commit(). Worker processes forked from the owner open their own
+    connection on first use.
+    """
+    
+    def __init__(self, path, connection):
+        """
+        Initialize a topology over an open store.
+        
+        Args:
+            path (Path): Path of the SQLite database
+            connection (sqlite3.Connection): Connection to the database
+        """
+        self.path = str(path)
+        self.name = "Unnamed Topology"
+        self.description = ""
+        self.notes = ""
+        self._connection = connection
+        self._pid = os.getpid()
+        self._pending = {"nodes": [], "links": []}
+        self.nodes = _StoredTable(self, "nodes", _NODE_COLUMNS, _node_from_row)
+        self.links = _StoredTable(self, "links", _LINK_COLUMNS, _link_from_row)
+        self.index = _StoredIndex(self)
+    
+    @classmethod
+    def create(cls, path, name=None, description=None, notes=None):
+        """
+        Create an empty store, replacing any topology already in it.
+        
+        Args:
+            path (Path): Path of the SQLite database
+            name (str): Topology name
+            description (str): Topology description
+            notes (str): Additional notes
+        
+        Returns:
+            SQLiteTopology: The empty topology
+        """
+        connection = _connect(path)
+        with connection:
+            connection.executescript("DELETE FROM meta; DELETE FROM nodes; DELETE FROM links;")
+        topology = cls(path, connection)
+        topology.name = name or "Unnamed Topology"
+        topology.description = description or ""
+        topology.notes = notes or ""
+        return topology
+    
+    @classmethod
+    def open(cls, path, source=None):
+        """
+        Reopen a finished store.
+        
+        Args:
+            path (Path): Path of the SQLite database
+            source (str): Key of the input the store must have been built
+                from, as passed to commit()
+        
+        Returns:
+            SQLiteTopology: The stored topology, or None if the store does
+            not exist, is unfinished, or was built from another input
+        """
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            connection = _connect(path)
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Ignoring unreadable topology store {path}: {e}")
+            return None
+        
+        if meta.get("version") != STORE_VERSION or not meta.get("complete") or meta.get("source") != source:
+            connection.close()
+            return None
+        
+        topology = cls(path, connection)
+        topology.name = meta.get("name")
+        topology.description = meta.get("description")
+        topology.notes = meta.get("notes")
+        logger.info(f"Reusing topology store {path}")
+        return topology
+    
+    @property
+    def db(self):
+        """Connection to the store, reopened after a fork."""
+        if self._pid != os.getpid():
+            self._connection = _connect(self.path)
+            self._pid = os.getpid()
+            self._pending = {"nodes": [], "links": []}
+        return self._connection
+    
+    def add_node(self, node):
+        """Add a node to the topology."""
+        self._add("nodes", _node_row(node))
+    
+    def add_link(self, link):
+        """Add a link to the topology."""
+        self._add("links", _link_row(link))
+    
+    def _add(self, table, row):
+        pending = self._pending[table]
+        pending.append(row)
+        if len(pending) >= BATCH_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """Write buffered nodes and links to the store."""
+        if not (self._pending["nodes"] or self._pending["links"]):
+            return
+        with self.db:
+            for table, columns in (("nodes", _NODE_COLUMNS), ("links", _LINK_COLUMNS)):
+                if self._pending[table]:
+                    self.db.executemany(_upsert(table, columns), self._pending[table])
+                    self._pending[table] = []
+    
+    def commit(self, source=None):
+        """
+        Write everything and mark the store as finished.
+        
+        Args:
+            source (str): Key of the input the topology was built from,
+                checked by open()
+        """
+        self.flush()
+        meta = {
+            "version": STORE_VERSION,
+            "name": self.name,
+            "description": self.description,
+            "notes": self.notes,
+            "source": source,
+            "complete": 1
+        }
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items())
+    
+    def close(self):
+        """Write buffered changes and close the connection."""
+        self.flush()
+        self.db.close()
+    
+    def discard(self):
+        """Drop buffered changes and close the connection, leaving the store unfinished."""
+        self._pending = {"nodes": [], "links": []}
+        self.db.close()
+    
+    def reset_index(self):
+        """Nothing to reset, the index is queried from the store."""
+    
+    def query(self, sql, params=()):
+        """
+        Run a query after writing buffered changes.
+        
+        Returns:
+            Generator over the result rows, fetched in batches
+        """
+        self.flush()
+        cursor = self.db.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    
+    def __repr__(self):
+        return f"SQLiteTopology(name={self.name}, nodes={len(self.nodes)}, links={len(self.links)})"
+
+
+@contextlib.contextmanager
+def locked_store(path):
+    """
+    Hold a store file for the duration of a conversion.
+    
+    create() replaces the topology in the file, so a store can only be
+    used by one conversion at a time. Threads of this process wait on a
+    lock per path, other processes on a lock file next to the store.
+    
+    Args:
+        path (Path): Path of the SQLite database
+    """
+    path = os.path.realpath(path)
+    with _store_locks_guard:
+        lock = _store_locks.setdefault(path, threading.Lock())
+    with lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Closing the lock file releases the lock
+        with open(f"{path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+
+def _connect(path):
+    connection = sqlite3.connect(str(path))
+    # The store is a cache that is rebuilt when unfinished, so durability
+    # is traded for write speed
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+class _StoredTable(Mapping):
+    """Read-only ID -> model mapping over the nodes or links table."""
+    
+    def __init__(self, topology, table, columns, from_row):
+        self._topology = topology
+        self._table = table
+        self._select = f"SELECT {', '.join(columns)} FROM {table}"
+        self._from_row = from_row
+    
+    def __getitem__(self, key):
+        for row in self._topology.query(f"{self._select} WHERE id = ?", (key,)):
+            return self._from_row(row)
+        raise KeyError(key)
+    
+    def __contains__(self, key):
+        return any(self._topology.query(f"SELECT 1 FROM {self._table} WHERE id = ?", (key,)))
+    
+    def __iter__(self):
+        return (row[0] for row in self._topology.query(f"SELECT id FROM {self._table} ORDER BY seq"))
+    
+    def __len__(self):
+        return next(self._topology.query(f"SELECT COUNT(*) FROM {self._table}"))[0]
+    
+    def values(self):
+        return _StoredValues(self)
+    
+    def items(self):
+        return _StoredItems(self)
+
+
+class _StoredValues(Sequence):
+    """
+    Models of a table in insertion order.
+    
+    Iterating reads through a cursor in batches; slices are read as one
+    range query, so chunks can be loaded without loading the table.
+    """
+    
+    def __init__(self, table):
+        self._table = table
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            # Rows are numbered 1..n in insertion order
+            rows = self._table._topology.query(
+                f"{self._table._select} WHERE seq > ? AND seq <= ? ORDER BY seq", (start, stop)
+            )
+            return [self._table._from_row(row) for row in rows]
+        
+        if index < 0:
+            index += len(self)
+        for row in self._table._topology.query(f"{self._table._select} WHERE seq = ?", (index + 1,)):
+            return self._table._from_row(row)
+        raise IndexError(index)
+    
+    def __iter__(self):
+        rows = self._table._topology.query(f"{self._table._select} ORDER BY seq")
+        return (self._table._from_row(row) for row in rows)
+    
+    def __len__(self):
+        return len(self._table)
+
+
+class _StoredItems(ItemsView):
+    """(ID, model) pairs read in one pass instead of a lookup per key."""
+    
+    def __iter__(self):
+        return ((value.id, value) for value in self._mapping.values())
+
+
+class _StoredIndex:
+    """
+    Adjacency queries answered from the indexed links table.
+    
+    Offers the query methods of TopologyIndex.
+    """
+    
+    def __init__(self, topology):
+        self._topology = topology
+    
+    def neighbors(self, node_id):
+        """Get the IDs of the nodes linked to a node."""
+        rows = self._topology.query(
+            "SELECT node2_id FROM links WHERE node1_id = ? UNION SELECT node1_id FROM links WHERE node2_id = ?",
+            (node_id, node_id)
+        )
+        return [row[0] for row in rows]
+    
+    def incident_links(self, node_id):
+        """Get the IDs of the links touching a node."""
+        rows = self._topology.query(
+            "SELECT id FROM links WHERE node1_id = ? OR node2_id = ? ORDER BY seq", (node_id, node_id)
+        )
+        return [row[0] for row in rows]
+    
+    def degree(self, node_id):
+        """
+        Get the degree of a node.
+        
+        Self-loops count twice, once for each end.
+        """
+        rows = self._topology.query(
+            "SELECT (SELECT COUNT(*) FROM links WHERE node1_id = ?) + (SELECT COUNT(*) FROM links WHERE node2_id = ?)",
+            (node_id, node_id)
+        )
+        return next(rows)[0]
+    
+    def self_loops(self):
+        """Get the IDs of all self-loop links."""
+        return [row[0] for row in self._topology.query("SELECT id FROM links WHERE node1_id = node2_id")]
+    
+    def parallel_links(self):
+        """Get groups of link IDs that connect the same two nodes."""
+        groups = {}
+        rows = self._topology.query(
+            "SELECT l.id, p.a, p.b FROM links l JOIN ("
+            "  SELECT MIN(node1_id, node2_id) AS a, MAX(node1_id, node2_id) AS b FROM links"
+            "  GROUP BY a, b HAVING COUNT(*) > 1"
+            ") p ON MIN(l.node1_id, l.node2_id) = p.a AND MAX(l.node1_id, l.node2_id) = p.b ORDER BY l.seq"
+        )
+        for link_id, a, b in rows:
+            groups.setdefault((a, b), []).append(link_id)
+        return list(groups.values())
+    
+    def __repr__(self):
+        return f"_StoredIndex(store={self._topology.path})"
@@ -2,9 +2,15 @@
 Parser for CML YAML files.
 """
 import yaml
+import contextlib
+import functools
 import logging
-from pathlib import Path
 from netbridge.models.cml_model import CMLTopology, CMLNode, CMLLink
+from netbridge.models.topology_store import SQLiteTopology
+from netbridge.utils.compression import open_input, input_stem
+from netbridge.utils.limits import ParseLimitExceeded, parse_limits, limited_loader
+from netbridge.utils.progress import ConversionCancelled, reporter_for
+from netbridge.utils.schemas import validate_element
 
 logger = logging.getLogger(__name__)
 
@@ -14,24 +20,84 @@ class CMLParser:
     Parser for Cisco Modeling Labs (CML) YAML topology files.
     """
     
-    def parse(self, file_path):
+    def __init__(self, validate=True, limits=None):
+        """
+        Initialize the parser.
+        
+        Args:
+            validate (bool): Check each node and link against the CML
+                schema. Disable for trusted input.
+            limits (ParseLimits): Resource limits enforced while parsing.
+                Unlimited if None.
+        """
+        self.validate = validate
+        self.limits = parse_limits(limits)
+    
+    def parse(self, file_path, progress=None, selection=None, store=None):
         """
         Parse a CML YAML file into a topology model.
         
         Args:
             file_path (Path): Path to the CML YAML file
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            selection (NodeSelection): Only keep the selected nodes
+            store (Path): Write the topology to this SQLite store instead
+                of memory. The document itself is still loaded whole; use
+                CMLStreamParser to keep memory flat.
             
         Returns:
-            CMLTopology: Parsed topology object
+            CMLTopology: Parsed topology object, an SQLiteTopology when
+            a store is given
             
         Raises:
             ValueError: If the file cannot be parsed as valid CML YAML
+            ParseLimitExceeded: If the file crosses a parse limit
         """
         logger.info(f"Parsing CML file: {file_path}")
         
         try:
-            with open(file_path, 'r') as f:
-                yaml_data = yaml.safe_load(f)
+            # Read as bytes, so the input limit counts decompressed bytes
+            # rather than characters
+            with open_input(file_path, 'rb') as f:
+                return self._parse(f, input_stem(file_path), file_path, progress, selection, store)
+        except OSError as e:
+            logger.error(f"Error reading CML file {file_path}: {str(e)}")
+            raise ValueError(f"Error parsing CML file: {str(e)}")
+    
+    def parse_string(self, content, name=None, progress=None, selection=None, store=None):
+        """
+        Parse CML YAML content that is already in memory.
+        
+        Args:
+            content (str): CML YAML document
+            name (str): Topology name used if the document has none
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            selection (NodeSelection): Only keep the selected nodes
+            store (Path): Write the topology to this SQLite store
+            
+        Returns:
+            CMLTopology: Parsed topology object
+            
+        Raises:
+            ValueError: If the content cannot be parsed as valid CML YAML
+            ParseLimitExceeded: If the content crosses a parse limit
+        """
+        return self._parse(content, name, name or "<string>", progress, selection, store)
+    
+    def _parse(self, stream, default_name, source, progress, selection, store):
+        """Parse a CML YAML stream or string into a topology model."""
+        progress = reporter_for(progress)
+        budget = self.limits.budget()
+        # Closes a store left unfinished by a failed parse
+        cleanup = contextlib.ExitStack()
+        try:
+            if isinstance(stream, str):
+                budget.content(stream)
+            else:
+                stream = budget.reader(stream)
+            yaml_data = yaml.load(stream, Loader=limited_loader(budget))
             
             # Validate basic structure
             if not yaml_data.get('topology'):
@@ -39,15 +105,41 @@ class CMLParser:
 
             # Extract topology metadata
             topology_data = yaml_data['topology']
-            topology = CMLTopology(
-                name=topology_data.get('name', Path(file_path).stem),
+            topology_class = CMLTopology if store is None else functools.partial(SQLiteTopology.create, store)
+            topology = topology_class(
+                name=topology_data.get('name', default_name),
                 description=topology_data.get('description', ''),
                 notes=topology_data.get('notes', '')
             )
+            if store is not None:
+                cleanup.callback(topology.discard)
+            
+            nodes_data = topology_data.get('nodes') or {}
+            links_data = topology_data.get('links') or {}
+            # Entries were charged as the loader composed them, except
+            # those brought in through aliases or merge keys
+            budget.node(max(0, len(nodes_data) - budget.nodes))
+            budget.link(max(0, len(links_data) - budget.links))
+            
+            # Select nodes before building models, so the configurations of
+            # excluded nodes are never kept
+            selected = None
+            if selection is not None:
+                seeds = {
+                    node_id for node_id, node_data in nodes_data.items()
+                    if selection.matches(node_id, node_data.get('label', node_id),
+                                         node_data.get('node_definition'), node_data)
+                }
+                selected = selection.expand(
+                    seeds, ((link_data.get('node_a'), link_data.get('node_b')) for link_data in links_data.values())
+                )
             
             # Parse nodes
-            nodes_data = topology_data.get('nodes', {})
             for node_id, node_data in nodes_data.items():
+                if selected is not None and node_id not in selected:
+                    continue
+                if self.validate:
+                    validate_element("cml", "node", node_data, f"node {node_id}")
                 node = CMLNode(
                     id=node_id,
                     label=node_data.get('label', node_id),
@@ -58,10 +150,13 @@ class CMLParser:
                     image_definition=node_data.get('image_definition', '')
                 )
                 topology.add_node(node)
+                progress.advance(nodes=1)
                 
             # Parse links
-            links_data = topology_data.get('links', {})
+            links = []
             for link_id, link_data in links_data.items():
+                if self.validate:
+                    validate_element("cml", "link", link_data, f"link {link_id}")
                 # In CML, links connect interfaces on nodes
                 link = CMLLink(
                     id=link_id,
@@ -70,14 +165,27 @@ class CMLParser:
                     node2_id=link_data.get('node_b'),
                     interface2=link_data.get('interface_b')
                 )
-                topology.add_link(link)
+                if selected is None:
+                    topology.add_link(link)
+                else:
+                    links.append(link)
+                progress.advance(links=1)
+            
+            if selected is not None:
+                outside = {node_id: node_data for node_id, node_data in nodes_data.items() if node_id not in selected}
+                selection.finish(topology, links, outside)
             
             logger.info(f"Successfully parsed {len(topology.nodes)} nodes and {len(topology.links)} links")
+            cleanup.pop_all()
             return topology
             
+        except (ConversionCancelled, ParseLimitExceeded):
+            raise
         except yaml.YAMLError as e:
-            logger.error(f"Error parsing YAML in {file_path}: {str(e)}")
+            logger.error(f"Error parsing YAML in {source}: {str(e)}")
             raise ValueError(f"Invalid YAML in CML file: {str(e)}")
         except Exception as e:
-            logger.error(f"Error parsing CML file {file_path}: {str(e)}")
-            raise ValueError(f"Error parsing CML file: {str(e)}")
\ No newline at end of file
+            logger.error(f"Error parsing CML file {source}: {str(e)}")
+            raise ValueError(f"Error parsing CML file: {str(e)}")
+        finally:
+            cleanup.close()
\ No newline at end of file
@@ -0,0 +1,539 @@
+"""
+Streaming parser for large CML YAML files.
+
+Unlike CMLParser, which loads the whole document with ``yaml.safe_load``,
+this parser walks PyYAML's event stream and builds each CMLNode/CMLLink
+as soon as its mapping is complete, so the raw document tree never
+exists in memory.
+"""
+import yaml
+import contextlib
+import logging
+from pathlib import Path
+from netbridge.models.cml_model import CMLTopology, CMLNode, CMLLink
+from netbridge.models.topology_store import SQLiteTopology
+from netbridge.utils.compression import open_input, input_stem
+from netbridge.utils.limits import ParseLimitExceeded, parse_limits
+from netbridge.utils.progress import ConversionCancelled, reporter_for
+from netbridge.utils.schemas import validate_element
+
+logger = logging.getLogger(__name__)
+
+# Prefer the libyaml backed loader when PyYAML was built with it
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class CMLStreamParser:
+    """
+    Event-driven parser for Cisco Modeling Labs (CML) YAML topology files.
+    """
+    
+    def __init__(self, spill_threshold=None, validate=True, limits=None):
+        """
+        Initialize the streaming parser.
+        
+        Args:
+            spill_threshold (int): Configurations larger than this many
+                characters are written to a spill file instead of being
+                kept on the node. None disables spilling.
+            validate (bool): Check each node and link against the CML
+                schema as it is parsed. Disable for trusted input.
+            limits (ParseLimits): Resource limits enforced as the document
+                streams in. Unlimited if None.
+        """
+        self.spill_threshold = spill_threshold
+        self.validate = validate
+        self.limits = parse_limits(limits)
+    
+    def parse(self, file_path, spill_dir=None, progress=None, selection=None, store=None):
+        """
+        Parse a CML YAML file into a topology model.
+        
+        Args:
+            file_path (Path): Path to the CML YAML file
+            spill_dir (Path): Directory for spilled configurations. Required
+                when a spill threshold is set.
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            selection (NodeSelection): Only keep the selected nodes. A
+                selection with hops reads the file twice, first without
+                configurations to find the nodes in range.
+            store (Path): Write nodes, links and configurations to this
+                SQLite store in batches as they are parsed, instead of
+                keeping them in memory. Configurations are not spilled.
+        
+        Returns:
+            CMLTopology: Parsed topology object, an SQLiteTopology when
+            a store is given
+        
+        Raises:
+            ValueError: If the file cannot be parsed as valid CML YAML
+            ParseLimitExceeded: If the file crosses a parse limit
+        """
+        logger.info(f"Stream parsing CML file: {file_path}")
+        
+        try:
+            return self._parse(lambda: open_input(file_path, 'rb'), input_stem(file_path), file_path,
+                               spill_dir, progress, selection, store)
+        except OSError as e:
+            logger.error(f"Error reading CML file {file_path}: {str(e)}")
+            raise ValueError(f"Error parsing CML file: {str(e)}")
+    
+    def parse_string(self, content, name=None, spill_dir=None, progress=None, selection=None, store=None):
+        """
+        Parse CML YAML content that is already in memory.
+        
+        Args:
+            content (str): CML YAML document
+            name (str): Topology name used if the document has none
+            spill_dir (Path): Directory for spilled configurations
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            selection (NodeSelection): Only keep the selected nodes
+            store (Path): Write the topology to this SQLite store
+            
+        Returns:
+            CMLTopology: Parsed topology object
+            
+        Raises:
+            ValueError: If the content cannot be parsed as valid CML YAML
+            ParseLimitExceeded: If the content crosses a parse limit
+        """
+        return self._parse(lambda: contextlib.nullcontext(content), name, name or "<string>",
+                           spill_dir, progress, selection, store)
+    
+    def iter_elements(self, file_path, progress=None):
+        """
+        Yield the raw fields of a CML file's topology, nodes and links.
+        
+        No models are built and nothing is validated, so every field of an
+        element is seen as written; only one element is held at a time.
+        
+        Args:
+            file_path (Path): Path to the CML YAML file
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+        
+        Yields:
+            tuple: ("topology", key, value) for each topology field other
+            than nodes and links, then ("node", node ID, fields) and
+            ("link", link ID, fields) in document order
+        
+        Raises:
+            ValueError: If the file cannot be parsed as valid CML YAML
+            ParseLimitExceeded: If the file crosses a parse limit
+        """
+        logger.info(f"Reading CML elements of {file_path}")
+        progress = reporter_for(progress)
+        budget = self.limits.budget()
+        state = _ParseState(input_stem(file_path), None, None, progress, False, budget=budget)
+        try:
+            with open_input(file_path, 'rb') as stream:
+                yield from state.elements(budget.events(yaml.parse(budget.reader(stream), Loader=_Loader)))
+        except (ConversionCancelled, ParseLimitExceeded):
+            raise
+        except yaml.YAMLError as e:
+            logger.error(f"Error parsing YAML in {file_path}: {str(e)}")
+            raise ValueError(f"Invalid YAML in CML file: {str(e)}")
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Error parsing CML file {file_path}: {str(e)}")
+            raise ValueError(f"Error parsing CML file: {str(e)}")
+    
+    def _parse(self, open_stream, default_name, source, spill_dir, progress, selection, store):
+        """
+        Parse a CML YAML document into a topology model.
+        
+        Args:
+            open_stream (callable): Returns a context manager giving the
+                document as a stream or string. Called once per pass.
+        """
+        spill_threshold = self.spill_threshold if store is None else None
+        if spill_threshold is not None and spill_dir is None:
+            raise ValueError("A spill directory is required when spill_threshold is set")
+        
+        progress = reporter_for(progress)
+        # Both passes of a selection with hops share one clock
+        deadline = self.limits.deadline()
+        # Closes a store left unfinished by a failed parse
+        cleanup = contextlib.ExitStack()
+        try:
+            node_filter = None
+            if selection is not None and selection.hops:
+                # First pass: node fields and links only, to grow the selection
+                skeleton = self._run(open_stream, default_name, None, None, None, progress, False, deadline,
+                                     lambda node_id, node_data: False)
+                seeds = {
+                    node_id for node_id, node_data in skeleton.outside.items()
+                    if selection.matches(node_id, node_data.get('label', node_id),
+                                         node_data.get('node_definition'), node_data)
+                }
+                selected = selection.expand(
+                    seeds, ((link.node1_id, link.node2_id) for link in skeleton.pending_links)
+                )
+                node_filter = lambda node_id, node_data: node_id in selected
+            elif selection is not None:
+                node_filter = lambda node_id, node_data: selection.matches(
+                    node_id, node_data.get('label', node_id), node_data.get('node_definition'), node_data
+                )
+            
+            state = self._run(open_stream, default_name, spill_threshold, spill_dir, store, progress,
+                              self.validate, deadline, node_filter)
+            if isinstance(state.topology, SQLiteTopology):
+                cleanup.callback(state.topology.discard)
+            if selection is not None and state.topology is not None:
+                selection.finish(state.topology, state.pending_links, state.outside)
+            
+            topology = state.topology
+            if topology is None:
+                raise ValueError("Missing 'topology' section in CML file")
+            
+            logger.info(f"Successfully parsed {len(topology.nodes)} nodes and {len(topology.links)} links")
+            cleanup.pop_all()
+            return topology
+        
+        except (ConversionCancelled, ParseLimitExceeded):
+            raise
+        except yaml.YAMLError as e:
+            logger.error(f"Error parsing YAML in {source}: {str(e)}")
+            raise ValueError(f"Invalid YAML in CML file: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error parsing CML file {source}: {str(e)}")
+            raise ValueError(f"Error parsing CML file: {str(e)}")
+        finally:
+            cleanup.close()
+    
+    def _run(self, open_stream, default_name, spill_threshold, spill_dir, store, progress, validate, deadline,
+             node_filter):
+        """Run one pass over the document."""
+        budget = self.limits.budget(deadline)
+        state = _ParseState(default_name, spill_threshold, spill_dir, progress, validate, node_filter, store, budget)
+        try:
+            with open_stream() as stream:
+                if isinstance(stream, str):
+                    budget.content(stream)
+                else:
+                    stream = budget.reader(stream)
+                state.run(budget.events(yaml.parse(stream, Loader=_Loader)))
+        except BaseException:
+            if isinstance(state.topology, SQLiteTopology):
+                state.topology.discard()
+            raise
+        return state
+
+
+class _ParseState:
+    """
+    Per-call state of a streaming parse.
+    """
+    
+    def __init__(self, default_name, spill_threshold, spill_dir, progress, validate, node_filter=None, store=None,
+                 budget=None):
+        self.default_name = default_name
+        self.budget = budget if budget is not None else parse_limits(None).budget()
+        self.progress = progress
+        self.validate = validate
+        # With a node filter, rejected nodes are kept in outside without
+        # their configuration, and links are left in pending_links for
+        # the selection to resolve.
+        self.node_filter = node_filter
+        self.outside = {}
+        self.pending_links = []
+        self.spill_threshold = spill_threshold
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.spill_count = 0
+        self.store = store
+        self.anchors = {}
+        self.topology = None
+        self.events = None
+        self.resolver = yaml.resolver.Resolver()
+        self.constructor = yaml.constructor.SafeConstructor()
+    
+    def run(self, events):
+        """Consume the event stream of a single CML document."""
+        self.events = events
+        self._expect(yaml.StreamStartEvent)
+        event = next(self.events)
+        if isinstance(event, yaml.StreamEndEvent):
+            return
+        if not isinstance(event, yaml.DocumentStartEvent):
+            raise ValueError(f"Unexpected YAML event: {event}")
+        
+        self._expect(yaml.MappingStartEvent)
+        for key in self._mapping_keys():
+            if key == 'topology':
+                self._parse_topology()
+            else:
+                self._skip(next(self.events))
+        
+        # Only the first document is read, matching yaml.safe_load semantics
+        self._expect(yaml.DocumentEndEvent)
+    
+    def elements(self, events):
+        """
+        Yield the raw topology fields, nodes and links of a CML document.
+        
+        See CMLStreamParser.iter_elements.
+        """
+        self.events = events
+        self._expect(yaml.StreamStartEvent)
+        event = next(self.events)
+        if isinstance(event, yaml.StreamEndEvent):
+            return
+        if not isinstance(event, yaml.DocumentStartEvent):
+            raise ValueError(f"Unexpected YAML event: {event}")
+        
+        self._expect(yaml.MappingStartEvent)
+        found = False
+        for key in self._mapping_keys():
+            if key != 'topology':
+                self._skip(next(self.events))
+                continue
+            found = True
+            self._expect(yaml.MappingStartEvent)
+            for section in self._mapping_keys():
+                if section not in ('nodes', 'links'):
+                    yield 'topology', section, self._compose(next(self.events))
+                    continue
+                event = next(self.events)
+                if isinstance(event, yaml.ScalarEvent):
+                    continue  # empty section
+                if not isinstance(event, yaml.MappingStartEvent):
+                    raise ValueError(f"'{section}' must be a mapping of IDs to {section}")
+                for element_id in self._mapping_keys():
+                    if section == 'nodes':
+                        self.budget.node()
+                        data = self._node_mapping()
+                        self.progress.advance(nodes=1)
+                    else:
+                        self.budget.link()
+                        data = self._compose(next(self.events))
+                        self.progress.advance(links=1)
+                    yield section[:-1], element_id, data if isinstance(data, dict) else {}
+        
+        if not found:
+            raise ValueError("Missing 'topology' section in CML file")
+        self._expect(yaml.DocumentEndEvent)
+    
+    def _parse_topology(self):
+        """Parse the 'topology' mapping."""
+        if self.store is not None:
+            self.topology = SQLiteTopology.create(self.store, name=self.default_name)
+        else:
+            self.topology = CMLTopology(name=self.default_name)
+        self._expect(yaml.MappingStartEvent)
+        for key in self._mapping_keys():
+            if key == 'nodes':
+                self._parse_nodes()
+            elif key == 'links':
+                self._parse_links()
+            elif key in ('name', 'description', 'notes'):
+                value = self._compose(next(self.events))
+                if key == 'name' and value is None:
+                    value = self.default_name
+                setattr(self.topology, key, value if value is not None else '')
+            else:
+                self._skip(next(self.events))
+    
+    def _parse_nodes(self):
+        """Parse the 'nodes' mapping, creating a CMLNode per entry."""
+        event = next(self.events)
+        if isinstance(event, yaml.ScalarEvent):
+            return  # empty section
+        if not isinstance(event, yaml.MappingStartEvent):
+            raise ValueError("'nodes' must be a mapping of node IDs to nodes")
+        
+        for node_id in self._mapping_keys():
+            self.budget.node()
+            node_data = self._node_mapping()
+            if self.node_filter is not None and not self.node_filter(node_id, node_data):
+                node_data.pop('configuration', None)
+                self.outside[node_id] = node_data
+                continue
+            
+            config_file = self._spill_configuration(node_data)
+            if self.validate:
+                validate_element("cml", "node", node_data, f"node {node_id}")
+            node = CMLNode(
+                id=node_id,
+                label=node_data.get('label', node_id),
+                node_type=node_data.get('node_definition'),
+                x=node_data.get('x', 0),
+                y=node_data.get('y', 0),
+                configuration=node_data.get('configuration', ''),
+                image_definition=node_data.get('image_definition', '')
+            )
+            node.config_file = config_file
+            self.topology.add_node(node)
+            self.progress.advance(nodes=1)
+    
+    def _parse_links(self):
+        """Parse the 'links' mapping, creating a CMLLink per entry."""
+        event = next(self.events)
+        if isinstance(event, yaml.ScalarEvent):
+            return  # empty section
+        if not isinstance(event, yaml.MappingStartEvent):
+            raise ValueError("'links' must be a mapping of link IDs to links")
+        
+        for link_id in self._mapping_keys():
+            self.budget.link()
+            link_data = self._compose(next(self.events)) or {}
+            if self.validate:
+                validate_element("cml", "link", link_data, f"link {link_id}")
+            link = CMLLink(
+                id=link_id,
+                node1_id=link_data.get('node_a'),
+                interface1=link_data.get('interface_a'),
+                node2_id=link_data.get('node_b'),
+                interface2=link_data.get('interface_b')
+            )
+            if self.node_filter is None:
+                self.topology.add_link(link)
+            else:
+                self.pending_links.append(link)
+            self.progress.advance(links=1)
+    
+    def _node_mapping(self):
+        """
+        Build the field dict of one node.
+        
+        Returns:
+            dict: Node fields, empty if the node is not a mapping
+        """
+        data = self._compose(next(self.events))
+        # Copied, as an aliased mapping may be shared with other nodes
+        return dict(data) if isinstance(data, dict) else {}
+    
+    def _spill_configuration(self, node_data):
+        """
+        Move a configuration over the spill threshold to a spill file.
+        
+        Returns:
+            Path: The spill file, or None if the configuration was kept
+        """
+        config = node_data.get('configuration')
+        if self.spill_threshold is None or not isinstance(config, str) or len(config) <= self.spill_threshold:
+            return None
+        del node_data['configuration']
+        return self._spill(config)
+    
+    def _spill(self, text):
+        """Write a configuration scalar to the spill directory."""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.spill_count += 1
+        path = self.spill_dir / f"config-{self.spill_count:06d}.cfg"
+        with open(path, 'w') as f:
+            f.write(text)
+        logger.debug(f"Spilled {len(text)} characters of configuration to {path}")
+        return path
+    
+    def _mapping_keys(self):
+        """Yield the keys of the current mapping until it ends, composed like SafeLoader does."""
+        while True:
+            event = next(self.events)
+            if isinstance(event, yaml.MappingEndEvent):
+                return
+            if self._is_merge_key(event):
+                raise ValueError("YAML merge keys are not supported in the document, topology, nodes "
+                                 "or links mappings")
+            yield self._compose(event)
+    
+    def _compose(self, event):
+        """Build a Python value from the events starting at ``event``."""
+        if isinstance(event, yaml.ScalarEvent):
+            value = self._scalar(event)
+        elif isinstance(event, yaml.MappingStartEvent):
+            value = {}
+            self._remember(event, value)
+            merged = []
+            while True:
+                key_event = next(self.events)
+                if isinstance(key_event, yaml.MappingEndEvent):
+                    break
+                if self._is_merge_key(key_event):
+                    merged.append(self._compose(next(self.events)))
+                    continue
+                key = self._compose(key_event)
+                value[key] = self._compose(next(self.events))
+            self._merge(value, merged)
+            return value
+        elif isinstance(event, yaml.SequenceStartEvent):
+            value = []
+            self._remember(event, value)
+            while True:
+                item_event = next(self.events)
+                if isinstance(item_event, yaml.SequenceEndEvent):
+                    break
+                value.append(self._compose(item_event))
+            return value
+        elif isinstance(event, yaml.AliasEvent):
+            if event.anchor not in self.anchors:
+                raise ValueError(f"Unknown YAML alias '{event.anchor}'")
+            return self.anchors[event.anchor]
+        else:
+            raise ValueError(f"Unexpected YAML event: {event}")
+        self._remember(event, value)
+        return value
+    
+    def _merge(self, mapping, merged):
+        """
+        Add the entries of merge key values missing from a mapping.
+        
+        Follows SafeLoader: keys of the mapping itself win over merged
+        ones, a later merge key over an earlier one, and the first mapping
+        of a merged list over the ones after it.
+        """
+        for source in reversed(merged):
+            for item in (source if isinstance(source, list) else [source]):
+                if not isinstance(item, dict):
+                    raise ValueError("YAML merge keys must refer to a mapping or a list of mappings")
+                for key, item_value in item.items():
+                    mapping.setdefault(key, item_value)
+    
+    def _is_merge_key(self, event):
+        """Check whether an event is a '<<' merge key."""
+        return isinstance(event, yaml.ScalarEvent) and self._tag(event) == 'tag:yaml.org,2002:merge'
+    
+    def _tag(self, event):
+        """Get the tag of a scalar, resolving implicit ones."""
+        if event.tag is None or event.tag == '!':
+            return self.resolver.resolve(yaml.ScalarNode, event.value, event.implicit)
+        return event.tag
+    
+    def _scalar(self, event):
+        """Resolve and construct a scalar the same way SafeLoader would."""
+        tag = self._tag(event)
+        node = yaml.ScalarNode(tag, event.value, style=event.style)
+        construct = self.constructor.yaml_constructors.get(tag)
+        if construct is None:
+            raise ValueError(f"Unsupported YAML tag '{tag}'")
+        return construct(self.constructor, node)
+    
+    def _remember(self, event, value):
+        """Record an anchored value so later aliases can refer to it."""
+        if event.anchor is not None:
+            self.anchors[event.anchor] = value
+    
+    def _skip(self, event):
+        """Discard the events of a value that is not needed, keeping anchored values."""
+        if event.anchor is not None and not isinstance(event, yaml.AliasEvent):
+            # Anchored values may be referenced later, so keep them
+            self._compose(event)
+        elif isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            depth = 1
+            while depth:
+                event = next(self.events)
+                if isinstance(event, yaml.AliasEvent):
+                    continue
+                if isinstance(event, yaml.NodeEvent) and event.anchor is not None:
+                    self._compose(event)
+                elif isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                    depth += 1
+                elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                    depth -= 1
+    
+    def _expect(self, event_type):
+        """Consume the next event, checking its type."""
+        event = next(self.events)
+        if not isinstance(event, event_type):
+            raise ValueError(f"Unexpected YAML event: {event}")
+        return event
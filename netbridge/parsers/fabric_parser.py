@@ -0,0 +1,245 @@
+"""
+Scale-out of compact fabric specs into CML topologies.
+
+A fabric spec describes roles (spines, leaves, ...) with a node count, a
+Jinja2 configuration template and variables, plus how the roles are wired
+together. For example:
+    
+    fabric:
+      name: dc1
+      roles:
+        - name: spine
+          count: 4
+          node_definition: nxosv9000
+          template: spine.j2
+          interface_format: "Ethernet1/{port}"
+          first_port: 1
+          vars: {asn: 65000}
+        - name: leaf
+          count: 500
+          node_definition: iosv
+          template: leaf.j2
+          interface_format: "GigabitEthernet0/{port}"
+      links:
+        - {from: spine, to: leaf, type: full-mesh}
+
+Templates are looked up relative to the spec file (or template_dir); a
+role may give an inline 'config' template instead. Each is rendered with
+the role 'vars', any per-node 'node_vars' keyed by hostname, and hostname,
+role, index, node_id and interfaces (name, peer and peer_interface of each
+connected interface).
+"""
+import yaml
+import logging
+import jinja2
+from pathlib import Path
+from netbridge.models.cml_model import CMLTopology, CMLNode, CMLLink
+from netbridge.utils.compression import open_input, input_stem
+
+logger = logging.getLogger(__name__)
+
+# Spacing of generated nodes on the GNS3 canvas
+X_SPACING = 100
+Y_SPACING = 200
+
+LINK_TYPES = ("full-mesh", "one-to-one")
+
+
+class FabricParser:
+    """
+    Parser expanding fabric specs and Jinja2 templates into CML topologies.
+    """
+    
+    def __init__(self, template_dir=None):
+        """
+        Initialize the fabric parser.
+        
+        Args:
+            template_dir (Path): Directory holding the config templates.
+                Defaults to the directory of the spec file.
+        """
+        self.template_dir = Path(template_dir) if template_dir else None
+    
+    def parse(self, file_path):
+        """
+        Expand a fabric spec file into a topology model.
+        
+        Args:
+            file_path (Path): Path to the fabric spec YAML file
+        
+        Returns:
+            CMLTopology: Topology with one rendered configuration per node
+        
+        Raises:
+            ValueError: If the spec or a template is invalid
+        """
+        logger.info(f"Expanding fabric spec: {file_path}")
+        file_path = Path(file_path)
+        
+        try:
+            with open_input(file_path) as f:
+                spec = yaml.safe_load(f)
+        except OSError as e:
+            raise ValueError(f"Error reading fabric spec: {str(e)}")
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML in fabric spec: {str(e)}")
+        
+        return self.expand(spec, self.template_dir or file_path.parent, input_stem(file_path))
+    
+    def expand(self, spec, template_dir=None, default_name=None):
+        """
+        Expand an already loaded fabric spec into a topology model.
+        
+        Args:
+            spec (dict): Fabric spec, with the 'fabric' section at the top
+            template_dir (Path): Directory holding the config templates
+            default_name (str): Topology name used if the spec has none
+        
+        Returns:
+            CMLTopology: Topology with one rendered configuration per node
+        
+        Raises:
+            ValueError: If the spec or a template is invalid
+        """
+        if not isinstance(spec, dict) or not isinstance(spec.get('fabric'), dict):
+            raise ValueError("Missing 'fabric' section in fabric spec")
+        fabric = spec['fabric']
+        
+        environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(str(template_dir or self.template_dir or ".")),
+            undefined=jinja2.StrictUndefined,
+            keep_trailing_newline=True,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False
+        )
+        
+        topology = CMLTopology(
+            name=fabric.get('name', default_name),
+            description=fabric.get('description', '')
+        )
+        
+        role_specs = fabric.get('roles') or []
+        link_specs = fabric.get('links') or []
+        if not isinstance(role_specs, list) or not isinstance(link_specs, list):
+            raise ValueError("Fabric 'roles' and 'links' must be lists")
+        
+        roles = {}
+        for row, role in enumerate(role_specs):
+            if not isinstance(role, dict) or not role.get('name'):
+                raise ValueError(f"Fabric role {row + 1} has no 'name'")
+            if role['name'] in roles:
+                raise ValueError(f"Fabric role '{role['name']}' is defined twice")
+            roles[role['name']] = self._add_role(topology, role, row, environment)
+        
+        interfaces = {node_id: [] for node_id in topology.nodes}
+        for number, link_spec in enumerate(link_specs, 1):
+            if not isinstance(link_spec, dict) or 'from' not in link_spec or 'to' not in link_spec:
+                raise ValueError(f"Fabric link {number} needs 'from' and 'to' roles")
+            self._add_links(topology, roles, link_spec, interfaces)
+        
+        self._render(topology, roles, interfaces)
+        
+        logger.info(f"Expanded fabric into {len(topology.nodes)} nodes and {len(topology.links)} links")
+        return topology
+    
+    def _add_role(self, topology, role, row, environment):
+        """Create the nodes of a role and compile its template once."""
+        name = str(role['name'])
+        try:
+            count = int(role.get('count', 1))
+            first_index = int(role.get('first_index', 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"Fabric role '{name}' needs whole numbers for count and first_index")
+        hostname_format = role.get('hostname', name + "{index}")
+        
+        try:
+            if 'template' in role:
+                template = environment.get_template(role['template'])
+            else:
+                template = environment.from_string(role.get('config', ''))
+        except jinja2.TemplateError as e:
+            raise ValueError(f"Invalid template for role '{name}': {str(e)}")
+        
+        nodes = []
+        offset = (count - 1) * X_SPACING // 2
+        for position in range(count):
+            index = first_index + position
+            node = CMLNode(
+                id=f"n{len(topology.nodes)}",
+                label=hostname_format.format(index=index, role=name),
+                node_type=role.get('node_definition'),
+                x=position * X_SPACING - offset,
+                y=row * Y_SPACING,
+                image_definition=role.get('image_definition', '')
+            )
+            topology.add_node(node)
+            nodes.append((index, node))
+        
+        return {
+            "spec": role,
+            "nodes": nodes,
+            "template": template,
+            "next_port": {node.id: int(role.get('first_port', 0)) for _, node in nodes},
+        }
+    
+    def _add_links(self, topology, roles, link_spec, interfaces):
+        """Wire two roles together and record each node's interfaces."""
+        for side in ('from', 'to'):
+            if link_spec[side] not in roles:
+                raise ValueError(f"Fabric link references unknown role '{link_spec[side]}'")
+        side_a, side_b = roles[link_spec['from']], roles[link_spec['to']]
+        
+        link_type = link_spec.get('type', 'full-mesh')
+        if link_type == "full-mesh":
+            pairs = ((a, b) for _, a in side_a["nodes"] for _, b in side_b["nodes"])
+        elif link_type == "one-to-one":
+            pairs = zip((node for _, node in side_a["nodes"]), (node for _, node in side_b["nodes"]))
+        else:
+            raise ValueError(f"Unknown fabric link type '{link_type}', expected one of {', '.join(LINK_TYPES)}")
+        
+        for node_a, node_b in pairs:
+            interface_a = self._next_interface(side_a, node_a)
+            interface_b = self._next_interface(side_b, node_b)
+            link = CMLLink(
+                id=f"l{len(topology.links)}",
+                node1_id=node_a.id,
+                interface1=interface_a,
+                node2_id=node_b.id,
+                interface2=interface_b
+            )
+            topology.add_link(link)
+            interfaces[node_a.id].append(
+                {"name": interface_a, "peer": node_b.label, "peer_interface": interface_b}
+            )
+            interfaces[node_b.id].append(
+                {"name": interface_b, "peer": node_a.label, "peer_interface": interface_a}
+            )
+    
+    def _next_interface(self, role, node):
+        """Allocate the next free interface name on a node."""
+        port = role["next_port"][node.id]
+        role["next_port"][node.id] = port + 1
+        return role["spec"].get('interface_format', "eth{port}").format(port=port)
+    
+    def _render(self, topology, roles, interfaces):
+        """Render the configurations of all nodes, one compiled template per role."""
+        for name, role in roles.items():
+            render = role["template"].render
+            variables = role["spec"].get('vars', {})
+            overrides = role["spec"].get('node_vars', {})
+            
+            for index, node in role["nodes"]:
+                context = dict(variables)
+                context.update(overrides.get(node.label, {}))
+                context.update(
+                    hostname=node.label,
+                    role=name,
+                    index=index,
+                    node_id=node.id,
+                    interfaces=interfaces[node.id]
+                )
+                try:
+                    node.configuration = render(context)
+                except jinja2.TemplateError as e:
+                    raise ValueError(f"Error rendering template for {node.label}: {str(e)}")
@@ -0,0 +1,68 @@
+"""
+Parser for GNS3 project (.gns3) files.
+"""
+import logging
+from netbridge.models.gns3_model import GNS3Project, GNS3Node, GNS3Link
+from netbridge.utils.compression import open_input, input_stem
+from netbridge.utils.json_stream import iter_values
+from netbridge.utils.progress import ConversionCancelled, reporter_for
+
+logger = logging.getLogger(__name__)
+
+# Values of a project file turned into models; drawings, computes and
+# everything else are skipped without being decoded
+_PREFIXES = ("name", "project_id", "topology.nodes.item", "topology.links.item")
+
+
+class GNS3Parser:
+    """
+    Parser for GNS3 project files.
+    
+    Project files are read incrementally, so only one node or link entry
+    is decoded at a time however large the embedded drawings and
+    properties make the file.
+    """
+    
+    def parse(self, file_path, progress=None):
+        """
+        Parse a GNS3 project file into a project model.
+        
+        Args:
+            file_path (Path): Path to the project file, optionally compressed
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+        
+        Returns:
+            GNS3Project: Parsed project, named after the file if the
+            project has no name
+        
+        Raises:
+            ValueError: If the file cannot be parsed as a GNS3 project
+        """
+        logger.info(f"Parsing GNS3 project file: {file_path}")
+        progress = reporter_for(progress)
+        project = GNS3Project()
+        name = None
+        
+        try:
+            with open_input(file_path, 'rb') as f:
+                for prefix, value in iter_values(f, _PREFIXES):
+                    if prefix == "topology.nodes.item":
+                        project.add_node(GNS3Node.from_dict(value))
+                        progress.advance(nodes=1)
+                    elif prefix == "topology.links.item":
+                        project.add_link(GNS3Link.from_dict(value))
+                        progress.advance(links=1)
+                    elif prefix == "name":
+                        name = value
+                    else:
+                        project.project_id = value
+        except ConversionCancelled:
+            raise
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Error parsing GNS3 project file {file_path}: {str(e)}")
+            raise ValueError(f"Error parsing GNS3 project file: {str(e)}")
+        
+        project.name = name or input_stem(file_path)
+        logger.info(f"Successfully parsed {len(project.nodes)} nodes and {len(project.links)} links")
+        return project
@@ -4,36 +4,148 @@ Parser for VIRL (XML) topology files.
 import re
 import xml.etree.ElementTree as ET
 import logging
-from pathlib import Path
 from netbridge.models.virl_model import VIRLTopology, VIRLNode, VIRLLink
+from netbridge.utils.compression import open_input, input_stem
+from netbridge.utils.limits import ParseLimitExceeded, parse_limits
+from netbridge.utils.progress import ConversionCancelled, reporter_for
 
 logger = logging.getLogger(__name__)
 
+# Bytes fed to the XML parser per step
+CHUNK_SIZE = 64 * 1024
+
+# Top-level elements counted against the node and link limits
+_NODE_TAGS = ("node", "device")
+_LINK_TAGS = ("link", "connection")
+
+
+def _load_root(chunks, budget):
+    """
+    Build the element tree of a VIRL document fed in chunks.
+    
+    Document type declarations are rejected, since VIRL files have no use
+    for them and their entities can expand to any size. Nesting, text
+    size and the node and link elements are charged to the budget as the
+    elements arrive.
+    
+    Args:
+        chunks (iterable): The document as consecutive str or bytes chunks
+        budget (ParseBudget): Budget of the parse
+    
+    Returns:
+        Element: The root element
+    
+    Raises:
+        ValueError: If the document declares a document type
+        ParseLimitExceeded: If the document crosses a parse limit
+        ET.ParseError: If the document is not well-formed XML
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    tail = None
+    
+    def handle_events():
+        nonlocal root
+        for event, elem in parser.read_events():
+            if event == "start":
+                budget.enter()
+                if root is None:
+                    root = elem
+                elif budget.depth == 2:
+                    tag = elem.tag.rsplit("}", 1)[-1]
+                    if tag in _NODE_TAGS:
+                        budget.node()
+                    elif tag in _LINK_TAGS:
+                        budget.link()
+            else:
+                budget.leave()
+                budget.text(elem.text)
+    
+    for chunk in chunks:
+        # Carry the end of the previous chunk over, so a declaration split
+        # between chunks is still found
+        marker = "<!DOCTYPE" if isinstance(chunk, str) else b"<!DOCTYPE"
+        window = chunk if tail is None else tail + chunk
+        if marker in window:
+            raise ValueError("Document type declarations are not allowed in VIRL files")
+        tail = window[-(len(marker) - 1):]
+        
+        budget.content(chunk)
+        parser.feed(chunk)
+        handle_events()
+    parser.close()
+    handle_events()
+    return root
+
 
 class VIRLParser:
     """
     Parser for Virtual Internet Routing Lab (VIRL) XML topology files.
     """
     
-    def parse(self, file_path):
+    def __init__(self, limits=None):
+        """
+        Initialize the parser.
+        
+        Args:
+            limits (ParseLimits): Resource limits enforced as the document
+                is fed to the XML parser. Unlimited if None.
+        """
+        self.limits = parse_limits(limits)
+    
+    def parse(self, file_path, progress=None, selection=None):
         """
         Parse a VIRL XML file into a topology model.
         
         Args:
             file_path (Path): Path to the VIRL XML file
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            selection (NodeSelection): Only keep the selected nodes,
+                applied once the whole document is parsed
             
         Returns:
             VIRLTopology: Parsed topology object
             
         Raises:
             ValueError: If the file cannot be parsed as valid VIRL XML
+            ParseLimitExceeded: If the file crosses a parse limit
         """
         logger.info(f"Parsing VIRL file: {file_path}")
         
+        def load_root(budget):
+            # Decompress while the XML parser reads
+            with open_input(file_path, 'rb') as f:
+                return _load_root(iter(lambda: f.read(CHUNK_SIZE), b""), budget)
+        
+        return self._parse(load_root, input_stem(file_path), file_path, progress, selection)
+    
+    def parse_string(self, content, name=None, progress=None, selection=None):
+        """
+        Parse VIRL XML content that is already in memory.
+        
+        Args:
+            content (str): VIRL XML document
+            name (str): Topology name
+            progress (ProgressReporter): Optional progress reporter and
+                cancellation check
+            selection (NodeSelection): Only keep the selected nodes
+            
+        Returns:
+            VIRLTopology: Parsed topology object
+            
+        Raises:
+            ValueError: If the content cannot be parsed as valid VIRL XML
+            ParseLimitExceeded: If the content crosses a parse limit
+        """
+        return self._parse(lambda budget: _load_root([content], budget), name, name or "<string>", progress, selection)
+    
+    def _parse(self, load_root, name, source, progress, selection):
+        """Parse the XML root returned by load_root(budget) into a topology model."""
+        progress = reporter_for(progress)
         try:
             # Parse XML
-            tree = ET.parse(file_path)
-            root = tree.getroot()
+            root = load_root(self.limits.budget())
             
             # Determine XML namespace if present
             ns = {}
@@ -46,7 +158,7 @@ class VIRLParser:
             
             # Extract topology metadata
             topology = VIRLTopology(
-                name=Path(file_path).stem,
+                name=name,
                 description=self._get_text(root, './virl:annotation', nsmap) or '',
                 notes=''
             )
@@ -91,6 +203,7 @@ class VIRLParser:
                         node.add_interface(intf_id)
                 
                 topology.add_node(node)
+                progress.advance(nodes=1)
             
             # Parse links
             for link_elem in root.findall('./virl:link', nsmap) + root.findall('./virl:connection', nsmap):
@@ -114,15 +227,21 @@ class VIRLParser:
                         interface2=endpoints[1][1]
                     )
                     topology.add_link(link)
+                    progress.advance(links=1)
+            
+            if selection is not None:
+                selection.apply(topology)
             
             logger.info(f"Successfully parsed {len(topology.nodes)} nodes and {len(topology.links)} links")
             return topology
             
+        except (ConversionCancelled, ParseLimitExceeded):
+            raise
         except ET.ParseError as e:
-            logger.error(f"Error parsing XML in {file_path}: {str(e)}")
+            logger.error(f"Error parsing XML in {source}: {str(e)}")
             raise ValueError(f"Invalid XML in VIRL file: {str(e)}")
         except Exception as e:
-            logger.error(f"Error parsing VIRL file {file_path}: {str(e)}")
+            logger.error(f"Error parsing VIRL file {source}: {str(e)}")
             raise ValueError(f"Error parsing VIRL file: {str(e)}")
     
     def _get_text(self, elem, xpath, nsmap):
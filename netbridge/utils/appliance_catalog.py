@@ -0,0 +1,240 @@
+"""
+GNS3 appliance catalog for NetBridge.
+
+Imports a directory of GNS3 appliance files (.gns3a) into a compact index
+that the node mapping stage can use to resolve node types that have no
+entry in the node mappings.
+"""
+import os
+import re
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION = 1
+
+# Below this many changed files, parsing in-process beats starting workers
+PARALLEL_THRESHOLD = 16
+
+# Emulator sections of an appliance file, in order of preference
+_EMULATORS = ("qemu", "docker", "iou", "dynamips")
+
+
+def _normalize(name):
+    """Normalize a name for matching: lower case, letters and digits only."""
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def parse_appliance(file_path):
+    """
+    Parse a GNS3 appliance file into a compact catalog entry.
+    
+    Args:
+        file_path (str): Path to the .gns3a file
+    
+    Returns:
+        dict: Catalog entry, or None if the file is not a usable appliance
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Skipping appliance {file_path}: {str(e)}")
+        return None
+    
+    if not isinstance(data, dict) or not data.get("name"):
+        logger.warning(f"Skipping appliance {file_path}: no appliance name")
+        return None
+    
+    emulator = next((key for key in _EMULATORS if isinstance(data.get(key), dict)), None)
+    settings = data.get(emulator, {}) if emulator else {}
+    
+    return {
+        "name": data["name"],
+        "vendor": data.get("vendor_name", ""),
+        "product": data.get("product_name", ""),
+        "category": data.get("category", ""),
+        "emulator": emulator,
+        "adapters": settings.get("adapters", 0),
+        "console_type": settings.get("console_type", "telnet"),
+        "port_name_format": data.get("port_name_format"),
+        "first_port_name": data.get("first_port_name"),
+        "images": sorted({image["filename"] for image in data.get("images", []) if image.get("filename")})
+    }
+
+
+class ApplianceCatalog:
+    """
+    Cached, indexed catalog of GNS3 appliances.
+    
+    The cache remembers the size and modification time of every appliance
+    file, so loading the catalog only parses files that changed.
+    """
+    
+    def __init__(self, directory, cache_file=None, max_workers=None):
+        """
+        Initialize the catalog.
+        
+        Args:
+            directory (Path): Directory containing .gns3a files
+            cache_file (Path): Location of the cached index. Defaults to
+                a file inside the appliance directory.
+            max_workers (int): Processes used to parse appliance files
+        """
+        self.directory = Path(directory)
+        self.cache_file = Path(cache_file) if cache_file else self.directory / ".netbridge_catalog.json"
+        self.max_workers = max_workers
+        self.appliances = {}  # file name -> entry
+        self._fingerprints = {}  # file name -> [size, mtime_ns]
+        self._by_key = {}
+        self._by_vendor = {}
+        self._by_image = {}
+        self._by_adapters = {}
+        self._by_console = {}
+    
+    def load(self):
+        """
+        Load the catalog, reparsing only appliance files that changed.
+        
+        Returns:
+            dict: Counts of parsed, cached and removed appliance files
+        """
+        self._read_cache()
+        
+        current = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".gns3a"):
+                    stat = entry.stat()
+                    current[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        
+        changed = sorted(name for name, fingerprint in current.items()
+                         if self._fingerprints.get(name) != fingerprint)
+        removed = set(self._fingerprints) - set(current)
+        
+        if changed or removed:
+            for name in removed:
+                self.appliances.pop(name, None)
+            paths = [str(self.directory / name) for name in changed]
+            for name, entry in zip(changed, self._parse_files(paths)):
+                if entry is None:
+                    self.appliances.pop(name, None)
+                else:
+                    self.appliances[name] = entry
+            self._fingerprints = current
+            self._write_cache()
+        
+        self._build_index()
+        stats = {"parsed": len(changed), "cached": len(current) - len(changed), "removed": len(removed)}
+        logger.info(f"Loaded {len(self.appliances)} appliances from {self.directory} "
+                    f"({stats['parsed']} parsed, {stats['cached']} cached)")
+        return stats
+    
+    def resolve(self, node_type, image=None):
+        """
+        Find the appliance for a node type.
+        
+        Args:
+            node_type (str): CML/VIRL node type
+            image (str): Optional image file name of the node
+        
+        Returns:
+            dict: Catalog entry, or None if nothing matches
+        """
+        if image:
+            entry = self._by_image.get(os.path.basename(str(image)).lower())
+            if entry is not None:
+                return entry
+        if node_type:
+            return self._by_key.get(_normalize(node_type))
+        return None
+    
+    def by_vendor(self, vendor):
+        """Get the appliances of a vendor."""
+        return self._by_vendor.get(_normalize(vendor), [])
+    
+    def by_image(self, image):
+        """Get the appliance that uses an image file."""
+        return self._by_image.get(os.path.basename(str(image)).lower())
+    
+    def by_adapters(self, adapters):
+        """Get the appliances with a given number of network adapters."""
+        return self._by_adapters.get(adapters, [])
+    
+    def by_console_type(self, console_type):
+        """Get the appliances with a given console type."""
+        return self._by_console.get(console_type, [])
+    
+    def _parse_files(self, paths):
+        """Parse appliance files, in parallel when there are many."""
+        if len(paths) < PARALLEL_THRESHOLD or self.max_workers == 1:
+            return [parse_appliance(path) for path in paths]
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            chunksize = max(1, len(paths) // ((self.max_workers or os.cpu_count() or 1) * 4))
+            return list(executor.map(parse_appliance, paths, chunksize=chunksize))
+    
+    def _read_cache(self):
+        """Read the cached index if it exists and is usable."""
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if data.get("version") != CATALOG_VERSION:
+            return
+        self.appliances = data.get("appliances", {})
+        self._fingerprints = data.get("fingerprints", {})
+    
+    def _write_cache(self):
+        """Write the index cache atomically."""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    "version": CATALOG_VERSION,
+                    "fingerprints": self._fingerprints,
+                    "appliances": self.appliances
+                }, f, separators=(",", ":"))
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write appliance catalog cache {self.cache_file}: {str(e)}")
+    
+    def _build_index(self):
+        """Build the lookup tables from the catalog entries."""
+        by_key, by_vendor, by_image, by_adapters, by_console = {}, {}, {}, {}, {}
+        
+        # Sorted so the first of several matching appliances always wins
+        for file_name in sorted(self.appliances):
+            entry = self.appliances[file_name]
+            name = _normalize(entry["name"])
+            vendor = _normalize(entry["vendor"])
+            keys = [name, _normalize(entry["product"])]
+            if vendor and name.startswith(vendor):
+                keys.append(name[len(vendor):])
+            for key in keys:
+                if key:
+                    by_key.setdefault(key, entry)
+            
+            by_vendor.setdefault(vendor, []).append(entry)
+            by_adapters.setdefault(entry["adapters"], []).append(entry)
+            by_console.setdefault(entry["console_type"], []).append(entry)
+            for image in entry["images"]:
+                by_image.setdefault(image.lower(), entry)
+        
+        self._by_key = by_key
+        self._by_vendor = by_vendor
+        self._by_image = by_image
+        self._by_adapters = by_adapters
+        self._by_console = by_console
+    
+    def __len__(self):
+        return len(self.appliances)
+    
+    def __repr__(self):
+        return f"ApplianceCatalog(directory={self.directory}, appliances={len(self.appliances)})"
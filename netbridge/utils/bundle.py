@@ -0,0 +1,94 @@
+"""
+Multi-document YAML bundles.
+
+A bundle is a YAML stream of CML documents separated by "---" lines. The
+document boundaries are found by scanning the raw bytes once, so each
+document can be read and parsed on its own without parsing the ones
+before it.
+"""
+import os
+import re
+import mmap
+import shutil
+import logging
+import tempfile
+import contextlib
+from netbridge.utils.compression import detect_compression, open_input
+
+logger = logging.getLogger(__name__)
+
+# A document start marker: "---" at the start of a line, followed by
+# whitespace or the end of the line. Block scalars are always indented
+# below a key, so a marker in column 0 cannot be part of a value.
+_DOCUMENT_START = re.compile(rb"^---(?=[ \t\r\n]|\Z)", re.MULTILINE)
+
+# A line holding YAML content rather than a marker, comment or blank
+_CONTENT_LINE = re.compile(rb"^(?!---(?:[ \t\r\n]|\Z)|\.\.\.(?:[ \t\r\n]|\Z))[ \t]*[^#\s]", re.MULTILINE)
+
+
+def scan_documents(file_path):
+    """
+    Find the documents of an uncompressed YAML stream.
+
+    Args:
+        file_path (Path): Bundle file
+
+    Returns:
+        list: (offset, length) byte ranges of the non-empty documents,
+        in file order
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            starts = [match.start() for match in _DOCUMENT_START.finditer(data)]
+            if not starts or starts[0] != 0:
+                starts.insert(0, 0)
+            ends = starts[1:] + [len(data)]
+
+            documents = []
+            for start, end in zip(starts, ends):
+                if _CONTENT_LINE.search(data, start, end):
+                    documents.append((start, end - start))
+
+    logger.debug(f"Found {len(documents)} documents in {file_path}")
+    return documents
+
+
+def read_document(file_path, offset, length):
+    """
+    Read one document of a bundle.
+
+    Args:
+        file_path (Path): Uncompressed bundle file
+        offset (int): Byte offset of the document
+        length (int): Byte length of the document
+
+    Returns:
+        str: The document text
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length).decode('utf-8')
+
+
+@contextlib.contextmanager
+def uncompressed_bundle(file_path):
+    """
+    Get a bundle as an uncompressed file that can be read at any offset.
+
+    Compressed bundles are decompressed to a temporary file, removed on
+    exit; uncompressed ones are used in place.
+
+    Yields:
+        Path of the uncompressed bundle
+    """
+    if detect_compression(file_path) is None:
+        yield file_path
+        return
+
+    with tempfile.TemporaryDirectory(prefix="netbridge-bundle-") as tmp_dir:
+        path = os.path.join(tmp_dir, "bundle.yaml")
+        with open_input(file_path, 'rb') as src, open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        yield path
@@ -0,0 +1,150 @@
+"""
+Transparent compression support for NetBridge inputs and outputs.
+
+Compressed inputs are detected from their magic bytes and decompressed
+as they are read, so they are never inflated to disk first.
+"""
+import io
+import bz2
+import gzip
+import lzma
+import logging
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Magic bytes at the start of each supported compressed format
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# File name suffixes used for compressed outputs
+SUFFIXES = {
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "xz": ".xz",
+    "zstd": ".zst",
+}
+
+COMPRESSIONS = tuple(SUFFIXES)
+
+
+def detect_compression(file_path):
+    """
+    Detect the compression of a file from its magic bytes.
+
+    Args:
+        file_path (Path): File to inspect
+
+    Returns:
+        str: Compression name, or None for uncompressed files
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    for compression, magic in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def compressed_path(file_path, compression):
+    """
+    Get the name of an output file after compression.
+
+    Args:
+        file_path (Path): Uncompressed output path
+        compression (str): Compression name, or None
+
+    Returns:
+        Path: file_path with the compression suffix appended
+    """
+    if not compression:
+        return file_path
+    return file_path.with_name(file_path.name + SUFFIXES[compression])
+
+
+def input_stem(file_path):
+    """
+    Get the stem of an input file, ignoring any compression suffix.
+
+    For example, both lab.yaml and lab.yaml.gz give "lab".
+    """
+    file_path = Path(file_path)
+    if file_path.suffix in SUFFIXES.values():
+        file_path = file_path.with_suffix('')
+    return file_path.stem
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ValueError("zstd support requires the 'zstandard' package")
+
+
+def open_input(file_path, mode='r', encoding='utf-8'):
+    """
+    Open a possibly compressed file for streaming reads.
+
+    Args:
+        file_path (Path): File to open
+        mode (str): 'r' for text or 'rb' for bytes
+        encoding (str): Text encoding in text mode
+
+    Returns:
+        A file object yielding the decompressed contents
+
+    Raises:
+        ValueError: If the file uses an unsupported compression
+    """
+    binary = 'b' in mode
+    compression = detect_compression(file_path)
+
+    if compression is None:
+        return open(file_path, 'rb') if binary else open(file_path, 'r', encoding=encoding)
+
+    logger.debug(f"Reading {compression} compressed input {file_path}")
+    if compression == "zstd":
+        _require_zstandard()
+        raw = open(file_path, 'rb')
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+    else:
+        opener = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}[compression]
+        stream = opener(file_path, 'rb')
+
+    return stream if binary else io.TextIOWrapper(stream, encoding=encoding)
+
+
+def open_output(file_path, compression=None, mode='w', encoding='utf-8'):
+    """
+    Open an output file, compressing what is written to it.
+
+    Args:
+        file_path (Path): File to write, including any compression suffix
+        compression (str): Compression name, or None
+        mode (str): 'w' for text or 'wb' for bytes
+        encoding (str): Text encoding in text mode
+
+    Returns:
+        A writable file object
+    """
+    binary = 'b' in mode
+    if not compression:
+        return open(file_path, 'wb') if binary else open(file_path, 'w', encoding=encoding)
+
+    if compression == "zstd":
+        _require_zstandard()
+        stream = zstandard.ZstdCompressor().stream_writer(open(file_path, 'wb'), closefd=True)
+    elif compression in ("gzip", "bz2", "xz"):
+        opener = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}[compression]
+        stream = opener(file_path, 'wb')
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    return stream if binary else io.TextIOWrapper(stream, encoding=encoding)
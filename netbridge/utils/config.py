@@ -5,48 +5,85 @@ import os
 import json
 import logging
 from pathlib import Path
+from netbridge.utils.node_mappings import freeze_mappings
 
 logger = logging.getLogger(__name__)
 
-# Default node mappings from CML/VIRL node types to GNS3 templates
-DEFAULT_NODE_MAPPINGS = {
+# Default location of the disk image library index
+DEFAULT_IMAGE_INDEX = Path.home() / ".netbridge" / "image_index.json"
+
+# Default console port and MAC address allocation state
+DEFAULT_RESOURCE_STATE = Path.home() / ".netbridge" / "resources.json"
+
+# Default socket of the conversion daemon
+DEFAULT_DAEMON_SOCKET = Path.home() / ".netbridge" / "daemon.sock"
+
+# Default node mappings from CML/VIRL node types to GNS3 templates, with
+# the containerlab kind and EVE-NG template of each type for multi-target
+# generation, and the CML interface naming used when converting GNS3
+# projects back. Read-only; copy it with dict() to build custom mappings.
+DEFAULT_NODE_MAPPINGS = freeze_mappings({
     "iosv": {
         "gns3_template": "Cisco IOSv",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "containerlab": {"kind": "cisco_vios"},
+        "eve-ng": {"template": "vios"},
+        "cml": {"interface_format": "GigabitEthernet0/{0}"}
     },
     "iosvl2": {
         "gns3_template": "Cisco IOSvL2",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "eve-ng": {"template": "viosl2"},
+        "cml": {"interface_format": "GigabitEthernet0/{0}"}
     },
     "csr1000v": {
         "gns3_template": "Cisco CSR1000v",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "containerlab": {"kind": "cisco_csr1000v"},
+        "eve-ng": {"template": "csr1000vng"},
+        "cml": {"interface_format": "GigabitEthernet{0}"}
     },
     "iosxrv": {
         "gns3_template": "Cisco IOS XRv",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "containerlab": {"kind": "cisco_xrv"},
+        "eve-ng": {"template": "xrv"},
+        "cml": {"interface_format": "GigabitEthernet0/0/0/{0}"}
     },
     "nxosv": {
         "gns3_template": "Cisco NX-OSv",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "eve-ng": {"template": "titanium"},
+        "cml": {"interface_format": "Ethernet1/{0}"}
     },
     "asav": {
         "gns3_template": "Cisco ASAv",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "eve-ng": {"template": "asav"},
+        "cml": {"interface_format": "GigabitEthernet0/{0}"}
     },
     "linux": {
         "gns3_template": "Linux",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "containerlab": {"kind": "linux"},
+        "eve-ng": {"template": "linux"},
+        "cml": {"interface_format": "eth{0}"}
     },
     "ubuntu": {
         "gns3_template": "Ubuntu",
-        "console_type": "telnet"
+        "console_type": "telnet",
+        "containerlab": {"kind": "linux"},
+        "eve-ng": {"template": "linux"},
+        "cml": {"interface_format": "eth{0}"}
     },
     "external_connector": {
         "gns3_template": "Cloud",
-        "console_type": "none"
+        "console_type": "none",
+        "containerlab": {"kind": "bridge"},
+        "eve-ng": {"network": "pnet0"},
+        "cml": {"interface_format": "port"}
     }
-}
+})
 
 
 def load_config(file_path):
@@ -0,0 +1,217 @@
+"""
+Disk image library index for NetBridge.
+
+Maps the image names used by CML/VIRL nodes to disk images found in local
+image directories, so converted QEMU nodes can reference the right file.
+"""
+import os
+import json
+import mmap
+import hashlib
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# File extensions treated as disk images when scanning
+IMAGE_EXTENSIONS = (".qcow2", ".img", ".iso", ".vmdk", ".bin", ".raw")
+
+# Bytes hashed per step when walking a memory-mapped image
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+INDEX_VERSION = 1
+
+
+def hash_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Hash a file through a read-only memory map, one chunk at a time.
+    
+    MD5 is used because GNS3 identifies images by their MD5 checksum.
+    
+    Args:
+        file_path (Path): File to hash
+        chunk_size (int): Bytes passed to the hash per update
+    
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return digest.hexdigest()
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, chunk_size):
+                    digest.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+def _image_keys(name):
+    """Lookup keys for an image or image definition name."""
+    name = os.path.basename(str(name)).lower()
+    stem = name
+    while True:
+        root, ext = os.path.splitext(stem)
+        if ext not in IMAGE_EXTENSIONS:
+            break
+        stem = root
+    return [name, stem] if stem != name else [name]
+
+
+class ImageIndex:
+    """
+    Persistent index of disk images in a set of image directories.
+    
+    Entries are keyed by path and remember the size and modification time
+    the file was hashed at, so rescans only hash new or changed files.
+    """
+    
+    def __init__(self, index_file=None):
+        """
+        Initialize the index, loading it from disk if it exists.
+        
+        Args:
+            index_file (Path): Location of the persisted index
+        """
+        self.index_file = Path(index_file) if index_file else None
+        self.directories = []
+        self.images = {}  # path -> {"size", "mtime_ns", "md5"}
+        self._by_name = {}
+        
+        if self.index_file and self.index_file.exists():
+            self.load()
+    
+    def load(self):
+        """
+        Load the index from its file.
+        
+        Raises:
+            ValueError: If the index file is unreadable
+        """
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading image index {self.index_file}: {str(e)}")
+            raise ValueError(f"Error loading image index: {str(e)}")
+        
+        if data.get("version") != INDEX_VERSION:
+            logger.warning(f"Ignoring image index {self.index_file} with unsupported version")
+            return
+        
+        self.directories = data.get("directories", [])
+        self.images = data.get("images", {})
+        self._rebuild_lookup()
+    
+    def save(self):
+        """Write the index to its file atomically."""
+        if not self.index_file:
+            raise ValueError("Image index has no file to save to")
+        
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "directories": self.directories,
+                "images": self.images
+            }, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+    
+    def scan(self, directories=None):
+        """
+        Scan image directories and update the index.
+        
+        Args:
+            directories (list): Directories to scan. Defaults to the
+                directories of the previous scan.
+        
+        Returns:
+            dict: Counts of hashed, unchanged and removed images
+        """
+        if directories is not None:
+            self.directories = [str(Path(d).resolve()) for d in directories]
+        
+        images = {}
+        hashed = unchanged = 0
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                logger.warning(f"Image directory {directory} does not exist")
+                continue
+            
+            for path, stat in self._walk(directory):
+                entry = self.images.get(path)
+                if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    images[path] = entry
+                    unchanged += 1
+                    continue
+                
+                logger.debug(f"Hashing image {path}")
+                images[path] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "md5": hash_file(path)
+                }
+                hashed += 1
+        
+        removed = len(set(self.images) - set(images))
+        self.images = images
+        self._rebuild_lookup()
+        
+        logger.info(f"Image scan complete: {hashed} hashed, {unchanged} unchanged, {removed} removed")
+        return {"hashed": hashed, "unchanged": unchanged, "removed": removed}
+    
+    def resolve(self, name):
+        """
+        Find the image for an image name or image definition.
+        
+        Args:
+            name (str): Image file name or CML image definition
+        
+        Returns:
+            tuple: (path, entry) of the image, or None if not indexed
+        """
+        if not name:
+            return None
+        for key in _image_keys(name):
+            path = self._by_name.get(key)
+            if path is not None:
+                return path, self.images[path]
+        return None
+    
+    def _walk(self, directory):
+        """Yield (path, stat) for every image file below a directory."""
+        stack = [directory]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield entry.path, entry.stat()
+    
+    def _rebuild_lookup(self):
+        """Rebuild the name lookup table from the indexed paths."""
+        by_name = {}
+        roots = set(self.directories)
+        # Sorted so the first of several same-named images always wins
+        for path in sorted(self.images):
+            keys = _image_keys(path)
+            # CML keeps each image definition in a directory named after it
+            parent = os.path.dirname(path)
+            if parent not in roots:
+                keys.append(os.path.basename(parent).lower())
+            for key in keys:
+                by_name.setdefault(key, path)
+        self._by_name = by_name
+    
+    def __len__(self):
+        return len(self.images)
+    
+    def __repr__(self):
+        return f"ImageIndex(file={self.index_file}, images={len(self.images)})"
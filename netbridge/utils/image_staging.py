@@ -0,0 +1,308 @@
+"""
+Staging of disk images into project bundles.
+
+Images are placed with the cheapest method the filesystems allow: a
+reflink (copy-on-write clone), a hardlink, an in-kernel copy
+(copy_file_range or sendfile), and only then a buffered copy.
+"""
+import os
+import json
+import time
+import uuid
+import errno
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from netbridge.utils.image_index import hash_file
+from netbridge.utils.progress import reporter_for
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl cloning a whole file on Linux (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+# Bytes copied per step, and per bandwidth limiter request
+COPY_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Record of staged images kept in the images directory, so reruns can
+# skip unchanged images without hashing them again
+STAGED_RECORD = ".netbridge-images.json"
+
+METHODS = ("reflink", "hardlink", "copy_file_range", "sendfile", "copy")
+
+# Errors meaning a placement method is unsupported for the two files,
+# rather than that the copy failed
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+                errno.EOPNOTSUPP, errno.EBADF, errno.EMLINK, errno.ENOTSUP}
+
+
+class _RateLimiter:
+    """Token bucket shared by all copies of one staging run."""
+    
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.available = 0.0
+        self.updated = time.monotonic()
+    
+    def consume(self, size):
+        """Wait until size bytes may be copied."""
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.available + (now - self.updated) * self.rate, self.rate)
+            self.updated = now
+            self.available -= size
+            wait = -self.available / self.rate if self.available < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class ImageStager:
+    """
+    Places disk images into a project's images directory.
+    
+    Each image is staged once however many nodes use it. Images already
+    staged with the same size and checksum are skipped.
+    """
+    
+    def __init__(self, concurrency=4, bandwidth=None, methods=METHODS):
+        """
+        Initialize the stager.
+        
+        Args:
+            concurrency (int): Images placed at the same time
+            bandwidth (float): Limit of bytes per second copied across all
+                images. Reflinks and hardlinks copy no data and are not
+                limited. None copies at full speed.
+            methods (tuple): Placement methods to try, in order
+        
+        Raises:
+            ValueError: If a method is unknown or a limit is not positive
+        """
+        unknown = set(methods) - set(METHODS)
+        if unknown:
+            raise ValueError(f"Unknown image staging methods: {', '.join(sorted(unknown))}")
+        if concurrency < 1:
+            raise ValueError("Image staging concurrency must be at least 1")
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("Image staging bandwidth must be positive")
+        
+        self.concurrency = concurrency
+        self.bandwidth = bandwidth
+        self.methods = tuple(methods)
+    
+    def stage(self, images, images_dir, progress=None, reuse_dir=None):
+        """
+        Stage images into a directory.
+        
+        Args:
+            images (dict): Target file name -> (source path, image index
+                entry with "size" and "md5")
+            images_dir (Path): Directory to place the images in
+            progress (ProgressReporter): Optional cancellation check
+            reuse_dir (Path): Images directory of an earlier staging, such
+                as that of the published project when staging its
+                replacement. Images still current there are hardlinked
+                from it and counted as skipped.
+        
+        Returns:
+            dict: Number of images placed per method, skipped images and
+            bytes copied
+        
+        Raises:
+            ValueError: If an image cannot be staged
+        """
+        images_dir = Path(images_dir)
+        images_dir.mkdir(parents=True, exist_ok=True)
+        progress = reporter_for(progress)
+        record = self._load_record(images_dir)
+        reuse_record = self._load_record(Path(reuse_dir)) if reuse_dir is not None else {}
+        limiter = _RateLimiter(self.bandwidth) if self.bandwidth else None
+        
+        stats = dict.fromkeys(METHODS + ("skipped",), 0)
+        stats["bytes"] = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                name: executor.submit(
+                    self._stage_one, Path(source), entry, images_dir / name, record.get(name), limiter,
+                    Path(reuse_dir) / name if reuse_dir is not None else None, reuse_record.get(name)
+                )
+                for name, (source, entry) in sorted(images.items())
+            }
+            try:
+                for name, future in futures.items():
+                    method, copied = future.result()
+                    stats[method] += 1
+                    stats["bytes"] += copied
+                    stat = (images_dir / name).stat()
+                    record[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "md5": images[name][1]["md5"]}
+                    progress.check()
+            finally:
+                for future in futures.values():
+                    future.cancel()
+                self._save_record(images_dir, record)
+        
+        logger.info(f"Staged {len(images)} images into {images_dir}: "
+                    + ", ".join(f"{count} {key}" for key, count in stats.items() if count))
+        return stats
+    
+    def _stage_one(self, source, entry, target, recorded, limiter, previous=None, previous_recorded=None):
+        """
+        Stage one image unless an identical copy is already in place.
+        
+        An identical copy at previous is hardlinked instead of placed.
+        
+        Returns:
+            tuple: (method or "skipped", bytes copied)
+        """
+        try:
+            if self._is_current(source, entry, target, recorded):
+                logger.debug(f"Image {target.name} is already staged")
+                return "skipped", 0
+            
+            # Place under a temporary name, so an interrupted copy never
+            # looks like a staged image
+            tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                if previous is not None and self._reuse(source, entry, previous, previous_recorded, tmp):
+                    method, copied = "skipped", 0
+                else:
+                    method, copied = self._place(source, tmp, limiter)
+                os.replace(tmp, target)
+            finally:
+                if os.path.lexists(tmp):
+                    os.unlink(tmp)
+        except OSError as e:
+            logger.error(f"Error staging image {source}: {str(e)}")
+            raise ValueError(f"Error staging image {source}: {str(e)}")
+        
+        logger.debug(f"Staged image {source} as {target} ({method})")
+        return method, copied
+    
+    def _is_current(self, source, entry, target, recorded):
+        """Check if the target already holds the source image."""
+        try:
+            stat = target.stat()
+        except FileNotFoundError:
+            return False
+        
+        source_stat = source.stat()
+        if (stat.st_dev, stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+            return True
+        if stat.st_size != entry["size"]:
+            return False
+        if recorded and recorded["size"] == stat.st_size and recorded["mtime_ns"] == stat.st_mtime_ns:
+            return recorded["md5"] == entry["md5"]
+        return hash_file(target) == entry["md5"]
+    
+    def _reuse(self, source, entry, previous, recorded, target):
+        """
+        Hardlink an earlier copy of an image that is still current.
+        
+        Returns:
+            bool: Whether target was linked
+        """
+        if not self._is_current(source, entry, previous, recorded):
+            return False
+        try:
+            os.link(previous, target)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            return False
+        return True
+    
+    def _place(self, source, target, limiter):
+        """
+        Place a copy of source at target with the first method that works.
+        
+        Returns:
+            tuple: (method, bytes copied)
+        """
+        for method in self.methods:
+            if method == "hardlink":
+                # Earlier methods leave an empty file behind
+                if os.path.lexists(target):
+                    os.unlink(target)
+                try:
+                    os.link(source, target)
+                    return method, 0
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED:
+                        raise
+                    continue
+            
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                try:
+                    if method == "reflink":
+                        if fcntl is None:
+                            continue
+                        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                        return method, 0
+                    if method == "copy_file_range":
+                        if not hasattr(os, "copy_file_range"):
+                            continue
+                        return method, self._copy_chunks(
+                            src, dst, limiter,
+                            lambda src_fd, dst_fd, size, offset: os.copy_file_range(src_fd, dst_fd, size, offset, offset)
+                        )
+                    if method == "sendfile":
+                        if not hasattr(os, "sendfile"):
+                            continue
+                        return method, self._copy_chunks(
+                            src, dst, limiter,
+                            lambda src_fd, dst_fd, size, offset: os.sendfile(dst_fd, src_fd, offset, size)
+                        )
+                    return method, self._copy_buffered(src, dst, limiter)
+                except OSError as e:
+                    if method == "copy" or e.errno not in _UNSUPPORTED:
+                        raise
+                    # Start the next method from an empty file
+                    dst.seek(0)
+                    dst.truncate()
+        raise ValueError(f"No image staging method could place {source}")
+    
+    def _copy_chunks(self, src, dst, limiter, copy):
+        """Copy with a kernel call moving up to a chunk per call."""
+        copied = 0
+        while True:
+            if limiter is not None:
+                limiter.consume(COPY_CHUNK_SIZE)
+            done = copy(src.fileno(), dst.fileno(), COPY_CHUNK_SIZE, copied)
+            if not done:
+                return copied
+            copied += done
+    
+    def _copy_buffered(self, src, dst, limiter):
+        """Copy through a user-space buffer."""
+        copied = 0
+        while True:
+            if limiter is not None:
+                limiter.consume(COPY_CHUNK_SIZE)
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                return copied
+            dst.write(chunk)
+            copied += len(chunk)
+    
+    def _load_record(self, images_dir):
+        try:
+            with open(images_dir / STAGED_RECORD, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_record(self, images_dir, record):
+        tmp_file = images_dir / (STAGED_RECORD + ".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_file, images_dir / STAGED_RECORD)
+    
+    def __repr__(self):
+        return f"ImageStager(concurrency={self.concurrency}, bandwidth={self.bandwidth})"
@@ -0,0 +1,94 @@
+"""
+Interface renaming for node configurations.
+"""
+import re
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Characters that may not touch an interface name for it to match, so
+# Gi0/1 does not match inside Gi0/10 or Gi0/1/2. A following "." is
+# allowed so subinterfaces (Gi0/1.100) are renamed with their parent.
+_NAME_BEFORE = r"(?<![\w/-])"
+_NAME_AFTER = r"(?![\w/])"
+
+
+def interface_port(interface):
+    """
+    Get the port number of an interface name.
+    
+    Uses the last number in the name, e.g. GigabitEthernet0/1 -> 1.
+    
+    Args:
+        interface: Interface name or number
+    
+    Returns:
+        int: Port number, 0 if the name holds none
+    """
+    if interface is None:
+        return 0
+    
+    if isinstance(interface, (int, float)):
+        return int(interface)
+    
+    match = re.search(r'(\d+)/?(\d+)?$', str(interface))
+    if match:
+        if match.group(2):
+            return int(match.group(2))
+        return int(match.group(1))
+    
+    return 0
+
+
+def format_interface(interface_format, port, first_name=None):
+    """
+    Name a port following a GNS3 style port name format.
+    
+    The format may use {0} or {port0} for the port number, {port1} for
+    the port number counted from one, and {segment0}/{segment1}.
+    
+    Args:
+        interface_format (str): Format such as "Ethernet{0}" or "Gi0/0/0/{0}"
+        port (int): Port number
+        first_name (str): Name of port 0, if it is named apart (e.g.
+            "Management0/0"). Later ports are then numbered from 0.
+    
+    Returns:
+        str: Interface name
+    """
+    if first_name:
+        if port == 0:
+            return first_name
+        port -= 1
+    return interface_format.format(port, port0=port, port1=port + 1, segment0=0, segment1=1)
+
+
+@lru_cache(maxsize=256)
+def _compile(names):
+    """Compile one alternation matching any of the names, longest first."""
+    alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(f"{_NAME_BEFORE}(?:{alternatives}){_NAME_AFTER}")
+
+
+def interface_renamer(renames):
+    """
+    Build a function renaming interfaces in configuration text.
+    
+    All names are matched by a single compiled pattern in one pass.
+    Patterns are cached by name set, so nodes of the same kind share one.
+    
+    Args:
+        renames (dict): Old interface name -> new interface name
+    
+    Returns:
+        callable: Rewrites a string (a line or a whole configuration), or
+        None if there is nothing to rename
+    """
+    renames = {old: new for old, new in renames.items() if old and old != new}
+    if not renames:
+        return None
+    
+    pattern = _compile(frozenset(renames))
+    replace = lambda match: renames[match.group(0)]
+    return lambda text: pattern.sub(replace, text)
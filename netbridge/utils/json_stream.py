@@ -0,0 +1,223 @@
+"""
+Incremental reading of selected values from large JSON documents.
+
+Only the values at the requested prefixes are built; everything else is
+scanned past without being decoded, so memory stays bounded by the
+largest selected value rather than the document. ijson is used when it
+is installed, with a pure standard library reader as the fallback.
+"""
+import re
+import json
+import codecs
+import logging
+
+try:
+    import ijson
+except ImportError:  # optional dependency
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the file per step
+CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_RUN = re.compile(r'[^"\\]*')
+_STRUCTURE_RUN = re.compile(r'[^"\[\]{}]*')
+_TOKEN = re.compile(r'[^,:\[\]{}" \t\n\r]*')
+
+
+def iter_values(f, prefixes, chunk_size=None):
+    """
+    Yield the values found at the given prefixes of a JSON document.
+    
+    Prefixes use the ijson notation: keys joined by ".", with "item" for
+    the elements of an array, e.g. "topology.nodes.item".
+    
+    Args:
+        f: Binary file object holding UTF-8 JSON
+        prefixes (iterable): Prefixes of the values to yield
+        chunk_size (int): Bytes read per step by the fallback reader,
+            CHUNK_SIZE if None
+    
+    Yields:
+        tuple: (prefix, value) in document order
+    
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    prefixes = frozenset(prefixes)
+    if ijson is not None:
+        return _iter_ijson(f, prefixes)
+    return _StreamReader(f, chunk_size or CHUNK_SIZE).values(prefixes)
+
+
+def _iter_ijson(f, prefixes):
+    builder = None
+    try:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                    if depth == 0:
+                        yield target, builder.value
+                        builder = None
+            elif prefix in prefixes and event not in ("map_key", "end_map", "end_array"):
+                if event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    target, depth = prefix, 1
+                else:
+                    yield prefix, value
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON: {str(e)}")
+
+
+class _StreamReader:
+    """
+    Recursive descent JSON reader over a sliding text buffer.
+    
+    Containers on the way to a selected prefix are walked key by key,
+    selected values are decoded with the json module, and all other
+    values are skipped by scanning for their closing bracket or quote.
+    Consumed text is dropped from the buffer as it is refilled.
+    """
+    
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+    
+    def values(self, prefixes):
+        parents = {""}
+        for prefix in prefixes:
+            parts = prefix.split(".")
+            parents.update(".".join(parts[:i]) for i in range(1, len(parts)))
+        
+        yield from self._walk("", prefixes, parents)
+        if self._peek(required=False) is not None:
+            raise ValueError(f"Invalid JSON: extra data at offset {self.pos}")
+    
+    def _fill(self, size=None):
+        """Read more text, dropping what was consumed. Returns False at the end."""
+        if self.eof:
+            return False
+        data = self.f.read(size or self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(data, final=not data)
+        self.pos = 0
+        self.eof = not data
+        return True
+    
+    def _peek(self, required=True):
+        """Get the next non-whitespace character without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                if required:
+                    raise ValueError("Invalid JSON: unexpected end of document")
+                return None
+    
+    def _expect(self, characters):
+        character = self._peek()
+        if character not in characters:
+            raise ValueError(f"Invalid JSON: expected {' or '.join(characters)} but found {character!r}")
+        self.pos += 1
+        return character
+    
+    def _decode(self):
+        """Decode the next value, reading until it is complete."""
+        # A number or literal may go on in the next chunk; strings and
+        # containers end with their closing character
+        if self._peek() not in '"[{':
+            while _TOKEN.match(self.buffer, self.pos).end() == len(self.buffer) and self._fill():
+                pass
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Read in growing steps, so a large value is decoded a
+                # bounded number of times
+                if not self._fill(max(self.chunk_size, len(self.buffer))):
+                    raise ValueError(f"Invalid JSON: {str(e)}")
+                continue
+            self.pos = end
+            return value
+    
+    def _walk(self, prefix, prefixes, parents):
+        """Yield the selected values within the value at the current position."""
+        if prefix in prefixes:
+            yield prefix, self._decode()
+            return
+        character = self._peek()
+        if prefix not in parents or character not in "[{":
+            self._skip()
+            return
+        
+        self.pos += 1
+        if self._peek() == ("}" if character == "{" else "]"):
+            self.pos += 1
+            return
+        while True:
+            if character == "{":
+                key = self._decode()
+                if not isinstance(key, str):
+                    raise ValueError("Invalid JSON: object keys must be strings")
+                self._expect(":")
+                child = f"{prefix}.{key}" if prefix else key
+            else:
+                child = f"{prefix}.item" if prefix else "item"
+            yield from self._walk(child, prefixes, parents)
+            if self._expect(",}" if character == "{" else ",]") != ",":
+                return
+    
+    def _skip(self):
+        """Move past the value at the current position without decoding it."""
+        if self._peek() not in '"[{':
+            self._decode()
+            return
+        
+        depth = 0
+        while True:
+            while self.pos >= len(self.buffer):
+                if not self._fill():
+                    raise ValueError("Invalid JSON: unexpected end of document")
+            character = self.buffer[self.pos]
+            if character == '"':
+                self._skip_string()
+            elif character in "[{":
+                depth += 1
+                self.pos += 1
+            elif character in "]}":
+                depth -= 1
+                self.pos += 1
+            else:
+                self.pos = _STRUCTURE_RUN.match(self.buffer, self.pos).end()
+            if depth == 0:
+                return
+    
+    def _skip_string(self):
+        self.pos += 1
+        while True:
+            self.pos = _STRING_RUN.match(self.buffer, self.pos).end()
+            if self.pos >= len(self.buffer):
+                if not self._fill():
+                    raise ValueError("Invalid JSON: unterminated string")
+                continue
+            if self.buffer[self.pos] == '"':
+                self.pos += 1
+                return
+            # An escape; its second character may be in the next chunk
+            if self.pos + 1 >= len(self.buffer):
+                if not self._fill():
+                    raise ValueError("Invalid JSON: unterminated string")
+                continue
+            self.pos += 2
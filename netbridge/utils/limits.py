@@ -0,0 +1,286 @@
+"""
+Resource limits for parsing untrusted topology files.
+
+A ParseLimits holds the configured maximums; each parse takes a fresh
+ParseBudget from it, which the parsers charge as they read input and
+produce YAML events, XML elements, nodes and links. The first limit
+crossed stops the parse with ParseLimitExceeded, long before a
+pathological input could be parsed in full.
+"""
+import time
+import yaml
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Events or elements handled between checks of the clock
+TIME_CHECK_INTERVAL = 256
+
+LIMIT_NAMES = ("max_bytes", "max_depth", "max_aliases", "max_nodes", "max_links", "max_config_size", "max_seconds")
+
+
+class ParseLimitExceeded(ValueError):
+    """Raised when an input crosses one of the parse limits."""
+
+
+class ParseLimits:
+    """
+    Maximum resources a single parse may use. None leaves a resource unlimited.
+    """
+    
+    def __init__(self, max_bytes=None, max_depth=None, max_aliases=None, max_nodes=None, max_links=None,
+                 max_config_size=None, max_seconds=None):
+        """
+        Initialize the limits.
+        
+        Args:
+            max_bytes (int): Input size, after decompression. Content
+                already in memory is measured in characters.
+            max_depth (int): Nesting depth of YAML collections or XML
+                elements
+            max_aliases (int): YAML aliases (references to anchors)
+            max_nodes (int): Nodes in the topology
+            max_links (int): Links in the topology
+            max_config_size (int): Characters in any one YAML scalar or
+                XML text, which bounds node configurations. A value is
+                measured once it has been read whole, so set max_bytes as
+                well to stop a huge value early.
+            max_seconds (float): Wall time of the parse
+        
+        Raises:
+            ValueError: If a limit is negative
+        """
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.max_aliases = max_aliases
+        self.max_nodes = max_nodes
+        self.max_links = max_links
+        self.max_config_size = max_config_size
+        self.max_seconds = max_seconds
+        for name in LIMIT_NAMES:
+            value = getattr(self, name)
+            if value is not None and value < 0:
+                raise ValueError(f"Parse limit {name} must not be negative")
+    
+    def deadline(self):
+        """
+        Start the wall clock of a parse.
+        
+        Returns:
+            float: time.monotonic() value the parse must finish by, or
+            None without a time limit
+        """
+        return time.monotonic() + self.max_seconds if self.max_seconds is not None else None
+    
+    def budget(self, deadline=None):
+        """
+        Get a budget for one pass over an input.
+        
+        Args:
+            deadline (float): Deadline shared with earlier passes over the
+                same input. A new one is started if None.
+        
+        Returns:
+            ParseBudget: The budget to charge
+        """
+        return ParseBudget(self, deadline if deadline is not None else self.deadline())
+    
+    def __repr__(self):
+        limits = ", ".join(f"{name}={getattr(self, name)}" for name in LIMIT_NAMES if getattr(self, name) is not None)
+        return f"ParseLimits({limits})"
+
+
+def parse_limits(limits):
+    """
+    Get usable limits for an optional ParseLimits argument.
+    
+    Returns:
+        ParseLimits: The given limits, or limits allowing everything
+    """
+    return limits if limits is not None else ParseLimits()
+
+
+class ParseBudget:
+    """
+    Resources used so far by one pass over an input.
+    """
+    
+    def __init__(self, limits, deadline):
+        self.limits = limits
+        self.deadline = deadline
+        self.bytes = 0
+        self.depth = 0
+        self.aliases = 0
+        self.nodes = 0
+        self.links = 0
+        self._until_time_check = TIME_CHECK_INTERVAL
+    
+    def _exceeded(self, message):
+        logger.warning(f"Parse rejected: {message}")
+        raise ParseLimitExceeded(message)
+    
+    def check_time(self):
+        """Check the wall time of the parse."""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._exceeded(f"Parsing took longer than the limit of {self.limits.max_seconds} seconds")
+    
+    def _tick(self):
+        self._until_time_check -= 1
+        if self._until_time_check <= 0:
+            self._until_time_check = TIME_CHECK_INTERVAL
+            self.check_time()
+    
+    def read(self, size):
+        """Charge size bytes of input."""
+        self.bytes += size
+        if self.limits.max_bytes is not None and self.bytes > self.limits.max_bytes:
+            self._exceeded(f"Input is larger than the limit of {self.limits.max_bytes} bytes")
+        self.check_time()
+    
+    def content(self, content):
+        """Charge a document already in memory."""
+        self.read(len(content))
+    
+    def reader(self, stream):
+        """
+        Wrap a file object so its reads are charged.
+        
+        Returns:
+            The stream itself if neither input size nor time is limited
+        """
+        if self.limits.max_bytes is None and self.deadline is None:
+            return stream
+        return _LimitedReader(stream, self)
+    
+    def enter(self):
+        """Charge one level of nesting."""
+        self.depth += 1
+        if self.limits.max_depth is not None and self.depth > self.limits.max_depth:
+            self._exceeded(f"Input is nested deeper than the limit of {self.limits.max_depth} levels")
+    
+    def leave(self):
+        """Release one level of nesting."""
+        self.depth -= 1
+    
+    def alias(self):
+        """Charge one YAML alias."""
+        self.aliases += 1
+        if self.limits.max_aliases is not None and self.aliases > self.limits.max_aliases:
+            self._exceeded(f"Input uses more than the limit of {self.limits.max_aliases} YAML aliases")
+    
+    def text(self, text):
+        """Charge one scalar or text value."""
+        if self.limits.max_config_size is not None and text and len(text) > self.limits.max_config_size:
+            self._exceeded(f"Input holds a value longer than the limit of {self.limits.max_config_size} characters")
+        self._tick()
+    
+    def node(self, count=1):
+        """Charge nodes of the topology."""
+        self.nodes += count
+        if self.limits.max_nodes is not None and self.nodes > self.limits.max_nodes:
+            self._exceeded(f"Topology has more than the limit of {self.limits.max_nodes} nodes")
+        self._tick()
+    
+    def link(self, count=1):
+        """Charge links of the topology."""
+        self.links += count
+        if self.limits.max_links is not None and self.links > self.limits.max_links:
+            self._exceeded(f"Topology has more than the limit of {self.limits.max_links} links")
+        self._tick()
+    
+    def event(self, event):
+        """Charge one YAML parser event."""
+        if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            self.enter()
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            self.leave()
+        elif isinstance(event, yaml.ScalarEvent):
+            self.text(event.value)
+            return
+        elif isinstance(event, yaml.AliasEvent):
+            self.alias()
+        self._tick()
+    
+    def events(self, events):
+        """
+        Charge a YAML event stream as it is consumed.
+        
+        Returns:
+            The events themselves if no event-level limit is set
+        """
+        limits = self.limits
+        if (limits.max_depth is None and limits.max_aliases is None and limits.max_config_size is None
+                and self.deadline is None):
+            return events
+        return self._charged_events(events)
+    
+    def _charged_events(self, events):
+        for event in events:
+            self.event(event)
+            yield event
+
+
+class _LimitedReader:
+    """File object wrapper charging every read to a budget."""
+    
+    def __init__(self, stream, budget):
+        self._stream = stream
+        self._budget = budget
+    
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self._budget.read(len(data))
+        return data
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class LimitedSafeLoader(yaml.SafeLoader):
+    """
+    SafeLoader charging the events it composes to a budget.
+    
+    The entries of topology.nodes and topology.links are charged as their
+    values start to be composed, so an oversized topology is rejected
+    before the rest of the document is loaded. Use through
+    limited_loader(), which binds the budget.
+    """
+    
+    budget = None
+    
+    def __init__(self, stream):
+        super().__init__(stream)
+        # Keys leading to the node being composed, None for keys themselves
+        self._path = []
+    
+    def get_event(self):
+        event = super().get_event()
+        self.budget.event(event)
+        return event
+    
+    def compose_node(self, parent, index):
+        key = index.value if isinstance(index, yaml.ScalarNode) else None
+        path = self._path
+        if len(path) == 3 and index is not None and path[1] == "topology":
+            if path[2] == "nodes":
+                self.budget.node()
+            elif path[2] == "links":
+                self.budget.link()
+        path.append(key)
+        try:
+            return super().compose_node(parent, index)
+        finally:
+            path.pop()
+
+
+def limited_loader(budget):
+    """
+    Get a SafeLoader class for yaml.load that charges a budget.
+    
+    Args:
+        budget (ParseBudget): Budget of the parse
+    
+    Returns:
+        type: Loader class
+    """
+    return type("LimitedSafeLoader", (LimitedSafeLoader,), {"budget": budget})
@@ -2,41 +2,243 @@
 Node mapping utilities for NetBridge.
 """
 import logging
+from collections import namedtuple
+from types import MappingProxyType
+from collections.abc import Mapping
+from netbridge.utils.progress import reporter_for
 
 logger = logging.getLogger(__name__)
 
+# Resolved GNS3 settings for a node. Kept apart from the parsed node models
+# so one parsed topology can be mapped by several callers at once.
+# interface_format (a GNS3 style port name format such as "Ethernet{0}")
+# and first_interface_name are set when configurations need their
+# interfaces renamed for the target template. targets holds the settings
+# of other generators, e.g. {"containerlab": {"kind": "cisco_csr1000v"}}.
+NodeMapping = namedtuple(
+    "NodeMapping", ["gns3_template", "console_type", "interface_format", "first_interface_name", "targets"],
+    defaults=(None, None, MappingProxyType({}))
+)
 
-def map_nodes(topology, node_mappings):
+# Mapping used for node types that have no entry in the mappings
+UNKNOWN_NODE_MAPPING = NodeMapping(gns3_template="qemu", console_type="telnet")
+
+# Properties holding the disk image of a GNS3 node, by emulator
+_IMAGE_PROPERTIES = ("hda_disk_image", "image", "path")
+
+
+class NodeMappingResult:
+    """
+    Resolved node mappings for one topology.
+    
+    Mappings are resolved once per node type, so the result stays small
+    however many nodes the topology has.
+    """
+    
+    def __init__(self, by_type):
+        """
+        Initialize a mapping result.
+        
+        Args:
+            by_type (dict): Mapping from node type to NodeMapping
+        """
+        self.by_type = MappingProxyType(by_type)
+    
+    def for_node(self, node):
+        """
+        Get the mapping of a node.
+        
+        Args:
+            node: A CMLNode or VIRLNode
+            
+        Returns:
+            NodeMapping: The resolved mapping
+        """
+        return self.by_type.get(node.node_type or "unknown", UNKNOWN_NODE_MAPPING)
+    
+    def __repr__(self):
+        return f"NodeMappingResult(types={len(self.by_type)})"
+
+
+def freeze_mappings(node_mappings):
+    """
+    Take an immutable snapshot of a node mapping configuration.
+    
+    Args:
+        node_mappings (dict): Mapping from node types to GNS3 templates
+        
+    Returns:
+        MappingProxyType: Read-only copy that later changes to the
+        original dict cannot affect
+    """
+    return MappingProxyType({
+        node_type: MappingProxyType({
+            key: MappingProxyType(dict(value)) if isinstance(value, Mapping) else value
+            for key, value in mapping.items()
+        })
+        for node_type, mapping in (node_mappings or {}).items()
+    })
+
+
+def map_nodes(topology, node_mappings, catalog=None, progress=None):
     """
     Map topology nodes to GNS3 templates based on node mappings.
     
+    The topology is not modified.
+    
     Args:
         topology: The parsed topology (CMLTopology or VIRLTopology)
         node_mappings (dict): Mapping from node types to GNS3 templates
+        catalog (ApplianceCatalog): Optional loaded appliance catalog used
+            for node types missing from node_mappings
+        progress (ProgressReporter): Optional progress reporter and
+            cancellation check
         
     Returns:
-        The same topology object with GNS3 template information added to nodes
-        
-    Raises:
-        ValueError: If a required node type mapping is missing
+        NodeMappingResult: GNS3 template information for the nodes
     """
+    by_type = {}
+    progress = reporter_for(progress)
+    
     for node_id, node in topology.nodes.items():
+        progress.advance(nodes=1)
+        
         # Get the node type (or use a default if missing)
         node_type = node.node_type or "unknown"
+        if node_type in by_type:
+            continue
+        
+        # Fall back to the appliance catalog for unmapped node types
+        appliance = None
+        if node_type not in node_mappings and catalog is not None:
+            appliance = _catalog_entry(catalog, node)
         
         # Check if we have a mapping for this node type
         if node_type in node_mappings:
             mapping = node_mappings[node_type]
-            node.gns3_template = mapping.get("gns3_template", "qemu")
-            node.console_type = mapping.get("console_type", "telnet")
-            logger.debug(f"Mapped node {node_id} ({node_type}) to {node.gns3_template}")
+            by_type[node_type] = NodeMapping(
+                gns3_template=mapping.get("gns3_template", "qemu"),
+                console_type=mapping.get("console_type", "telnet"),
+                interface_format=mapping.get("interface_format"),
+                first_interface_name=mapping.get("first_interface_name"),
+                targets=MappingProxyType({
+                    target: settings for target, settings in mapping.items() if isinstance(settings, Mapping)
+                })
+            )
+            logger.debug(f"Mapped node type {node_type} to {by_type[node_type].gns3_template}")
+        elif appliance is not None:
+            by_type[node_type] = NodeMapping(
+                gns3_template=appliance["name"],
+                console_type=appliance["console_type"] or "telnet",
+                interface_format=appliance.get("port_name_format"),
+                first_interface_name=appliance.get("first_port_name")
+            )
+            logger.debug(f"Mapped node type {node_type} to catalog appliance {appliance['name']}")
         else:
             # Use a default mapping for unknown node types
-            node.gns3_template = "qemu"
-            node.console_type = "telnet"
+            by_type[node_type] = UNKNOWN_NODE_MAPPING
             logger.warning(f"No mapping found for node type '{node_type}' (node ID: {node_id})")
     
-    return topology
+    return NodeMappingResult(by_type)
+
+
+class InverseNodeMappings:
+    """
+    Lookup from GNS3 templates back to the node types mapped to them.
+    
+    Built once from a node mapping configuration, so converting GNS3
+    projects back costs one dict lookup per node.
+    
+    Projects written by NetBridge name the template of every node. GNS3
+    itself only stores the emulator ("qemu") and the template's ID on the
+    server, so their nodes are found through the server's template IDs or
+    through the disk image in the node's properties and an appliance
+    catalog.
+    """
+    
+    def __init__(self, node_mappings, templates=None, catalog=None):
+        """
+        Index node mappings by GNS3 template.
+        
+        When several node types map to the same template the first one
+        wins, so put the preferred type first.
+        
+        Args:
+            node_mappings (dict): Mapping from node types to GNS3 templates
+            templates (dict): Template name -> template ID of a GNS3 server
+                (see GNS3Client.get_templates), to recognize the nodes of
+                projects created on that server
+            catalog (ApplianceCatalog): Loaded appliance catalog used to
+                find the template of a node from its disk image
+        """
+        template_ids = {}
+        for name, template_id in (templates or {}).items():
+            template_ids.setdefault(str(name).casefold(), []).append(template_id)
+        
+        by_template = {}
+        for node_type, mapping in (node_mappings or {}).items():
+            template = mapping.get("gns3_template")
+            if not template:
+                continue
+            # Generated nodes carry the template name as their type and a
+            # template ID derived from it
+            keys = [template, f"template-{template}"] + template_ids.get(template.casefold(), [])
+            for key in keys:
+                by_template.setdefault(str(key).casefold(), (node_type, mapping))
+        self.by_template = MappingProxyType(by_template)
+        self.catalog = catalog
+    
+    def lookup(self, *names):
+        """
+        Find the node type of a GNS3 template.
+        
+        Args:
+            *names: Template names or IDs to try in turn; None is ignored
+        
+        Returns:
+            tuple: (node type, node mapping), or (None, None) if no name
+            is mapped
+        """
+        for name in names:
+            if name:
+                found = self.by_template.get(str(name).casefold())
+                if found is not None:
+                    return found
+        return None, None
+    
+    def for_node(self, node):
+        """
+        Find the node type of a GNS3 node.
+        
+        The node's template name and ID are tried first, then the appliance
+        using its disk image.
+        
+        Args:
+            node (GNS3Node): Node of a parsed GNS3 project
+        
+        Returns:
+            tuple: (node type, node mapping), or (None, None) if the node's
+            template is not mapped
+        """
+        found = self.lookup(node.node_type, node.template_id)
+        if found[0] is not None or self.catalog is None:
+            return found
+        properties = node.properties or {}
+        for key in _IMAGE_PROPERTIES:
+            image = properties.get(key)
+            appliance = self.catalog.by_image(image) if image else None
+            if appliance is not None:
+                return self.lookup(appliance["name"])
+        return None, None
+    
+    def __repr__(self):
+        return f"InverseNodeMappings(templates={len(self.by_template)})"
+
+
+def _catalog_entry(catalog, node):
+    """Look up a node in an appliance catalog by its type and image."""
+    image = getattr(node, 'image_definition', None) or getattr(node, 'image', None)
+    return catalog.resolve(node.node_type, image)
 
 
 def create_default_mapping():
@@ -44,31 +246,12 @@ def create_default_mapping():
     Create a default node mapping configuration.
     
     Returns:
-        dict: Default node mapping configuration
+        dict: Editable copy of DEFAULT_NODE_MAPPINGS
     """
+    # Imported here because the config module imports this one
+    from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+    
     return {
-        "iosv": {
-            "gns3_template": "Cisco IOSv",
-            "console_type": "telnet"
-        },
-        "iosvl2": {
-            "gns3_template": "Cisco IOSvL2",
-            "console_type": "telnet"
-        },
-        "csr1000v": {
-            "gns3_template": "Cisco CSR1000v",
-            "console_type": "telnet"
-        },
-        "nxosv": {
-            "gns3_template": "Cisco NX-OSv",
-            "console_type": "telnet"
-        },
-        "asav": {
-            "gns3_template": "Cisco ASAv",
-            "console_type": "telnet"
-        },
-        "linux": {
-            "gns3_template": "Linux",
-            "console_type": "telnet"
-        }
+        node_type: {key: dict(value) if isinstance(value, Mapping) else value for key, value in mapping.items()}
+        for node_type, mapping in DEFAULT_NODE_MAPPINGS.items()
     }
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Progress reporting and cooperative cancellation for conversions.
+"""
+import time
+import logging
+import threading
+import contextlib
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# One progress notification. kind is "stage_start", "stage_end" or
+# "progress"; nodes and links count the items processed in the stage.
+ProgressEvent = namedtuple("ProgressEvent", ["kind", "stage", "nodes", "links", "elapsed"])
+
+# Items processed between checks of the clock and the cancellation token
+CHECK_EVERY = 256
+
+
+class ConversionCancelled(Exception):
+    """Raised inside a conversion once its cancellation token is cancelled."""
+
+
+class CancellationToken:
+    """
+    Thread-safe flag used to ask a running conversion to stop.
+    
+    The conversion checks the token between chunks of work and raises
+    ConversionCancelled at the next check after cancel() is called.
+    """
+    
+    def __init__(self):
+        """Initialize an uncancelled token."""
+        self._event = threading.Event()
+    
+    def cancel(self):
+        """Request cancellation."""
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        """Whether cancellation was requested."""
+        return self._event.is_set()
+    
+    def check(self):
+        """
+        Stop the conversion if cancellation was requested.
+        
+        Raises:
+            ConversionCancelled: If the token is cancelled
+        """
+        if self._event.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+
+
+class ProgressReporter:
+    """
+    Throttled progress reporting for one conversion.
+    
+    Hot loops call advance() once per node or link. The callback and the
+    cancellation token are only consulted every CHECK_EVERY items, and
+    progress events are sent at most once per interval, so reporting
+    costs little more than a counter increment.
+    """
+    
+    def __init__(self, callback=None, token=None, interval=0.5):
+        """
+        Initialize the reporter.
+        
+        Args:
+            callback (callable): Called with each ProgressEvent
+            token (CancellationToken): Optional token checked between chunks
+            interval (float): Minimum seconds between progress events
+        """
+        self.callback = callback
+        self.token = token
+        self.interval = interval
+        self.stage_name = None
+        self.nodes = 0
+        self.links = 0
+        self._pending = 0
+        self._started = time.monotonic()
+        self._last_sent = self._started
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Report the start and end of a conversion stage.
+        
+        Args:
+            name (str): Stage name, e.g. "parse" or "generate"
+        """
+        self.check()
+        self.stage_name = name
+        self.nodes = self.links = self._pending = 0
+        self._started = self._last_sent = time.monotonic()
+        self._send("stage_start")
+        yield self
+        self._send("stage_end")
+        self.check()
+    
+    def advance(self, nodes=0, links=0):
+        """
+        Count processed nodes and links.
+        
+        Raises:
+            ConversionCancelled: If the token was cancelled
+        """
+        self.nodes += nodes
+        self.links += links
+        self._pending += 1
+        if self._pending >= CHECK_EVERY:
+            self._pending = 0
+            self.check()
+            if self.callback is not None and time.monotonic() - self._last_sent >= self.interval:
+                self._send("progress")
+    
+    def check(self):
+        """
+        Stop the conversion if cancellation was requested.
+        
+        Raises:
+            ConversionCancelled: If the token was cancelled
+        """
+        if self.token is not None:
+            self.token.check()
+    
+    def _send(self, kind):
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        self._last_sent = now
+        try:
+            self.callback(ProgressEvent(kind, self.stage_name, self.nodes, self.links, now - self._started))
+        except Exception as e:
+            # A broken progress display must not fail the conversion
+            logger.warning(f"Progress callback failed: {str(e)}")
+
+
+def reporter_for(progress):
+    """Get the reporter to use for an optional progress argument."""
+    return progress if progress is not None else ProgressReporter()
@@ -0,0 +1,348 @@
+"""
+Console port and MAC address allocation shared across projects.
+
+Projects loaded on the same GNS3 server need distinct console ports and
+MAC addresses. The allocator hands out both from free lists of intervals
+kept in a small state file, locked while it is read and written, so
+conversions run one after another or at the same time never collide.
+"""
+import os
+import json
+import bisect
+import contextlib
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# Console ports GNS3 servers hand out by default
+DEFAULT_CONSOLE_RANGE = (5000, 10000)
+
+# Locally administered MAC prefix; the low 24 bits are allocated
+DEFAULT_MAC_BASE = "02:4e:42:00:00:00"
+MAC_SPACE = 1 << 24
+
+# Addresses per node, one for each adapter
+DEFAULT_MAC_BLOCK = 64
+
+
+def _mac_to_int(mac):
+    try:
+        value = int(mac.replace(":", "").replace("-", ""), 16)
+    except ValueError:
+        value = -1
+    if not 0 <= value < 1 << 48:
+        raise ValueError(f"Invalid MAC address: {mac}")
+    return value
+
+
+def _int_to_mac(value):
+    return ":".join(f"{(value >> shift) & 0xff:02x}" for shift in range(40, -8, -8))
+
+
+class _FreeList:
+    """
+    Free integers of a range, as sorted disjoint [start, end) intervals.
+    
+    Allocation takes from the lowest interval, so handing out n values
+    costs O(1) amortized each; released values are merged back in.
+    """
+    
+    def __init__(self, intervals):
+        self.intervals = deque(tuple(interval) for interval in intervals)
+        self.size = sum(end - start for start, end in self.intervals)
+    
+    def __len__(self):
+        return self.size
+    
+    def take(self, count):
+        """
+        Take count values.
+        
+        Returns:
+            list: The taken [start, end) intervals
+        
+        Raises:
+            ValueError: If fewer than count values are free
+        """
+        if count > len(self):
+            raise ValueError(f"Only {len(self)} free values left, {count} requested")
+        taken = []
+        while count:
+            start, end = self.intervals.popleft()
+            if end - start > count:
+                self.intervals.appendleft((start + count, end))
+                end = start + count
+            taken.append((start, end))
+            count -= end - start
+            self.size -= end - start
+        return taken
+    
+    def give(self, intervals):
+        """Return taken intervals to the free list."""
+        merged = []
+        for start, end in sorted(list(self.intervals) + [tuple(interval) for interval in intervals]):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.intervals = deque(merged)
+        self.size = sum(end - start for start, end in merged)
+
+
+class Reservation:
+    """
+    Console ports and MAC address blocks reserved for the nodes of one project.
+    
+    Node n (counted from 0 in generation order) gets the n-th port and the
+    n-th MAC block.
+    """
+    
+    def __init__(self, owner, console, mac, mac_base, mac_block):
+        """
+        Initialize a reservation.
+        
+        Args:
+            owner (str): Key the reservation is held under
+            console (list): Reserved console port [start, end) intervals
+            mac (list): Reserved MAC block number [start, end) intervals
+            mac_base (int): First address of the MAC range
+            mac_block (int): Addresses per MAC block
+        """
+        self.owner = owner
+        self.console = [tuple(interval) for interval in console]
+        self.mac = [tuple(interval) for interval in mac]
+        self.mac_base = mac_base
+        self.mac_block = mac_block
+        self._console_offsets = self._offsets(self.console)
+        self._mac_offsets = self._offsets(self.mac)
+    
+    @staticmethod
+    def _offsets(intervals):
+        offsets = [0]
+        for start, end in intervals:
+            offsets.append(offsets[-1] + end - start)
+        return offsets
+    
+    @staticmethod
+    def _value(intervals, offsets, index):
+        if not 0 <= index < offsets[-1]:
+            raise IndexError(index)
+        position = bisect.bisect_right(offsets, index) - 1
+        return intervals[position][0] + index - offsets[position]
+    
+    def __len__(self):
+        return self._console_offsets[-1]
+    
+    def console_port(self, index):
+        """Get the console port of the index-th node."""
+        return self._value(self.console, self._console_offsets, index)
+    
+    def mac_address(self, index):
+        """Get the base MAC address of the index-th node."""
+        block = self._value(self.mac, self._mac_offsets, index)
+        return _int_to_mac(self.mac_base + block * self.mac_block)
+    
+    def __repr__(self):
+        return f"Reservation(owner={self.owner}, nodes={len(self)})"
+
+
+class ResourceAllocator:
+    """
+    Allocates console ports and MAC address blocks from a shared state file.
+    
+    Reservations are held per owner, normally the output directory of a
+    project, until released. Reserving again for the same owner and node
+    count returns the same ports and addresses, so reconverting a project
+    keeps them stable.
+    """
+    
+    def __init__(self, state_file, console_range=DEFAULT_CONSOLE_RANGE, mac_base=DEFAULT_MAC_BASE,
+                 mac_block=DEFAULT_MAC_BLOCK):
+        """
+        Initialize the allocator.
+        
+        Args:
+            state_file (Path): File holding the free lists and reservations,
+                created on first use. Every allocator sharing it must use
+                the same ranges.
+            console_range (tuple): First and last console port to hand out
+            mac_base (str): First MAC address to hand out; addresses are
+                allocated up to the end of its 24-bit suffix range
+            mac_block (int): Consecutive MAC addresses reserved per node
+        
+        Raises:
+            ValueError: If a range is invalid
+        """
+        first, last = console_range
+        if not 0 < first <= last <= 65535:
+            raise ValueError(f"Invalid console port range: {first}-{last}")
+        if mac_block < 1:
+            raise ValueError("MAC block size must be at least 1")
+        
+        self.state_file = Path(state_file)
+        self.console_range = (first, last)
+        self.mac_base = _mac_to_int(mac_base)
+        self.mac_block = mac_block
+        self.mac_blocks = (MAC_SPACE - (self.mac_base % MAC_SPACE)) // mac_block
+        if not self.mac_blocks:
+            raise ValueError(f"No room for a block of {mac_block} MAC addresses after {mac_base}")
+        self._lock = threading.Lock()
+    
+    def reserve(self, owner, count):
+        """
+        Reserve resources for the nodes of one project.
+        
+        Args:
+            owner (str): Key to hold the reservation under
+            count (int): Number of nodes
+        
+        Returns:
+            Reservation: The reserved ports and MAC blocks
+        
+        Raises:
+            ValueError: If the ranges are exhausted
+        """
+        return self.reserve_many({owner: count})[owner]
+    
+    def reserve_many(self, requests):
+        """
+        Reserve resources for several projects in one update of the state file.
+        
+        Args:
+            requests (dict): Owner -> number of nodes
+        
+        Returns:
+            dict: Owner -> Reservation
+        
+        Raises:
+            ValueError: If the ranges are exhausted; nothing is reserved then
+        """
+        with self._locked_state() as state:
+            console = _FreeList(state["free"]["console"])
+            mac = _FreeList(state["free"]["mac"])
+            owners = dict(state["owners"])
+            
+            # Release every changed reservation before allocating, so a
+            # shrinking project can make room for a growing one
+            for owner, count in requests.items():
+                held = owners.get(owner)
+                if held is not None and held["count"] != count:
+                    console.give(held["console"])
+                    mac.give(held["mac"])
+                    del owners[owner]
+            for owner, count in requests.items():
+                if owner not in owners:
+                    try:
+                        owners[owner] = {
+                            "count": count,
+                            "console": [list(interval) for interval in console.take(count)],
+                            "mac": [list(interval) for interval in mac.take(count)]
+                        }
+                    except ValueError as e:
+                        raise ValueError(f"Cannot reserve resources for {count} nodes of {owner}: {str(e)}")
+            
+            state["owners"] = owners
+            state["free"] = {"console": [list(interval) for interval in console.intervals],
+                             "mac": [list(interval) for interval in mac.intervals]}
+        
+        logger.info(f"Reserved console ports and MAC addresses for {sum(requests.values())} nodes "
+                    f"in {self.state_file}")
+        return {owner: self._reservation(owner, owners[owner]) for owner in requests}
+    
+    def release(self, owner):
+        """
+        Release the reservation of an owner.
+        
+        Returns:
+            bool: True if the owner held a reservation
+        """
+        with self._locked_state() as state:
+            held = state["owners"].pop(owner, None)
+            if held is None:
+                return False
+            for kind in ("console", "mac"):
+                free = _FreeList(state["free"][kind])
+                free.give(held[kind])
+                state["free"][kind] = [list(interval) for interval in free.intervals]
+        logger.info(f"Released console ports and MAC addresses of {owner}")
+        return True
+    
+    def reservations(self):
+        """
+        Get the current reservations.
+        
+        Returns:
+            dict: Owner -> Reservation
+        """
+        with self._locked_state() as state:
+            return {owner: self._reservation(owner, held) for owner, held in state["owners"].items()}
+    
+    def _reservation(self, owner, held):
+        return Reservation(owner, held["console"], held["mac"], self.mac_base, self.mac_block)
+    
+    def _empty_state(self):
+        return {
+            "version": STATE_VERSION,
+            "console_range": list(self.console_range),
+            "mac_base": _int_to_mac(self.mac_base),
+            "mac_block": self.mac_block,
+            "free": {
+                "console": [[self.console_range[0], self.console_range[1] + 1]],
+                "mac": [[0, self.mac_blocks]]
+            },
+            "owners": {}
+        }
+    
+    @contextlib.contextmanager
+    def _locked_state(self):
+        """
+        Hold the state file lock while the state is read, changed and saved.
+        
+        The state is saved on a clean exit only.
+        
+        Yields:
+            dict: The loaded state, to be changed in place
+        """
+        with self._lock:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            # Closing the lock file releases the lock
+            with open(f"{self.state_file}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                state = self._load()
+                yield state
+                
+                tmp_file = self.state_file.with_name(self.state_file.name + ".tmp")
+                with open(tmp_file, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp_file, self.state_file)
+    
+    def _load(self):
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return self._empty_state()
+        except ValueError as e:
+            raise ValueError(f"Invalid resource state file {self.state_file}: {str(e)}")
+        
+        expected = self._empty_state()
+        for key in ("version", "console_range", "mac_base", "mac_block"):
+            if state.get(key) != expected[key]:
+                raise ValueError(f"Resource state file {self.state_file} was created with {key} "
+                                 f"{state.get(key)}, not {expected[key]}")
+        return state
+    
+    def __repr__(self):
+        return f"ResourceAllocator(state_file={self.state_file})"
+
@@ -0,0 +1,89 @@
+"""
+JSON Schema validation of CML inputs and GNS3 outputs.
+
+The schemas ship in netbridge/schemas. Each validator is compiled once per
+process and cached, and large documents are validated one element (node
+or link) at a time as they are parsed or generated.
+"""
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+import jsonschema
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_DIR = Path(__file__).resolve().parent.parent / "schemas"
+
+
+@lru_cache(maxsize=None)
+def load_schema(name):
+    """
+    Load a bundled schema.
+    
+    Args:
+        name (str): Schema name, "cml" or "gns3"
+    
+    Returns:
+        dict: The JSON Schema
+    """
+    with open(SCHEMA_DIR / f"{name}.schema.json", 'r') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_validator(name, definition=None):
+    """
+    Get the compiled validator of a schema or one of its definitions.
+    
+    Args:
+        name (str): Schema name, "cml" or "gns3"
+        definition (str): Definition under $defs, e.g. "node". None
+            validates whole documents.
+    
+    Returns:
+        jsonschema.protocols.Validator: Cached validator
+    """
+    schema = load_schema(name)
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    if definition is not None:
+        # Keep $defs so references between definitions still resolve
+        schema = {"$schema": schema["$schema"], "$defs": schema["$defs"],
+                  "$ref": f"#/$defs/{definition}"}
+    return cls(schema)
+
+
+def validate_element(name, definition, data, label):
+    """
+    Validate one element of a document against its schema definition.
+    
+    Args:
+        name (str): Schema name, "cml" or "gns3"
+        definition (str): Definition under $defs, e.g. "node" or "link"
+        data: The element
+        label (str): Element description used in messages, e.g. "node r1"
+    
+    Raises:
+        ValueError: If the element does not match the schema
+    """
+    error = jsonschema.exceptions.best_match(get_validator(name, definition).iter_errors(data))
+    if error is not None:
+        field = ".".join(str(part) for part in error.absolute_path)
+        where = f"field '{field}': " if field else ""
+        logger.error(f"Schema validation failed for {label}: {where}{error.message}")
+        raise ValueError(f"Invalid {label}: {where}{error.message}")
+
+
+def validate_document(name, data):
+    """
+    Validate a whole document against a schema.
+    
+    Args:
+        name (str): Schema name, "cml" or "gns3"
+        data: The document
+    
+    Raises:
+        ValueError: If the document does not match the schema
+    """
+    validate_element(name, None, data, f"{name} document")
@@ -0,0 +1,197 @@
+"""
+Node selection for converting part of a topology.
+"""
+import logging
+from fnmatch import fnmatchcase
+
+logger = logging.getLogger(__name__)
+
+# Node type given to stand-ins for nodes cut off by a selection. Mapped to
+# the GNS3 Cloud template by the default node mappings.
+CLOUD_NODE_TYPE = "external_connector"
+
+CUT_MODES = ("drop", "cloud")
+
+FILTER_KINDS = ("label", "id", "type", "attr")
+
+
+class NodeSelection:
+    """
+    Selects the nodes to convert and handles links leaving the selection.
+    
+    Filters are strings of the form "kind:pattern", with glob patterns:
+    
+        label:site1-*        node label (also the meaning of a bare pattern)
+        id:n1*               node ID
+        type:iosv*           node type (CML node_definition)
+        attr:role=spine      any other node field, as key=pattern
+    
+    A node is selected if any filter matches it. The selection is then
+    grown by the given number of hops along links.
+    """
+    
+    def __init__(self, filters, hops=0, cut="drop"):
+        """
+        Initialize the selection.
+        
+        Args:
+            filters (list): Filter strings, see the class docstring
+            hops (int): Also select nodes up to this many links away
+            cut (str): What to do with links that have one end outside the
+                selection: "drop" them, or "cloud" to keep them connected
+                to a Cloud node standing in for the outside node
+        
+        Raises:
+            ValueError: If a filter or the cut mode is invalid
+        """
+        if cut not in CUT_MODES:
+            raise ValueError(f"Unknown cut mode '{cut}', expected one of {', '.join(CUT_MODES)}")
+        if hops < 0:
+            raise ValueError("Hops must not be negative")
+        
+        self.filters = [self._parse_filter(text) for text in filters]
+        self.hops = hops
+        self.cut = cut
+    
+    def __repr__(self):
+        return f"NodeSelection(filters={self.filters}, hops={self.hops}, cut={self.cut})"
+    
+    @staticmethod
+    def _parse_filter(text):
+        kind, sep, pattern = text.partition(":")
+        if not sep or kind not in FILTER_KINDS:
+            return ("label", None, text)
+        if kind == "attr":
+            key, sep, pattern = pattern.partition("=")
+            if not sep or not key:
+                raise ValueError(f"Invalid attribute filter '{text}', expected attr:key=pattern")
+            return (kind, key, pattern)
+        return (kind, None, pattern)
+    
+    def matches(self, node_id, label, node_type, fields):
+        """
+        Check if a node matches any filter.
+        
+        Args:
+            node_id: Node ID
+            label (str): Node label
+            node_type (str): Node type
+            fields (dict): All other fields of the node
+        
+        Returns:
+            bool: True if the node is selected by a filter
+        """
+        for kind, key, pattern in self.filters:
+            if kind == "label":
+                value = label
+            elif kind == "id":
+                value = node_id
+            elif kind == "type":
+                value = node_type
+            else:
+                value = fields.get(key)
+            if value is not None and fnmatchcase(str(value), pattern):
+                return True
+        return False
+    
+    def expand(self, seeds, links):
+        """
+        Grow a set of selected nodes by the configured number of hops.
+        
+        Args:
+            seeds (set): IDs of the nodes matched by the filters
+            links: Iterable of (node1_id, node2_id) pairs
+        
+        Returns:
+            set: IDs of the selected nodes
+        """
+        selected = set(seeds)
+        if not self.hops:
+            return selected
+        
+        neighbors = {}
+        for a, b in links:
+            neighbors.setdefault(a, set()).add(b)
+            neighbors.setdefault(b, set()).add(a)
+        
+        frontier = selected
+        for _ in range(self.hops):
+            frontier = {other for node_id in frontier for other in neighbors.get(node_id, ())} - selected
+            if not frontier:
+                break
+            selected |= frontier
+        return selected
+    
+    def finish(self, topology, links, outside):
+        """
+        Add the links of a selected topology, handling links at the cut.
+        
+        Args:
+            topology: Topology holding only the selected nodes
+            links: Candidate links (CMLLink or VIRLLink) of the full topology
+            outside (dict): Node ID -> field dict (label, x, y) of nodes
+                outside the selection
+        """
+        selected = set(topology.nodes)
+        clouds = 0
+        dropped = 0
+        for link in links:
+            inside1 = link.node1_id in selected
+            inside2 = link.node2_id in selected
+            if inside1 and inside2:
+                topology.add_link(link)
+                continue
+            if not (inside1 or inside2):
+                continue
+            
+            inside_id, outside_id = (link.node1_id, link.node2_id) if inside1 else (link.node2_id, link.node1_id)
+            if self.cut == "drop" or outside_id not in outside:
+                dropped += 1
+                continue
+            
+            if outside_id not in topology.nodes:
+                fields = outside[outside_id]
+                node_class = type(topology.nodes[inside_id])
+                topology.add_node(node_class(
+                    id=outside_id,
+                    label=f"{fields.get('label') or outside_id} (external)",
+                    node_type=CLOUD_NODE_TYPE,
+                    x=fields.get('x', 0),
+                    y=fields.get('y', 0)
+                ))
+                clouds += 1
+            topology.add_link(link)
+        
+        if dropped:
+            logger.info(f"Dropped {dropped} links leaving the selection")
+        if clouds:
+            logger.info(f"Replaced {clouds} nodes outside the selection with Cloud nodes")
+    
+    def apply(self, topology):
+        """
+        Reduce an already parsed topology to the selection.
+        
+        Args:
+            topology: The parsed topology (CMLTopology or VIRLTopology)
+        
+        Returns:
+            The same topology, holding only the selected nodes
+        """
+        seeds = {
+            node_id for node_id, node in topology.nodes.items()
+            if self.matches(node_id, node.label, node.node_type, vars(node))
+        }
+        selected = self.expand(seeds, ((link.node1_id, link.node2_id) for link in topology.links.values()))
+        
+        outside = {
+            node_id: {"label": node.label, "x": node.x, "y": node.y}
+            for node_id, node in topology.nodes.items() if node_id not in selected
+        }
+        links = list(topology.links.values())
+        topology.nodes = {node_id: node for node_id, node in topology.nodes.items() if node_id in selected}
+        topology.links = {}
+        topology.reset_index()
+        self.finish(topology, links, outside)
+        
+        logger.info(f"Selected {len(selected)} nodes")
+        return topology
@@ -0,0 +1,308 @@
+"""
+Content hashes of topology elements and structural diffs between versions.
+
+Each node and link of a CML file is hashed from its canonical JSON form,
+the node configuration separately from its other fields. Elements are
+grouped into buckets by their ID and the buckets rolled up into section
+and root hashes, Merkle style: two versions with equal roots are equal,
+and otherwise only the buckets whose hashes differ are compared element
+by element.
+
+The element hashes of a file can be kept in a sidecar file next to it,
+reused while the file's size and modification time are unchanged.
+"""
+import os
+import json
+import hashlib
+import logging
+from collections import namedtuple
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_VERSION = 1
+
+# Suffix appended to a topology file's name for its sidecar
+SIDECAR_SUFFIX = ".hashes.json"
+
+# Buckets per section, addressed by a hash of the element ID
+BUCKETS = 256
+
+SECTIONS = ("nodes", "links")
+
+# Differences between two versions as sorted lists of topology fields and
+# element IDs. A node whose configuration alone changed is only listed in
+# configs_modified.
+TopologyDiff = namedtuple("TopologyDiff", [
+    "topology", "nodes_added", "nodes_removed", "nodes_modified", "configs_modified",
+    "links_added", "links_removed", "links_modified"
+])
+
+
+def _digest(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _canonical(value):
+    """Encode a parsed YAML value as canonical JSON."""
+    def normalize(item):
+        if isinstance(item, dict):
+            return {str(key): normalize(child) for key, child in item.items()}
+        if isinstance(item, (list, tuple)):
+            return [normalize(child) for child in item]
+        return item
+    return json.dumps(normalize(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _bucket(element_id):
+    return int.from_bytes(hashlib.blake2b(str(element_id).encode("utf-8"), digest_size=4).digest(), "big") % BUCKETS
+
+
+class TopologyHashes:
+    """
+    Content hashes of the topology fields, nodes and links of one version.
+    
+    Node hashes are (fields, configuration) pairs, link and topology field
+    hashes single digests. Bucket, section and root hashes are computed
+    from them when first needed.
+    """
+    
+    def __init__(self, topology=None, nodes=None, links=None):
+        """
+        Initialize the hashes.
+        
+        Args:
+            topology (dict): Topology field -> hash
+            nodes (dict): Node ID -> (fields hash, configuration hash)
+            links (dict): Link ID -> hash
+        """
+        self.topology = dict(topology or {})
+        self.elements = {"nodes": {}, "links": {}}
+        for node_id, node_hash in (nodes or {}).items():
+            self._put("nodes", node_id, tuple(node_hash))
+        for link_id, link_hash in (links or {}).items():
+            self._put("links", link_id, link_hash)
+        self._bucket_hashes = {}
+    
+    @classmethod
+    def from_elements(cls, elements):
+        """
+        Hash the elements of a topology.
+        
+        Args:
+            elements (iterable): (kind, ID, fields) tuples as yielded by
+                CMLStreamParser.iter_elements
+        
+        Returns:
+            TopologyHashes: The hashes
+        """
+        hashes = cls()
+        for kind, element_id, data in elements:
+            if kind == "topology":
+                hashes.topology[element_id] = _digest(_canonical(data))
+            elif kind == "node":
+                fields = {key: value for key, value in data.items() if key != "configuration"}
+                hashes._put("nodes", element_id, (
+                    _digest(_canonical(fields)), _digest(_canonical(data.get("configuration")))
+                ))
+            else:
+                hashes._put("links", element_id, _digest(_canonical(data)))
+        return hashes
+    
+    def _put(self, section, element_id, element_hash):
+        self.elements[section].setdefault(_bucket(element_id), {})[element_id] = element_hash
+    
+    def items(self, section):
+        """Yield the (ID, hash) pairs of a section."""
+        for bucket in self.elements[section].values():
+            yield from bucket.items()
+    
+    def count(self, section):
+        """Get the number of elements in a section."""
+        return sum(len(bucket) for bucket in self.elements[section].values())
+    
+    def bucket_hashes(self, section):
+        """
+        Get the hashes of the non-empty buckets of a section.
+        
+        Returns:
+            dict: Bucket number -> hash of its sorted elements
+        """
+        if section not in self._bucket_hashes:
+            self._bucket_hashes[section] = {
+                number: _digest(*(f"{element_id}={_canonical(bucket[element_id])}" for element_id in sorted(bucket)))
+                for number, bucket in self.elements[section].items()
+            }
+        return self._bucket_hashes[section]
+    
+    def section_hash(self, section):
+        """Get the hash of a whole section."""
+        buckets = self.bucket_hashes(section)
+        return _digest(section, *(f"{number}={buckets[number]}" for number in sorted(buckets)))
+    
+    @property
+    def root(self):
+        """Hash of the whole topology."""
+        fields = _digest(*(f"{key}={self.topology[key]}" for key in sorted(self.topology)))
+        return _digest(fields, *(self.section_hash(section) for section in SECTIONS))
+    
+    def diff(self, other):
+        """
+        Compare with a newer version.
+        
+        Only the buckets whose hashes differ are compared element by
+        element, so the work grows with the changes rather than the size.
+        
+        Args:
+            other (TopologyHashes): Hashes of the newer version
+        
+        Returns:
+            TopologyDiff: What changed from this version to other
+        """
+        topology = sorted(key for key in set(self.topology) | set(other.topology)
+                          if self.topology.get(key) != other.topology.get(key))
+        changes = {}
+        for section in SECTIONS:
+            added, removed, modified, configs = [], [], [], []
+            if self.section_hash(section) != other.section_hash(section):
+                old_buckets = self.bucket_hashes(section)
+                new_buckets = other.bucket_hashes(section)
+                for number in set(old_buckets) | set(new_buckets):
+                    if old_buckets.get(number) == new_buckets.get(number):
+                        continue
+                    old = self.elements[section].get(number, {})
+                    new = other.elements[section].get(number, {})
+                    added.extend(element_id for element_id in new if element_id not in old)
+                    removed.extend(element_id for element_id in old if element_id not in new)
+                    for element_id in old.keys() & new.keys():
+                        old_hash, new_hash = old[element_id], new[element_id]
+                        if old_hash == new_hash:
+                            continue
+                        if section == "nodes":
+                            if old_hash[1] != new_hash[1]:
+                                configs.append(element_id)
+                            if old_hash[0] != new_hash[0]:
+                                modified.append(element_id)
+                        else:
+                            modified.append(element_id)
+            changes[section] = (sorted(added), sorted(removed), sorted(modified), sorted(configs))
+        
+        return TopologyDiff(
+            topology=topology,
+            nodes_added=changes["nodes"][0],
+            nodes_removed=changes["nodes"][1],
+            nodes_modified=changes["nodes"][2],
+            configs_modified=changes["nodes"][3],
+            links_added=changes["links"][0],
+            links_removed=changes["links"][1],
+            links_modified=changes["links"][2]
+        )
+    
+    def save(self, path, source=None):
+        """
+        Write the hashes to a sidecar file.
+        
+        Args:
+            path (Path): Sidecar file to write
+            source (list): [size, mtime_ns] of the hashed file
+        """
+        data = {
+            "version": SIDECAR_VERSION,
+            "source": source,
+            "root": self.root,
+            "buckets": {section: self.bucket_hashes(section) for section in SECTIONS},
+            "topology": self.topology,
+            "nodes": {element_id: list(element_hash) for element_id, element_hash in self.items("nodes")},
+            "links": dict(self.items("links"))
+        }
+        tmp_file = Path(f"{path}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_file, path)
+    
+    @classmethod
+    def load(cls, path, source=None):
+        """
+        Read hashes from a sidecar file.
+        
+        Args:
+            path (Path): Sidecar file
+            source (list): [size, mtime_ns] the sidecar must have been
+                written for, or None to accept any
+        
+        Returns:
+            TopologyHashes: The hashes, or None if the sidecar is missing,
+            unreadable or stale
+        """
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable hash sidecar {path}: {str(e)}")
+            return None
+        if data.get("version") != SIDECAR_VERSION or (source is not None and data.get("source") != source):
+            return None
+        hashes = cls(data.get("topology"), data.get("nodes"), data.get("links"))
+        # Kept, so diffing two sidecars never rehashes their buckets
+        for section, buckets in (data.get("buckets") or {}).items():
+            hashes._bucket_hashes[section] = {int(number): bucket_hash for number, bucket_hash in buckets.items()}
+        return hashes
+    
+    def __repr__(self):
+        return f"TopologyHashes(nodes={self.count('nodes')}, links={self.count('links')})"
+
+
+def sidecar_path(file_path):
+    """Get the sidecar file of a topology file."""
+    file_path = Path(file_path)
+    return file_path.with_name(file_path.name + SIDECAR_SUFFIX)
+
+
+def hash_topology(file_path, parser, sidecar=True, progress=None):
+    """
+    Get the hashes of a CML file, from its sidecar while it is fresh.
+    
+    A sidecar file can be given in place of the topology file, to diff
+    against a version that is no longer on disk.
+    
+    Args:
+        file_path (Path): CML file, or a sidecar written for one
+        parser (CMLStreamParser): Parser reading the file's elements
+        sidecar (bool): Reuse and write the sidecar of the file
+        progress (ProgressReporter): Optional progress reporter and
+            cancellation check
+    
+    Returns:
+        TopologyHashes: The hashes
+    
+    Raises:
+        ValueError: If the file cannot be parsed as valid CML YAML
+    """
+    file_path = Path(file_path)
+    if file_path.name.endswith(SIDECAR_SUFFIX):
+        hashes = TopologyHashes.load(file_path)
+        if hashes is None:
+            raise ValueError(f"Invalid hash sidecar: {file_path}")
+        return hashes
+    
+    stat = file_path.stat()
+    source = [stat.st_size, stat.st_mtime_ns]
+    if sidecar:
+        hashes = TopologyHashes.load(sidecar_path(file_path), source)
+        if hashes is not None:
+            logger.info(f"Reusing element hashes of {file_path} from its sidecar")
+            return hashes
+    
+    hashes = TopologyHashes.from_elements(parser.iter_elements(file_path, progress=progress))
+    if sidecar:
+        try:
+            hashes.save(sidecar_path(file_path), source)
+        except OSError as e:
+            logger.warning(f"Cannot write hash sidecar of {file_path}: {str(e)}")
+    return hashes
@@ -36,6 +36,16 @@ def validate_topology(topology):
             logger.error(f"Link {link_id} references non-existent node {link.node2_id}")
             raise ValueError(f"Invalid link {link_id}: Node {link.node2_id} not found")
     
+    # Structural checks use the topology's adjacency index when it has one
+    index = getattr(topology, 'index', None)
+    if index is not None:
+        for link_id in index.self_loops():
+            link = topology.links[link_id]
+            if link.interface1 == link.interface2:
+                logger.error(f"Link {link_id} connects interface {link.interface1} of node {link.node1_id} to itself")
+                raise ValueError(f"Invalid link {link_id}: Interface connected to itself")
+            logger.warning(f"Link {link_id} is a self-loop on node {link.node1_id}")
+    
     logger.info(f"Topology validation passed: {len(topology.nodes)} nodes, {len(topology.links)} links")
     return True
 
@@ -26,6 +26,7 @@ setup(
     ],
     packages=find_packages(),
     include_package_data=True,
+    package_data={"netbridge": ["schemas/*.json"]},
     python_requires=">=3.8",
     install_requires=[
         "click>=8.0.0",
@@ -33,6 +34,10 @@ setup(
         "jinja2>=3.0.0",
         "jsonschema>=4.0.0",
     ],
+    extras_require={
+        "zstd": ["zstandard>=0.15"],
+        "ijson": ["ijson>=3.1"],
+    },
     entry_points={
         "console_scripts": [
             "netbridge=netbridge.cli:main",
@@ -0,0 +1,103 @@
+"""
+Tests for the GNS3 appliance catalog.
+"""
+import json
+import pytest
+from netbridge.parsers.cml_parser import CMLParser
+from netbridge.utils import appliance_catalog
+from netbridge.utils.appliance_catalog import ApplianceCatalog
+from netbridge.utils.node_mappings import map_nodes, create_default_mapping
+from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+
+
+def write_appliance(directory, name, vendor, image, adapters=4, console_type="telnet"):
+    """Write a minimal .gns3a appliance file."""
+    path = directory / f"{name.lower().replace(' ', '-')}.gns3a"
+    path.write_text(json.dumps({
+        "name": name,
+        "vendor_name": vendor,
+        "product_name": name,
+        "category": "router",
+        "qemu": {"adapters": adapters, "console_type": console_type},
+        "images": [{"filename": image, "version": "1.0"}]
+    }))
+    return path
+
+
+class TestApplianceCatalog:
+    """Test cases for the ApplianceCatalog class."""
+    
+    @pytest.fixture
+    def appliance_dir(self, tmp_path):
+        """Directory with a few appliance files."""
+        directory = tmp_path / "appliances"
+        directory.mkdir()
+        write_appliance(directory, "Cisco IOSv", "Cisco", "vios-adventerprisek9-m.qcow2", adapters=16)
+        write_appliance(directory, "Juniper vMX", "Juniper", "vmx.qcow2", console_type="vnc")
+        (directory / "broken.gns3a").write_text("{not json")
+        return directory
+    
+    def test_load_and_index(self, appliance_dir):
+        """Test the catalog lookup tables."""
+        catalog = ApplianceCatalog(appliance_dir)
+        stats = catalog.load()
+        
+        assert stats == {"parsed": 3, "cached": 0, "removed": 0}
+        assert len(catalog) == 2
+        assert catalog.resolve("iosv")["name"] == "Cisco IOSv"
+        assert catalog.resolve("unknown", image="vmx.qcow2")["name"] == "Juniper vMX"
+        assert [entry["name"] for entry in catalog.by_vendor("juniper")] == ["Juniper vMX"]
+        assert [entry["name"] for entry in catalog.by_adapters(16)] == ["Cisco IOSv"]
+        assert [entry["name"] for entry in catalog.by_console_type("vnc")] == ["Juniper vMX"]
+    
+    def test_cache_only_reparses_changes(self, appliance_dir):
+        """Test that a second load reuses the cache for unchanged files."""
+        ApplianceCatalog(appliance_dir).load()
+        write_appliance(appliance_dir, "Arista vEOS", "Arista", "veos.qcow2")
+        
+        catalog = ApplianceCatalog(appliance_dir)
+        stats = catalog.load()
+        
+        assert stats == {"parsed": 1, "cached": 3, "removed": 0}
+        assert catalog.resolve("veos")["name"] == "Arista vEOS"
+    
+    def test_parallel_parse(self, tmp_path, monkeypatch):
+        """Test parsing appliance files on a process pool."""
+        monkeypatch.setattr(appliance_catalog, "PARALLEL_THRESHOLD", 2)
+        for index in range(8):
+            write_appliance(tmp_path, f"Router {index}", "Vendor", f"router{index}.qcow2")
+        
+        catalog = ApplianceCatalog(tmp_path, max_workers=2)
+        catalog.load()
+        
+        assert len(catalog) == 8
+        assert catalog.resolve("router7")["name"] == "Router 7"
+    
+    def test_map_nodes_uses_catalog(self, appliance_dir, tmp_path):
+        """Test that unmapped node types resolve against the catalog."""
+        source = tmp_path / "lab.yaml"
+        source.write_text(
+            "topology:\n"
+            "  nodes:\n"
+            "    r1:\n"
+            "      node_definition: vmx\n"
+            "    r2:\n"
+            "      node_definition: iosv\n"
+        )
+        topology = CMLParser().parse(source)
+        catalog = ApplianceCatalog(appliance_dir)
+        catalog.load()
+        
+        mappings = map_nodes(topology, {"iosv": DEFAULT_NODE_MAPPINGS["iosv"]}, catalog=catalog)
+        
+        assert mappings.for_node(topology.nodes["r1"]).gns3_template == "Juniper vMX"
+        assert mappings.for_node(topology.nodes["r1"]).console_type == "vnc"
+        assert mappings.for_node(topology.nodes["r2"]).gns3_template == "Cisco IOSv"
+    
+    def test_default_mapping_matches_defaults(self):
+        """Test that create_default_mapping no longer drifts from the defaults."""
+        mapping = create_default_mapping()
+        
+        assert mapping == {key: dict(value) for key, value in DEFAULT_NODE_MAPPINGS.items()}
+        mapping["iosv"]["gns3_template"] = "Changed"
+        assert DEFAULT_NODE_MAPPINGS["iosv"]["gns3_template"] == "Cisco IOSv"
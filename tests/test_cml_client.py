@@ -0,0 +1,155 @@
+"""
+Tests for the CML controller client, run against a local stub controller.
+"""
+import json
+import asyncio
+import hashlib
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from netbridge.converter import Converter
+from netbridge.clients.cml_client import CMLClient, pull_labs
+from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+
+SAMPLE = Path(__file__).parent / "fixtures" / "cml_samples" / "sample_topology.yaml"
+
+
+class StubCMLHandler(BaseHTTPRequestHandler):
+    """Minimal CML 2 API implementation."""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/api/v0/authenticate" and body["password"] == "secret":
+            self._reply(200, json.dumps("token-1").encode())
+        else:
+            self._reply(403, b'"forbidden"')
+    
+    def do_GET(self):
+        if self.headers.get("Authorization") != "Bearer token-1":
+            return self._reply(401, b'"unauthorized"')
+        
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        labs = self.server.labs
+        
+        if parts == ["api", "v0", "labs"]:
+            query = parse_qs(url.query)
+            offset, limit = int(query["offset"][0]), int(query["limit"][0])
+            with self.server.lock:
+                self.server.pages += 1
+            self._reply(200, json.dumps(sorted(labs)[offset:offset + limit]).encode())
+        elif len(parts) == 4 and parts[3] in labs:
+            self._reply(200, json.dumps({"id": parts[3], "lab_title": f"Lab {parts[3]}"}).encode())
+        elif len(parts) == 5 and parts[4] == "download" and parts[3] in labs:
+            content = labs[parts[3]].encode()
+            etag = '"' + hashlib.md5(content).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._reply(304, b"", {"ETag": etag})
+            with self.server.lock:
+                self.server.downloads += 1
+            self._reply(200, content, {"ETag": etag}, content_type="application/x-yaml")
+        else:
+            self._reply(404, b'"not found"')
+    
+    def _reply(self, status, data, headers=None, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestCMLClient:
+    """Test cases for pulling labs with CMLClient."""
+    
+    @pytest.fixture
+    def controller(self):
+        """Stub CML controller running on a background thread."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubCMLHandler)
+        server.lock = threading.Lock()
+        sample = SAMPLE.read_text()
+        server.labs = {f"lab{index:02d}": sample for index in range(7)}
+        server.connections = 0
+        server.pages = 0
+        server.downloads = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+    
+    def make_client(self, controller):
+        return CMLClient(f"http://127.0.0.1:{controller.server_port}", "admin", "secret",
+                         concurrency=3, page_size=3, backoff=0.01)
+    
+    def test_pull_all_labs(self, controller, tmp_path):
+        """Test paginated listing, concurrent download and conversion."""
+        client = self.make_client(controller)
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        
+        results = asyncio.run(pull_labs(client, converter, tmp_path))
+        
+        assert sorted(result["lab_id"] for result in results) == sorted(controller.labs)
+        assert all(result["status"] == "converted" for result in results)
+        assert all(result["node_count"] == 3 for result in results)
+        assert controller.pages == 3
+        assert client.pool.connections_opened <= 3
+        
+        project = json.loads(Path(results[0]["project_file"]).read_text())
+        assert len(project["topology"]["nodes"]) == 3
+    
+    def test_unchanged_labs_are_skipped(self, controller, tmp_path):
+        """Test that ETags skip labs that did not change."""
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        asyncio.run(pull_labs(self.make_client(controller), converter, tmp_path))
+        controller.labs["lab03"] = controller.labs["lab03"].replace("Router1", "Edge1")
+        
+        results = asyncio.run(pull_labs(self.make_client(controller), converter, tmp_path))
+        
+        statuses = {result["lab_id"]: result["status"] for result in results}
+        assert statuses.pop("lab03") == "converted"
+        assert set(statuses.values()) == {"unchanged"}
+        assert controller.downloads == len(controller.labs) + 1
+    
+    def test_selected_labs(self, controller, tmp_path):
+        """Test pulling only the requested labs."""
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        
+        results = asyncio.run(pull_labs(self.make_client(controller), converter, tmp_path,
+                                        lab_ids=["lab01", "missing"]))
+        
+        statuses = {result["lab_id"]: result["status"] for result in results}
+        assert statuses == {"lab01": "converted", "missing": "failed"}
+        assert controller.pages == 0
+    
+    def test_write_error_fails_one_lab(self, controller, tmp_path):
+        """Test that an output that cannot be written fails only its own lab."""
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        convert_string = converter.convert_string
+        
+        def convert_or_fail(content, output_dir, name=None, progress=None):
+            if "lab02" in str(output_dir):
+                raise OSError(28, "No space left on device")
+            return convert_string(content, output_dir, name=name, progress=progress)
+        
+        converter.convert_string = convert_or_fail
+        results = asyncio.run(pull_labs(self.make_client(controller), converter, tmp_path,
+                                        lab_ids=["lab01", "lab02"]))
+        
+        statuses = {result["lab_id"]: result["status"] for result in results}
+        assert statuses == {"lab01": "converted", "lab02": "failed"}
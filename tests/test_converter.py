@@ -2,12 +2,28 @@
 Tests for the converter module.
 """
 import os
+import bz2
+import gzip
+import json
+import lzma
 import pytest
 import tempfile
 import shutil
+import xml.etree.ElementTree as ET
+import uuid
+import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from netbridge.converter import Converter
+from netbridge.parsers.cml_parser import CMLParser
+from netbridge.parsers.fabric_parser import FabricParser
+from netbridge.generators.gns3_generator import GNS3Generator
+from netbridge.utils.node_mappings import map_nodes
+from netbridge.utils.appliance_catalog import ApplianceCatalog
 from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+from netbridge.utils.compression import open_input
+from netbridge.utils.progress import ProgressReporter, CancellationToken, ConversionCancelled
+from netbridge.utils.limits import ParseLimits, ParseLimitExceeded
 
 
 class TestConverter:
@@ -48,4 +64,343 @@ class TestConverter:
         assert result["node_count"] > 0
         
         # Check if GNS3 project file was created
-        assert any(temp_output_dir.glob("*.gns3"))
\ No newline at end of file
+        assert any(temp_output_dir.glob("*.gns3"))
+    
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_unlabelled_integer_node_ids(self, temp_output_dir, streaming):
+        """Test that nodes without a label are named after their integer IDs."""
+        input_file = temp_output_dir / "numbered.yaml"
+        input_file.write_text(
+            "topology:\n  name: numbered\n  nodes:\n"
+            "    1: {node_definition: iosv, configuration: hostname r1}\n"
+            "    2: {node_definition: iosv}\n"
+            "  links:\n    l1: {node_a: 1, node_b: 2, interface_a: Gi0/0, interface_b: Gi0/0}\n"
+        )
+        
+        result = Converter(node_mappings=DEFAULT_NODE_MAPPINGS, streaming=streaming).convert(
+            input_file, temp_output_dir / "project"
+        )
+        
+        with open(result["project_file"]) as f:
+            project = json.load(f)
+        assert sorted(node["name"] for node in project["topology"]["nodes"]) == ["1", "2"]
+        assert result["link_count"] == 1
+    
+    def test_mappings_are_snapshots(self):
+        """Test that changing the caller's mappings does not affect a converter."""
+        node_mappings = dict(DEFAULT_NODE_MAPPINGS)
+        converter = Converter(node_mappings=node_mappings)
+        node_mappings["iosv"] = {"gns3_template": "Changed", "console_type": "vnc"}
+        
+        assert converter.node_mappings["iosv"]["gns3_template"] == "Cisco IOSv"
+        with pytest.raises(TypeError):
+            converter.node_mappings["iosv"] = {}
+    
+    def test_map_nodes_leaves_topology_untouched(self, sample_cml_file):
+        """Test that mapping results are kept apart from parsed nodes."""
+        topology = CMLParser().parse(sample_cml_file)
+        mappings = map_nodes(topology, DEFAULT_NODE_MAPPINGS)
+        
+        router = topology.nodes["router1"]
+        assert mappings.for_node(router).gns3_template == "Cisco IOSv"
+        assert not hasattr(router, "gns3_template")
+    
+    def test_concurrent_conversions(self, sample_cml_file, temp_output_dir):
+        """Test many conversions sharing one Converter through a thread pool."""
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        expected_templates = {
+            "Router 1": "Cisco IOSv",
+            "Router 2": "Cisco IOSv",
+            "Switch 1": "Cisco IOSvL2",
+        }
+        
+        def convert(index):
+            output_dir = temp_output_dir / f"project_{index}"
+            result = converter.convert(sample_cml_file, output_dir)
+            return output_dir, result
+        
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(convert, range(200)))
+        
+        project_ids = set()
+        for output_dir, result in results:
+            assert result["node_count"] == 3
+            assert result["link_count"] == 2
+            
+            with open(result["project_file"]) as f:
+                project = json.load(f)
+            project_ids.add(project["project_id"])
+            
+            nodes = project["topology"]["nodes"]
+            assert {node["name"]: node["type"] for node in nodes} == expected_templates
+            
+            node_ids = {node["id"] for node in nodes}
+            for link in project["topology"]["links"]:
+                assert {end["node_id"] for end in link["nodes"]} <= node_ids
+            
+            configs = sorted(p.name for p in (output_dir / "configs").iterdir())
+            assert len(configs) == 3
+            assert all(any(config.endswith(f"_{node_id}.cfg") for config in configs) for node_id in node_ids)
+        
+        assert len(project_ids) == len(results)
+    
+    @pytest.mark.parametrize("opener", [gzip.open, bz2.open, lzma.open])
+    def test_compressed_input_and_output(self, sample_cml_file, temp_output_dir, opener):
+        """Test converting compressed input into compressed output."""
+        compressed_file = temp_output_dir / "lab.yaml.z"
+        with opener(compressed_file, 'wb') as f:
+            f.write(sample_cml_file.read_bytes())
+        
+        for streaming in (False, True):
+            converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS, streaming=streaming,
+                                  compression="gzip")
+            output_dir = temp_output_dir / f"project_{streaming}"
+            result = converter.convert(compressed_file, output_dir)
+            
+            assert result["project_file"].endswith(".gns3.gz")
+            with open_input(result["project_file"]) as f:
+                project = json.load(f)
+            assert len(project["topology"]["nodes"]) == 3
+            configs = list((output_dir / "configs").iterdir())
+            assert configs and all(config.suffix == ".gz" for config in configs)
+    
+    def test_progress_events(self, sample_cml_file, temp_output_dir):
+        """Test that each stage reports its start, end and counters."""
+        events = []
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        
+        converter.convert(sample_cml_file, temp_output_dir / "project",
+                          progress=ProgressReporter(callback=events.append))
+        
+        stages = [(event.kind, event.stage) for event in events]
+        assert stages == [(kind, stage) for stage in ("parse", "validate", "map", "generate")
+                          for kind in ("stage_start", "stage_end")]
+        generate_end = events[-1]
+        assert (generate_end.nodes, generate_end.links) == (3, 2)
+    
+    def test_cancelled_conversion_leaves_no_output(self, sample_cml_file, temp_output_dir):
+        """Test that cancelling while generating leaves no output behind."""
+        token = CancellationToken()
+        
+        def cancel_on_generate(event):
+            if event.stage == "generate":
+                token.cancel()
+        
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        with pytest.raises(ConversionCancelled):
+            converter.convert(sample_cml_file, temp_output_dir / "project",
+                              progress=ProgressReporter(callback=cancel_on_generate, token=token))
+        
+        assert list(temp_output_dir.iterdir()) == []
+    
+    def test_parallel_generation_is_deterministic(self, temp_output_dir):
+        """Test that worker processes produce the same project as one process."""
+        spec = {"fabric": {
+            "roles": [
+                {"name": "spine", "count": 2, "node_definition": "iosv", "config": "hostname {{ hostname }}\r\n"},
+                {"name": "leaf", "count": 2500, "node_definition": "iosvl2"},
+            ],
+            "links": [{"from": "spine", "to": "leaf"}],
+        }}
+        topology = FabricParser().expand(spec, default_name="fabric")
+        mappings = map_nodes(topology, DEFAULT_NODE_MAPPINGS)
+        project_id = "9b7bbd1e-3c31-4f4a-9cb8-7c2f0f3a8c11"
+        
+        results = []
+        for workers in (None, 4):
+            output_dir = temp_output_dir / f"workers_{workers}"
+            result = GNS3Generator().generate(topology, output_dir, project_id, mappings, workers=workers)
+            results.append((result, Path(result["project_file"]).read_text(), output_dir))
+        
+        (serial, serial_text, serial_dir), (parallel, parallel_text, parallel_dir) = results
+        assert (parallel["node_count"], parallel["link_count"]) == (2502, 5000)
+        assert parallel_text == serial_text
+        assert serial_text == json.dumps(json.loads(serial_text), indent=2)
+        
+        configs = sorted(path.name for path in (parallel_dir / "configs").iterdir())
+        assert configs == sorted(path.name for path in (serial_dir / "configs").iterdir())
+        assert (parallel_dir / "configs" / configs[0]).read_bytes() == b"hostname spine1\n"
+    
+    def test_store_matches_in_memory_conversion(self, temp_output_dir, monkeypatch):
+        """Test that a stored topology generates the same project and is reused."""
+        spec = {"fabric": {
+            "roles": [
+                {"name": "spine", "count": 2, "node_definition": "iosv", "config": "hostname {{ hostname }}"},
+                {"name": "leaf", "count": 1500, "node_definition": "iosvl2"},
+            ],
+            "links": [{"from": "spine", "to": "leaf"}],
+        }}
+        memory = FabricParser().expand(spec, default_name="fabric")
+        lab = temp_output_dir / "fabric.yaml"
+        with open(lab, "w") as f:
+            yaml.safe_dump({"topology": {
+                "name": "fabric",
+                "nodes": {node.id: {"label": node.label, "node_definition": node.node_type, "x": node.x, "y": node.y,
+                                    "configuration": node.configuration} for node in memory.nodes.values()},
+                "links": {link.id: {"node_a": link.node1_id, "interface_a": link.interface1,
+                                    "node_b": link.node2_id, "interface_b": link.interface2}
+                          for link in memory.links.values()},
+            }}, f)
+        
+        monkeypatch.setattr(uuid, "uuid4", lambda: uuid.UUID("9b7bbd1e-3c31-4f4a-9cb8-7c2f0f3a8c11"))
+        expected = Converter(streaming=True).convert(lab, temp_output_dir / "memory")
+        store = temp_output_dir / "fabric.db"
+        converter = Converter(streaming=True, store=store, workers=2)
+        result = converter.convert(lab, temp_output_dir / "stored")
+        
+        assert (result["node_count"], result["link_count"]) == (1502, 3000)
+        assert Path(result["project_file"]).read_text() == Path(expected["project_file"]).read_text()
+        
+        # A rerun on the unchanged file reads the store instead of parsing
+        monkeypatch.setattr(converter.cml_parser, "parse", None)
+        rerun = converter.convert(lab, temp_output_dir / "rerun")
+        assert Path(rerun["project_file"]).read_text() == Path(expected["project_file"]).read_text()
+    
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_concurrent_store_conversions(self, temp_output_dir, streaming):
+        """Test that threads sharing a store convert their own labs only."""
+        labs = []
+        for size in (40, 50, 60, 70):
+            lab = temp_output_dir / f"lab{size}.yaml"
+            nodes = {f"n{i}": {"label": f"n{i}", "node_definition": "iosv"} for i in range(size)}
+            links = {f"l{i}": {"node_a": f"n{i - 1}", "interface_a": "Gi0/1", "node_b": f"n{i}",
+                               "interface_b": "Gi0/0"} for i in range(1, size)}
+            lab.write_text(yaml.safe_dump({"topology": {"name": lab.stem, "nodes": nodes, "links": links}}))
+            labs.append((lab, size))
+        broken = temp_output_dir / "broken.yaml"
+        broken.write_text("topology:\n  nodes:\n    n0: {node_definition: iosv}\n  links: [unclosed\n")
+        converter = Converter(streaming=streaming, store=temp_output_dir / "shared.db")
+        
+        def convert(index):
+            lab, size = labs[index % len(labs)]
+            return size, converter.convert(lab, temp_output_dir / f"out{index}")
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(convert, range(16)))
+        
+        for size, result in results:
+            assert (result["node_count"], result["link_count"]) == (size, size - 1)
+        # A failed parse leaves the store usable for the next conversion
+        with pytest.raises(ValueError):
+            converter.convert(broken, temp_output_dir / "broken")
+        assert converter.convert(labs[0][0], temp_output_dir / "after")["node_count"] == 40
+    
+    def test_store_reuse_respects_limits(self, sample_cml_file, temp_output_dir):
+        """Test that a store built without limits is not reused under limits."""
+        store = temp_output_dir / "lab.db"
+        Converter(store=store).convert(sample_cml_file, temp_output_dir / "unlimited")
+        
+        with pytest.raises(ParseLimitExceeded):
+            Converter(store=store, limits=ParseLimits(max_nodes=1)).convert(sample_cml_file, temp_output_dir / "limited")
+    
+    def test_multi_target_conversion(self, sample_cml_file, temp_output_dir):
+        """Test that one conversion writes every requested target format."""
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS, targets=["gns3", "containerlab", "eve-ng"])
+        result = converter.convert(sample_cml_file, temp_output_dir / "labs")
+        
+        assert list(result["targets"]) == ["gns3", "containerlab", "eve-ng"]
+        for stats in result["targets"].values():
+            assert (stats["node_count"], stats["link_count"]) == (3, 2)
+            assert stats["seconds"] >= 0
+            assert Path(stats["project_file"]).exists()
+        
+        with open(result["targets"]["containerlab"]["project_file"]) as f:
+            clab = yaml.safe_load(f)
+        assert clab["topology"]["nodes"]["Router-1"]["kind"] == "cisco_vios"
+        assert clab["topology"]["links"][0]["endpoints"] == ["Router-1:eth1", "Switch-1:eth2"]
+        
+        lab = ET.parse(result["targets"]["eve-ng"]["project_file"]).getroot()
+        assert [node.get("template") for node in lab.iter("node")] == ["vios", "vios", "viosl2"]
+        assert len(lab.find("topology/networks")) == 2
+    
+    def test_unknown_target(self):
+        """Test that unknown target formats are rejected."""
+        with pytest.raises(ValueError, match="Unknown target"):
+            Converter(targets=["vmware"])
+    
+    def test_compression_needs_capable_targets(self):
+        """Test that compressing targets that cannot be compressed is rejected."""
+        with pytest.raises(ValueError, match="not supported for target containerlab, eve-ng"):
+            Converter(targets=["gns3", "containerlab", "eve-ng"], compression="gzip")
+    
+    @pytest.mark.parametrize("workers", [None, 2])
+    def test_bundle_conversion(self, sample_cml_file, temp_output_dir, workers):
+        """Test that each document of a bundle becomes its own project."""
+        lab = sample_cml_file.read_text()
+        bundle_file = temp_output_dir / "labs.yaml.gz"
+        with gzip.open(bundle_file, 'wt') as f:
+            f.write(f"---\n{lab}\n--- # empty\n# nothing here\n...\n---\n{lab}\n---\nnot: a lab\n")
+        
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        documents = sorted(converter.convert_bundle(bundle_file, temp_output_dir / "out", workers=workers))
+        
+        assert [document.index for document in documents] == [0, 1, 2]
+        for document in documents[:2]:
+            assert document.error is None
+            assert (document.result["node_count"], document.result["link_count"]) == (3, 2)
+            assert Path(document.result["project_file"]).parent == Path(document.output_dir)
+        assert [Path(document.output_dir).name for document in documents] == ["labs-1", "labs-2", "labs-3"]
+        assert documents[2].result is None and "Unknown file format" in documents[2].error
+    
+    def test_bundle_rejects_store(self, sample_cml_file, temp_output_dir):
+        """Test that bundles cannot be converted into one topology store."""
+        converter = Converter(store=temp_output_dir / "lab.db")
+        with pytest.raises(ValueError, match="topology store"):
+            list(converter.convert_bundle(sample_cml_file, temp_output_dir / "out"))
+    
+    def test_gns3_project_to_cml(self, temp_output_dir):
+        """Test that nodes of a project saved by GNS3 are recognized by template ID or image."""
+        (temp_output_dir / "appliances").mkdir()
+        (temp_output_dir / "appliances" / "cisco-csr1000v.gns3a").write_text(json.dumps({
+            "name": "Cisco CSR1000v", "vendor_name": "Cisco", "qemu": {"adapters": 4},
+            "images": [{"filename": "csr1000v-universalk9.17.03.04a.qcow2"}]
+        }))
+        catalog = ApplianceCatalog(temp_output_dir / "appliances")
+        catalog.load()
+        iosv_id, csr_id, other_id = (str(uuid.uuid4()) for _ in range(3))
+        project_file = temp_output_dir / "lab" / "lab.gns3"
+        project_file.parent.mkdir()
+        project_file.write_text(json.dumps({"name": "lab", "topology": {"nodes": [
+            {"node_id": "a", "name": "R1", "node_type": "qemu", "template_id": iosv_id,
+             "properties": {"hda_disk_image": "vios-adventerprisek9-m.vmdk"}},
+            {"node_id": "b", "name": "R2", "node_type": "qemu", "template_id": csr_id,
+             "properties": {"hda_disk_image": "csr1000v-universalk9.17.03.04a.qcow2"}},
+            {"node_id": "c", "name": "R3", "node_type": "qemu", "template_id": other_id,
+             "properties": {"hda_disk_image": "unknown.qcow2"}}
+        ], "links": []}}))
+        
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS, catalog=catalog,
+                              gns3_templates={"Cisco IOSv": iosv_id, "Other": other_id})
+        result = converter.convert_gns3(project_file, temp_output_dir / "lab.yaml")
+        
+        converted = CMLParser().parse(result["project_file"])
+        assert sorted((node.label, node.node_type) for node in converted.nodes.values()) == [
+            ("R1", "iosv"), ("R2", "csr1000v"), ("R3", "server")
+        ]
+    
+    def test_gns3_to_cml_round_trip(self, sample_cml_file, temp_output_dir):
+        """Test that a converted project converts back to the original lab."""
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS, compression="gzip")
+        project = converter.convert(sample_cml_file, temp_output_dir / "project")
+        
+        result = converter.convert_gns3(project["project_file"], temp_output_dir / "lab.yaml")
+        
+        assert result["project_file"].endswith("lab.yaml.gz")
+        assert (result["node_count"], result["link_count"]) == (3, 2)
+        original = CMLParser().parse(sample_cml_file)
+        converted = CMLParser().parse(result["project_file"])
+        assert converted.name == original.name
+        by_label = {node.label: node for node in converted.nodes.values()}
+        for node in original.nodes.values():
+            assert (by_label[node.label].node_type, by_label[node.label].x, by_label[node.label].y) == (
+                node.node_type, node.x, node.y
+            )
+            assert by_label[node.label].configuration == node.configuration
+        labels = {node_id: node.label for node_id, node in converted.nodes.items()}
+        assert sorted(
+            (labels[link.node1_id], link.interface1, labels[link.node2_id], link.interface2)
+            for link in converted.links.values()
+        ) == [
+            ("Router 1", "GigabitEthernet0/0", "Switch 1", "GigabitEthernet0/1"),
+            ("Router 2", "GigabitEthernet0/0", "Switch 1", "GigabitEthernet0/2")
+        ]
@@ -0,0 +1,163 @@
+"""
+Tests for the conversion daemon.
+"""
+import json
+import time
+import socket
+import threading
+import pytest
+from pathlib import Path
+from click.testing import CliRunner
+from netbridge import cli
+from netbridge.daemon import ConversionDaemon, WarmCache, request
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    """Socket path short enough for AF_UNIX."""
+    return tmp_path / "d.sock"
+
+
+@pytest.fixture
+def serve(socket_path):
+    """Start a daemon serving the given commands on a thread."""
+    daemons = []
+    
+    def start(commands, **kwargs):
+        daemon = ConversionDaemon(socket_path, commands, **kwargs)
+        thread = threading.Thread(target=daemon.serve, daemon=True)
+        thread.start()
+        for _ in range(200):
+            if request(socket_path, "ping") is not None:
+                break
+            time.sleep(0.01)
+        daemons.append((daemon, thread))
+        return daemon, thread
+    
+    yield start
+    for daemon, thread in daemons:
+        daemon.shutdown()
+        thread.join(5)
+
+
+class TestConversionDaemon:
+    """Test cases for the ConversionDaemon class and its client."""
+    
+    def test_no_daemon(self, socket_path):
+        """Test that requests without a daemon report it is unavailable."""
+        assert request(socket_path, "ping") is None
+    
+    def test_commands_and_progress(self, serve, socket_path):
+        """Test that commands reply and stream progress, and failures raise."""
+        def double(options, progress):
+            progress({"step": 1})
+            return options["value"] * 2
+        
+        def fail(options, progress):
+            raise RuntimeError("broken")
+        
+        serve({"double": double, "fail": fail})
+        events = []
+        
+        assert request(socket_path, "double", {"value": 21}, on_progress=events.append) == 42
+        assert events == [{"step": 1}]
+        with pytest.raises(ValueError, match="broken"):
+            request(socket_path, "fail")
+        with pytest.raises(ValueError, match="Unknown"):
+            request(socket_path, "missing")
+        # The readiness ping, three commands and this ping
+        assert request(socket_path, "ping")["requests"] == 5
+    
+    def test_version_mismatch(self, serve, socket_path):
+        """Test that a daemon of another version is not used."""
+        serve({})
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps({"version": "0.0.0", "command": "ping"}).encode() + b"\n")
+            reply = json.loads(sock.makefile("rb").readline())
+        
+        assert "unavailable" in reply
+    
+    def test_stale_socket_replaced(self, serve, socket_path):
+        """Test that a socket left behind by a dead daemon is taken over."""
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(str(socket_path))
+        stale.close()
+        
+        serve({})
+        
+        assert request(socket_path, "ping") is not None
+        with pytest.raises(ValueError, match="already listening"):
+            ConversionDaemon(socket_path, {}).serve()
+    
+    def test_idle_timeout(self, serve, socket_path):
+        """Test that an idle daemon stops and removes its socket."""
+        daemon, thread = serve({}, idle_timeout=0.2)
+        thread.join(5)
+        
+        assert not thread.is_alive()
+        assert not socket_path.exists()
+
+
+class TestWarmCache:
+    """Test cases for the WarmCache class."""
+    
+    def test_rebuilds_on_change(self, tmp_path):
+        """Test that values are reused until options or files change."""
+        mapping_file = tmp_path / "mapping.json"
+        mapping_file.write_text("{}")
+        builds = []
+        cache = WarmCache(lambda options: builds.append(options) or len(builds), size=2)
+        
+        assert cache.get({"a": 1}, [mapping_file]) == 1
+        assert cache.get({"a": 1}, [mapping_file]) == 1
+        assert cache.get({"a": 2}, [mapping_file]) == 2
+        mapping_file.write_text('{"iosv": {}}')
+        assert cache.get({"a": 1}, [mapping_file]) == 3
+        assert len(cache) == 2
+
+
+class TestDaemonForwarding:
+    """Test cases for forwarding the convert command to the daemon."""
+    
+    @pytest.fixture
+    def sample_cml_file(self):
+        """Sample CML file for testing."""
+        return Path(__file__).parent / "fixtures" / "cml_samples" / "sample_topology.yaml"
+    
+    def test_forwarded_conversion(self, serve, socket_path, sample_cml_file, tmp_path):
+        """Test that convert runs in the daemon and prints the same summary."""
+        daemon, _ = serve(cli._daemon_commands())
+        runner = CliRunner()
+        args = ["convert", "-i", str(sample_cml_file), "--daemon-socket", str(socket_path)]
+        
+        forwarded = runner.invoke(cli.cli, args + ["-o", str(tmp_path / "warm")])
+        local = runner.invoke(cli.cli, args + ["-o", str(tmp_path / "cold"), "--no-daemon"])
+        
+        assert forwarded.exit_code == 0, forwarded.output
+        assert forwarded.output.replace("warm", "cold") == local.output
+        assert daemon.requests == 2  # the readiness ping and the conversion
+        assert list((tmp_path / "warm").glob("*.gns3"))
+    
+    def test_forwarded_errors(self, serve, socket_path, sample_cml_file, tmp_path):
+        """Test that option and conversion errors come back from the daemon."""
+        serve(cli._daemon_commands())
+        args = ["convert", "-i", str(sample_cml_file), "-o", str(tmp_path / "out"), "--force",
+                "--daemon-socket", str(socket_path)]
+        
+        result = CliRunner().invoke(cli.cli, args + ["--limit", "nodes=1"])
+        
+        assert result.exit_code == 1
+        assert "Error during conversion" in result.output
+        assert "limit of 1 nodes" in result.output
+        result = CliRunner().invoke(cli.cli, args + ["--limit", "bogus=1"])
+        assert "Invalid parse limit" in result.output
+    
+    def test_falls_back_without_daemon(self, socket_path, sample_cml_file, tmp_path):
+        """Test that convert runs in process when no daemon is listening."""
+        result = CliRunner().invoke(cli.cli, [
+            "convert", "-i", str(sample_cml_file), "-o", str(tmp_path / "out"), "--daemon-socket", str(socket_path)
+        ])
+        
+        assert result.exit_code == 0, result.output
+        assert list((tmp_path / "out").glob("*.gns3"))
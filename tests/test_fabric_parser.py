@@ -0,0 +1,102 @@
+"""
+Tests for expanding fabric specs into topologies.
+"""
+import json
+import pytest
+import yaml
+from netbridge.converter import Converter
+from netbridge.parsers.fabric_parser import FabricParser
+from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+
+SPEC = {
+    "fabric": {
+        "name": "dc1",
+        "roles": [
+            {
+                "name": "spine",
+                "count": 2,
+                "node_definition": "iosv",
+                "template": "spine.j2",
+                "interface_format": "GigabitEthernet0/{port}",
+                "first_port": 1,
+                "vars": {"asn": 65000},
+            },
+            {
+                "name": "leaf",
+                "count": 3,
+                "node_definition": "iosvl2",
+                "config": "hostname {{ hostname }}{{ suffix | default('') }}\n",
+                "hostname": "leaf-{index:02d}",
+                "node_vars": {"leaf-02": {"suffix": "-x"}},
+            },
+        ],
+        "links": [{"from": "spine", "to": "leaf", "type": "full-mesh"}],
+    }
+}
+
+SPINE_TEMPLATE = """hostname {{ hostname }}
+router bgp {{ asn }}
+{% for interface in interfaces %}
+interface {{ interface.name }}
+ description to {{ interface.peer }} {{ interface.peer_interface }}
+{% endfor %}
+"""
+
+
+class TestFabricParser:
+    """Test cases for the FabricParser class."""
+    
+    @pytest.fixture
+    def spec_file(self, tmp_path):
+        """Fabric spec with a template file next to it."""
+        (tmp_path / "spine.j2").write_text(SPINE_TEMPLATE)
+        spec_file = tmp_path / "dc1.yaml"
+        spec_file.write_text(yaml.safe_dump(SPEC))
+        return spec_file
+    
+    def test_expand_fabric(self, spec_file):
+        """Test node, link and configuration generation."""
+        topology = FabricParser().parse(spec_file)
+        
+        assert topology.name == "dc1"
+        assert len(topology.nodes) == 5
+        assert len(topology.links) == 6
+        
+        spine = topology.nodes["n0"]
+        assert spine.label == "spine1"
+        assert "router bgp 65000" in spine.configuration
+        assert "interface GigabitEthernet0/3\n description to leaf-03 eth0" in spine.configuration
+        assert topology.nodes["n3"].configuration == "hostname leaf-02-x\n"
+        assert topology.nodes["n4"].configuration == "hostname leaf-03\n"
+        assert topology.index.degree("n2") == 2
+    
+    def test_undefined_variable(self, spec_file, tmp_path):
+        """Test that templates using undefined variables are rejected."""
+        (tmp_path / "spine.j2").write_text("router bgp {{ missing }}\n")
+        
+        with pytest.raises(ValueError, match="spine1"):
+            FabricParser().parse(spec_file)
+    
+    @pytest.mark.parametrize("fabric, message", [
+        ({"roles": [{"count": 2}]}, "role 1 has no 'name'"),
+        ({"roles": [{"name": "leaf"}, {"name": "leaf"}]}, "defined twice"),
+        ({"roles": [{"name": "leaf", "count": "many"}]}, "whole numbers"),
+        ({"roles": [{"name": "leaf"}], "links": [{"from": "leaf"}]}, "link 1 needs 'from' and 'to'"),
+        ({"roles": [{"name": "leaf"}], "links": [{"from": "leaf", "to": "spine"}]}, "unknown role 'spine'"),
+    ])
+    def test_invalid_spec(self, fabric, message):
+        """Test that malformed roles and links are reported as invalid specs."""
+        with pytest.raises(ValueError, match=message):
+            FabricParser().expand({"fabric": fabric}, default_name="bad")
+    
+    def test_convert_fabric(self, spec_file, tmp_path):
+        """Test converting an expanded fabric to a GNS3 project."""
+        topology = FabricParser().parse(spec_file)
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS)
+        
+        result = converter.convert_topology(topology, tmp_path / "project")
+        
+        with open(result["project_file"]) as f:
+            project = json.load(f)
+        assert len(project["topology"]["nodes"]) == 5
+        assert len(list((tmp_path / "project" / "configs").iterdir())) == 5
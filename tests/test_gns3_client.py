@@ -0,0 +1,188 @@
+"""
+Tests for the GNS3 server client, run against a local mock server.
+"""
+import gzip
+import json
+import time
+import uuid
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from netbridge.converter import Converter
+from netbridge.clients.gns3_client import GNS3Client, GNS3APIError
+from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+
+
+class MockGNS3Handler(BaseHTTPRequestHandler):
+    """Minimal GNS3 v2 API implementation."""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path == "/v2/templates":
+            self._reply(200, [
+                {"name": name, "template_id": template_id}
+                for name, template_id in self.server.templates.items()
+            ])
+        else:
+            self._reply(404, {"message": "not found"})
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parts = self.path.strip("/").split("/")
+        state = self.server
+        
+        if parts == ["v2", "projects"]:
+            self._reply(201, {"project_id": "project-1", "name": json.loads(body)["name"]})
+        elif parts[:3] == ["v2", "projects", "project-1"] and parts[3] == "templates":
+            payload = json.loads(body)
+            with state.lock:
+                # Throttle the first attempt for one node to exercise retries
+                if payload["name"] == "Router 2" and not state.failed_once:
+                    state.failed_once = True
+                    return self._reply(429, {"message": "busy"})
+                node_id = str(uuid.uuid4())
+                state.nodes[node_id] = dict(payload, template_id=parts[4])
+                # Apply the request but fail the response, like a gateway timeout
+                if payload["name"] == state.fail_after_create:
+                    return self._reply(502, {"message": "bad gateway"})
+            self._reply(201, {"node_id": node_id, "name": payload["name"]})
+        elif parts[3:] == ["links"]:
+            ends = json.loads(body)["nodes"]
+            with state.lock:
+                if not all(end["node_id"] in state.nodes for end in ends):
+                    return self._reply(404, {"message": "node not found"})
+                state.links.append(ends)
+            self._reply(201, {"link_id": str(uuid.uuid4())})
+        elif parts[3] == "nodes" and parts[5] == "files":
+            with state.lock:
+                state.files[(parts[4], parts[6])] = body.decode()
+            self._reply(201, None)
+        else:
+            self._reply(404, {"message": "not found"})
+    
+    def do_DELETE(self):
+        if self.path == "/v2/projects/project-1" and self.server.deletable:
+            with self.server.lock:
+                self.server.deleted = True
+            self._reply(204, None)
+        else:
+            self._reply(409, {"message": "project is locked"})
+    
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestGNS3Client:
+    """Test cases for the GNS3Client class."""
+    
+    @pytest.fixture
+    def server(self):
+        """Mock GNS3 server running on a background thread."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), MockGNS3Handler)
+        server.lock = threading.Lock()
+        server.templates = {"Cisco IOSv": "tpl-iosv", "Cisco IOSvL2": "tpl-iosvl2"}
+        server.nodes = {}
+        server.links = []
+        server.files = {}
+        server.connections = 0
+        server.failed_once = False
+        server.fail_after_create = None
+        server.deletable = True
+        server.deleted = False
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+    
+    @pytest.fixture
+    def project_file(self, tmp_path):
+        """Project converted from the sample CML topology."""
+        sample = Path(__file__).parent / "fixtures" / "cml_samples" / "sample_topology.yaml"
+        result = Converter(node_mappings=DEFAULT_NODE_MAPPINGS).convert(sample, tmp_path / "project")
+        return result["project_file"]
+    
+    def test_push_project(self, server, project_file):
+        """Test pushing nodes, links and configurations."""
+        client = GNS3Client(f"http://127.0.0.1:{server.server_port}", concurrency=4, backoff=0.01)
+        try:
+            result = client.push_project(project_file)
+        finally:
+            client.close()
+        
+        assert result == {"project_id": "project-1", "node_count": 3, "link_count": 2, "config_count": 3}
+        assert sorted(node["name"] for node in server.nodes.values()) == ["Router 1", "Router 2", "Switch 1"]
+        assert {node["template_id"] for node in server.nodes.values()} == {"tpl-iosv", "tpl-iosvl2"}
+        assert server.failed_once
+        assert len(server.links) == 2
+        
+        configs = {server.nodes[node_id]["name"]: text for (node_id, _), text in server.files.items()}
+        assert configs["Router 1"].startswith("hostname Router1")
+        
+        # Requests share a bounded set of keep-alive connections
+        assert client.pool.connections_opened <= 4
+        assert server.connections == client.pool.connections_opened
+    
+    def test_missing_template(self, server, project_file):
+        """Test that nothing is created when the server lacks a template."""
+        del server.templates["Cisco IOSvL2"]
+        client = GNS3Client(f"http://127.0.0.1:{server.server_port}")
+        
+        with pytest.raises(GNS3APIError, match="Cisco IOSvL2"):
+            client.push_project(project_file)
+        assert server.nodes == {}
+    
+    def test_unreadable_config_fails_push(self, server, project_file):
+        """Test that a configuration that cannot be read fails the push."""
+        config_file = next((Path(project_file).parent / "configs").iterdir())
+        # A gzip stream cut off before its end
+        config_file.with_name(config_file.name + ".gz").write_bytes(gzip.compress(config_file.read_bytes())[:20])
+        config_file.unlink()
+        client = GNS3Client(f"http://127.0.0.1:{server.server_port}", backoff=0.01)
+        
+        with pytest.raises(GNS3APIError, match="1 requests failed"):
+            client.push_project(project_file)
+    
+    def test_created_node_not_sent_twice(self, server, project_file):
+        """Test that a node the server created is not created again after an error."""
+        server.fail_after_create = "Switch 1"
+        client = GNS3Client(f"http://127.0.0.1:{server.server_port}", backoff=0.01)
+        
+        with pytest.raises(GNS3APIError, match="1 requests failed"):
+            client.push_project(project_file)
+        assert [node["name"] for node in server.nodes.values()].count("Switch 1") == 1
+        assert server.deleted
+    
+    def test_failed_push_reports_project_left_behind(self, server, project_file):
+        """Test that the error names a partly pushed project that could not be deleted."""
+        server.fail_after_create = "Switch 1"
+        server.deletable = False
+        client = GNS3Client(f"http://127.0.0.1:{server.server_port}", backoff=0.01)
+        
+        with pytest.raises(GNS3APIError, match="project project-1 is left on the server"):
+            client.push_project(project_file)
+    
+    def test_rate_limit(self, server, project_file):
+        """Test that the rate limit spaces out requests."""
+        client = GNS3Client(f"http://127.0.0.1:{server.server_port}", rate_limit=5, backoff=0.01)
+        started = time.monotonic()
+        client.push_project(project_file)
+        
+        # 11 requests with a burst of 5 need at least 6 more tokens at 5/s
+        assert time.monotonic() - started >= 1.1
+        assert len(server.links) == 2
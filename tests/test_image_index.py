@@ -0,0 +1,88 @@
+"""
+Tests for the disk image index.
+"""
+import os
+import json
+import hashlib
+import pytest
+from netbridge.converter import Converter
+from netbridge.utils import image_index as image_index_module
+from netbridge.utils.image_index import ImageIndex, hash_file
+
+
+class TestImageIndex:
+    """Test cases for the ImageIndex class."""
+    
+    @pytest.fixture
+    def image_dir(self, tmp_path):
+        """Image directory laid out like a CML reference platform."""
+        image_dir = tmp_path / "images"
+        (image_dir / "iosv-159-3-m3").mkdir(parents=True)
+        (image_dir / "iosv-159-3-m3" / "vios-adventerprisek9-m.qcow2").write_bytes(b"iosv" * 1000)
+        (image_dir / "csr1000v.qcow2").write_bytes(b"csr" * 1000)
+        (image_dir / "notes.txt").write_text("not an image")
+        return image_dir
+    
+    def test_hash_file_chunks(self, tmp_path):
+        """Test that chunked mmap hashing matches a plain digest."""
+        data = os.urandom(10000)
+        path = tmp_path / "disk.img"
+        path.write_bytes(data)
+        
+        assert hash_file(path, chunk_size=4096) == hashlib.md5(data).hexdigest()
+        (tmp_path / "empty.img").write_bytes(b"")
+        assert hash_file(tmp_path / "empty.img") == hashlib.md5(b"").hexdigest()
+    
+    def test_scan_and_resolve(self, image_dir, tmp_path):
+        """Test resolving by file name, stem and image definition directory."""
+        index = ImageIndex(tmp_path / "index.json")
+        stats = index.scan([image_dir])
+        
+        assert stats == {"hashed": 2, "unchanged": 0, "removed": 0}
+        path, entry = index.resolve("iosv-159-3-m3")
+        assert path.endswith("vios-adventerprisek9-m.qcow2")
+        assert entry["md5"] == hashlib.md5(b"iosv" * 1000).hexdigest()
+        assert index.resolve("csr1000v")[0].endswith("csr1000v.qcow2")
+        assert index.resolve("CSR1000V.qcow2") is not None
+        assert index.resolve("missing") is None
+    
+    def test_rescan_only_hashes_changed_files(self, image_dir, tmp_path, monkeypatch):
+        """Test that a persisted index skips unchanged files on rescan."""
+        index_file = tmp_path / "index.json"
+        index = ImageIndex(index_file)
+        index.scan([image_dir])
+        index.save()
+        
+        hashed = []
+        real_hash_file = image_index_module.hash_file
+        monkeypatch.setattr(image_index_module, "hash_file", lambda p: hashed.append(p) or real_hash_file(p))
+        
+        changed = image_dir / "csr1000v.qcow2"
+        changed.write_bytes(b"csr17" * 1000)
+        (image_dir / "iosv-159-3-m3" / "vios-adventerprisek9-m.qcow2").unlink()
+        
+        reloaded = ImageIndex(index_file)
+        stats = reloaded.scan()
+        
+        assert stats == {"hashed": 1, "unchanged": 0, "removed": 1}
+        assert hashed == [str(changed.resolve())]
+    
+    def test_convert_sets_disk_image(self, image_dir, tmp_path):
+        """Test that conversion writes hda_disk_image for resolved nodes."""
+        source = tmp_path / "lab.yaml"
+        source.write_text(
+            "topology:\n"
+            "  nodes:\n"
+            "    r1:\n"
+            "      node_definition: iosv\n"
+            "      image_definition: iosv-159-3-m3\n"
+        )
+        index = ImageIndex()
+        index.scan([image_dir])
+        
+        result = Converter(image_index=index).convert(source, tmp_path / "out")
+        with open(result["project_file"]) as f:
+            node = json.load(f)["topology"]["nodes"][0]
+        
+        assert node["properties"]["hda_disk_image"] == "vios-adventerprisek9-m.qcow2"
+        assert node["properties"]["hda_disk_image_md5sum"] == hashlib.md5(b"iosv" * 1000).hexdigest()
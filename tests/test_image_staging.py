@@ -0,0 +1,112 @@
+"""
+Tests for staging disk images into projects.
+"""
+import os
+import errno
+import pytest
+from netbridge.converter import Converter
+from netbridge.utils import image_staging as image_staging_module
+from netbridge.utils.image_index import ImageIndex
+from netbridge.utils.image_staging import ImageStager
+
+
+class TestImageStager:
+    """Test cases for the ImageStager class."""
+    
+    @pytest.fixture
+    def index(self, tmp_path):
+        """Index of a small image library."""
+        image_dir = tmp_path / "library"
+        image_dir.mkdir()
+        (image_dir / "vios.qcow2").write_bytes(os.urandom(100000))
+        (image_dir / "csr1000v.qcow2").write_bytes(os.urandom(50000))
+        index = ImageIndex()
+        index.scan([image_dir])
+        return index
+    
+    def _images(self, index, *names):
+        return {name: index.resolve(name) for name in names}
+    
+    @pytest.mark.parametrize("method", ["hardlink", "copy_file_range", "sendfile", "copy"])
+    def test_methods(self, index, tmp_path, method):
+        """Test that every placement method stages identical images."""
+        if not hasattr(os, method) and method in ("copy_file_range", "sendfile"):
+            pytest.skip(f"os.{method} is not available")
+        images = self._images(index, "vios.qcow2", "csr1000v.qcow2")
+        
+        stats = ImageStager(methods=(method,)).stage(images, tmp_path / "images")
+        
+        assert stats[method] == 2
+        assert stats["bytes"] == (0 if method == "hardlink" else 150000)
+        for name, (path, entry) in images.items():
+            assert (tmp_path / "images" / name).read_bytes() == open(path, "rb").read()
+    
+    def test_falls_back_to_buffered_copy(self, index, tmp_path, monkeypatch):
+        """Test that unsupported methods fall through to the next one."""
+        def unsupported(*args):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        monkeypatch.setattr(image_staging_module.os, "link", unsupported)
+        monkeypatch.setattr(image_staging_module.os, "copy_file_range", unsupported, raising=False)
+        monkeypatch.setattr(image_staging_module.os, "sendfile", unsupported, raising=False)
+        
+        stats = ImageStager().stage(self._images(index, "vios.qcow2"), tmp_path / "images")
+        
+        assert stats["copy"] + stats["reflink"] == 1
+        assert len(os.listdir(tmp_path / "images")) == 2  # the image and the staging record
+    
+    def test_skips_staged_images(self, index, tmp_path):
+        """Test that matching images are not placed again."""
+        images = self._images(index, "vios.qcow2", "csr1000v.qcow2")
+        stager = ImageStager(methods=("copy",))
+        stager.stage(images, tmp_path / "images")
+        
+        # Same size, different content: replaced, not skipped
+        (tmp_path / "images" / "csr1000v.qcow2").write_bytes(b"x" * 50000)
+        stats = stager.stage(images, tmp_path / "images")
+        
+        assert (stats["skipped"], stats["copy"]) == (1, 1)
+        assert stager.stage(images, tmp_path / "images")["skipped"] == 2
+    
+    def test_convert_stages_shared_image_once(self, index, tmp_path):
+        """Test that an image used by several nodes is staged once."""
+        source = tmp_path / "lab.yaml"
+        source.write_text(
+            "topology:\n"
+            "  nodes:\n"
+            "    r1: {node_definition: iosv, image_definition: vios}\n"
+            "    r2: {node_definition: iosv, image_definition: vios}\n"
+            "    r3: {node_definition: csr1000v, image_definition: missing}\n"
+        )
+        
+        result = Converter(image_index=index, image_stager=ImageStager()).convert(source, tmp_path / "out")
+        
+        assert sum(result["images"][method] for method in image_staging_module.METHODS) == 1
+        assert sorted(os.listdir(tmp_path / "out" / "images")) == [".netbridge-images.json", "vios.qcow2"]
+    
+    def test_reconvert_reuses_published_images(self, index, tmp_path):
+        """Test that images of the published project are linked, not placed again."""
+        source = tmp_path / "lab.yaml"
+        source.write_text("topology:\n  nodes:\n    r1: {node_definition: iosv, image_definition: vios}\n")
+        converter = Converter(image_index=index, image_stager=ImageStager(methods=("copy",)))
+        converter.convert(source, tmp_path / "out")
+        staged = os.stat(tmp_path / "out" / "images" / "vios.qcow2")
+        
+        result = converter.convert(source, tmp_path / "out")
+        
+        assert (result["images"]["skipped"], result["images"]["copy"]) == (1, 0)
+        assert os.stat(tmp_path / "out" / "images" / "vios.qcow2").st_ino == staged.st_ino
+    
+    def test_failed_staging_publishes_nothing(self, index, tmp_path, monkeypatch):
+        """Test that a project whose images cannot be staged is not published."""
+        source = tmp_path / "lab.yaml"
+        source.write_text("topology:\n  nodes:\n    r1: {node_definition: iosv, image_definition: vios}\n")
+        
+        def full(*args):
+            raise OSError(errno.ENOSPC, "No space left on device")
+        monkeypatch.setattr(ImageStager, "_place", full)
+        
+        with pytest.raises(ValueError, match="No space left"):
+            Converter(image_index=index, image_stager=ImageStager()).convert(source, tmp_path / "out")
+        assert not (tmp_path / "out").exists()
+        assert sorted(os.listdir(tmp_path)) == ["lab.yaml", "library"]
+
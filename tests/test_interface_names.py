@@ -0,0 +1,68 @@
+"""
+Tests for renaming interfaces in node configurations.
+"""
+from netbridge.models.cml_model import CMLTopology, CMLNode, CMLLink
+from netbridge.generators.gns3_generator import GNS3Generator
+from netbridge.utils.interface_names import format_interface, interface_renamer
+from netbridge.utils.node_mappings import map_nodes
+
+XR_CONFIG = """hostname xr1\r
+interface GigabitEthernet0/0/0/0\r
+ description uplink\r
+interface GigabitEthernet0/0/0/1.100\r
+ encapsulation dot1q 100\r
+interface GigabitEthernet0/0/0/10\r
+ shutdown\r
+router ospf 1
+ area 0
+  interface GigabitEthernet0/0/0/1
+"""
+
+
+class TestInterfaceNames:
+    """Test cases for interface renaming."""
+    
+    def test_format_interface(self):
+        """Test GNS3 style port name formats."""
+        assert format_interface("Ethernet{0}", 3) == "Ethernet3"
+        assert format_interface("eth{port1}", 0) == "eth1"
+        assert format_interface("Gi0/{0}", 0, first_name="Management0/0") == "Management0/0"
+        assert format_interface("Gi0/{0}", 2, first_name="Management0/0") == "Gi0/1"
+    
+    def test_renamer_matches_whole_names_in_one_pass(self):
+        """Test that names are not matched inside longer names or renamed twice."""
+        rename = interface_renamer({"Gi0/1": "Gi0/2", "Gi0/2": "Gi0/3"})
+        
+        assert rename("interface Gi0/1\ninterface Gi0/10\ninterface Gi0/1.5\n") == \
+            "interface Gi0/2\ninterface Gi0/10\ninterface Gi0/2.5\n"
+        assert rename("interface Gi0/2") == "interface Gi0/3"
+        assert interface_renamer({"Gi0/1": "Gi0/1"}) is None
+    
+    def test_generator_renames_linked_interfaces(self, tmp_path):
+        """Test that configurations follow the mapping's interface format."""
+        topology = CMLTopology(name="rename")
+        topology.add_node(CMLNode(id="xr1", label="xr1", node_type="iosxrv", configuration=XR_CONFIG))
+        topology.add_node(CMLNode(id="r2", label="r2", node_type="iosv", configuration="hostname r2\n"))
+        topology.add_link(CMLLink("l1", "xr1", "GigabitEthernet0/0/0/0", "r2", "GigabitEthernet0/0"))
+        topology.add_link(CMLLink("l2", "xr1", "GigabitEthernet0/0/0/1", "r2", "GigabitEthernet0/1"))
+        mappings = map_nodes(topology, {
+            "iosxrv": {"gns3_template": "Cisco XRd", "interface_format": "Ethernet{port1}"},
+            "iosv": {"gns3_template": "Cisco IOSv"},
+        })
+        
+        GNS3Generator().generate(topology, tmp_path, node_mappings=mappings)
+        
+        configs = {path.name.split("_")[0]: path.read_text() for path in (tmp_path / "configs").iterdir()}
+        assert configs["xr1"] == (
+            "hostname xr1\n"
+            "interface Ethernet1\n"
+            " description uplink\n"
+            "interface Ethernet2.100\n"
+            " encapsulation dot1q 100\n"
+            "interface GigabitEthernet0/0/0/10\n"
+            " shutdown\n"
+            "router ospf 1\n"
+            " area 0\n"
+            "  interface Ethernet2\n"
+        )
+        assert configs["r2"] == "hostname r2\n"
@@ -0,0 +1,115 @@
+"""
+Tests for the topology models.
+"""
+import pytest
+from netbridge.models.cml_model import CMLTopology, CMLNode, CMLLink
+from netbridge.models.topology_store import SQLiteTopology
+from netbridge.utils.validators import validate_topology
+
+
+class TestTopologyIndex:
+    """Test cases for the topology adjacency index."""
+    
+    @pytest.fixture
+    def topology(self):
+        """Small topology with a parallel link, a self-loop and two components."""
+        topology = CMLTopology(name="index")
+        for node_id in ("r1", "r2", "r3", "r4", "r5"):
+            topology.add_node(CMLNode(id=node_id))
+        topology.add_link(CMLLink("l1", "r1", "g0/0", "r2", "g0/0"))
+        topology.add_link(CMLLink("l2", "r2", "g0/1", "r1", "g0/1"))
+        topology.add_link(CMLLink("l3", "r2", "g0/2", "r3", "g0/0"))
+        topology.add_link(CMLLink("l4", "r3", "g0/1", "r3", "g0/2"))
+        topology.add_link(CMLLink("l5", "r4", "g0/0", "r5", "g0/0"))
+        return topology
+    
+    def test_queries(self, topology):
+        """Test neighbor, incident link and degree lookups."""
+        index = topology.index
+        
+        assert sorted(index.neighbors("r2")) == ["r1", "r3"]
+        assert index.incident_links("r1") == ["l1", "l2"]
+        assert index.degree("r2") == 3
+        assert index.degree("r3") == 3
+        assert index.parallel_links() == [["l1", "l2"]]
+        assert index.is_parallel("l2") and not index.is_parallel("l3")
+        assert index.self_loops() == ["l4"]
+        assert index.connected_components() == [{"r1", "r2", "r3"}, {"r4", "r5"}]
+    
+    def test_incremental_updates(self, topology):
+        """Test that adding nodes and links updates a built index."""
+        index = topology.index
+        topology.add_node(CMLNode(id="r6"))
+        topology.add_link(CMLLink("l6", "r5", "g0/1", "r6", "g0/0"))
+        # Replacing a link moves it to its new endpoints
+        topology.add_link(CMLLink("l2", "r2", "g0/1", "r4", "g0/1"))
+        
+        assert topology.index is index
+        assert sorted(index.neighbors("r5")) == ["r4", "r6"]
+        assert index.parallel_links() == []
+        assert index.neighbors("r1") == ["r2"]
+        assert index.connected_components() == [{"r1", "r2", "r3", "r4", "r5", "r6"}]
+    
+    def test_validator_rejects_interface_looped_to_itself(self, topology):
+        """Test that a link from an interface to itself is invalid."""
+        validate_topology(topology)
+        topology.add_link(CMLLink("l7", "r1", "g0/3", "r1", "g0/3"))
+        
+        with pytest.raises(ValueError, match="l7"):
+            validate_topology(topology)
+
+
+class TestSQLiteTopology:
+    """Test cases for the SQLite topology store."""
+    
+    @pytest.fixture
+    def topology(self, tmp_path):
+        """Stored copy of the TestTopologyIndex topology."""
+        topology = SQLiteTopology.create(tmp_path / "lab.db", name="index")
+        for node_id in ("r1", "r2", "r3", "r4", "r5"):
+            topology.add_node(CMLNode(id=node_id))
+        topology.add_link(CMLLink("l1", "r1", "g0/0", "r2", "g0/0"))
+        topology.add_link(CMLLink("l2", "r2", "g0/1", "r1", "g0/1"))
+        topology.add_link(CMLLink("l3", "r2", "g0/2", "r3", "g0/0"))
+        topology.add_link(CMLLink("l4", "r3", "g0/1", "r3", "g0/2"))
+        topology.add_link(CMLLink("l5", "r4", "g0/0", "r5", "g0/0"))
+        yield topology
+        topology.close()
+    
+    def test_queries(self, topology):
+        """Test that the stored index answers like the in-memory one."""
+        index = topology.index
+        
+        assert sorted(index.neighbors("r2")) == ["r1", "r3"]
+        assert index.incident_links("r1") == ["l1", "l2"]
+        assert index.incident_links("r3") == ["l3", "l4"]
+        assert index.degree("r2") == 3
+        assert index.degree("r3") == 3
+        assert index.parallel_links() == [["l1", "l2"]]
+        assert index.self_loops() == ["l4"]
+    
+    def test_nodes_round_trip(self, topology):
+        """Test that stored nodes keep their values and order."""
+        node = CMLNode(id=7, label="r7", node_type="iosv", x=1.5, y=-2, configuration="hostname r7",
+                       image_definition="iosv-159")
+        topology.add_node(node)
+        # Replacing a node keeps its position
+        topology.add_node(CMLNode(id="r2", label="core"))
+        
+        assert list(topology.nodes) == ["r1", "r2", "r3", "r4", "r5", 7]
+        assert vars(topology.nodes[7]) == vars(node)
+        assert "7" not in topology.nodes
+        assert [n.label for n in topology.nodes.values()[1:3]] == ["core", "r3"]
+        assert dict(topology.links.items())["l3"].interface2 == "g0/0"
+        validate_topology(topology)
+    
+    def test_open_checks_source(self, topology):
+        """Test that only finished stores of the same input are reopened."""
+        assert SQLiteTopology.open(topology.path, "lab.yaml") is None
+        topology.commit("lab.yaml")
+        
+        assert SQLiteTopology.open(topology.path, "other.yaml") is None
+        reopened = SQLiteTopology.open(topology.path, "lab.yaml")
+        assert reopened.name == "index"
+        assert len(reopened.links) == 5
+        reopened.close()
@@ -0,0 +1,413 @@
+"""
+Tests for the topology parsers.
+"""
+import json
+import yaml
+import pytest
+from pathlib import Path
+from netbridge.converter import Converter
+from netbridge.parsers.cml_parser import CMLParser
+from netbridge.parsers.cml_stream_parser import CMLStreamParser
+from netbridge.parsers.gns3_parser import GNS3Parser
+from netbridge.parsers.virl_parser import VIRLParser
+from netbridge.utils import json_stream
+from netbridge.utils.schemas import validate_document
+from netbridge.utils.selection import NodeSelection, CLOUD_NODE_TYPE
+from netbridge.utils.bundle import scan_documents, read_document
+from netbridge.utils.limits import ParseLimits, ParseLimitExceeded
+
+
+class TestCMLStreamParser:
+    """Test cases for the CMLStreamParser class."""
+    
+    @pytest.fixture
+    def sample_cml_file(self):
+        """Sample CML file for testing."""
+        return Path(__file__).parent / "fixtures" / "cml_samples" / "sample_topology.yaml"
+    
+    # Anchors defined outside the topology and merge keys in nodes and links
+    ANCHORED = """
+x-templates:
+  - &config "hostname r1"
+  - {base: &base {node_definition: iosv, x: 10, y: 20}}
+x-link: &link {interface_a: Gi0/0, interface_b: Gi0/0}
+topology:
+  name: anchored
+  nodes:
+    r1: {<<: *base, label: r1, configuration: *config}
+    r2:
+      <<: [{label: first, x: 1}, *base]
+      y: 30
+    r3: {<<: *base, <<: {x: 99}, label: r3}
+  links:
+    l1: {<<: *link, node_a: r1, node_b: r2}
+    l2: {<<: *link, node_a: r2, node_b: r3, interface_b: Gi0/1}
+"""
+    
+    # Integer node IDs, referenced by integer link ends
+    NUMBERED = """
+topology:
+  name: numbered
+  nodes:
+    1: {node_definition: iosv, label: r1}
+    2: {node_definition: iosv, label: r2}
+  links:
+    l1: {node_a: 1, node_b: 2, interface_a: Gi0/0, interface_b: Gi0/0}
+"""
+    
+    @pytest.mark.parametrize("document", ["sample", "anchored", "numbered"])
+    def test_matches_cml_parser(self, sample_cml_file, document, tmp_path):
+        """Test that streaming and regular parsing produce the same models."""
+        if document != "sample":
+            sample_cml_file = tmp_path / f"{document}.yaml"
+            sample_cml_file.write_text(getattr(self, document.upper()))
+        expected = CMLParser().parse(sample_cml_file)
+        topology = CMLStreamParser().parse(sample_cml_file)
+        
+        assert topology.name == expected.name
+        assert topology.nodes.keys() == expected.nodes.keys()
+        for node_id, node in topology.nodes.items():
+            assert vars(node) == vars(expected.nodes[node_id])
+        for link_id, link in topology.links.items():
+            assert vars(link) == vars(expected.links[link_id])
+    
+    def test_spills_large_configurations(self, sample_cml_file, tmp_path):
+        """Test that configurations above the threshold go to spill files."""
+        expected = CMLParser().parse(sample_cml_file)
+        topology = CMLStreamParser(spill_threshold=60).parse(sample_cml_file, spill_dir=tmp_path)
+        
+        spilled = [node for node in topology.nodes.values() if node.config_file]
+        assert spilled
+        for node in spilled:
+            assert node.configuration == ""
+            assert Path(node.config_file).read_text() == expected.nodes[node.id].configuration
+    
+    def test_requires_spill_dir(self, sample_cml_file):
+        """Test that spilling without a spill directory is rejected."""
+        with pytest.raises(ValueError):
+            CMLStreamParser(spill_threshold=10).parse(sample_cml_file)
+
+
+class TestSchemaValidation:
+    """Test cases for validating CML input against the bundled schema."""
+    
+    BAD_POSITION = """
+topology:
+  name: bad
+  nodes:
+    r1:
+      node_definition: iosv
+      x: left
+      y: 10
+  links: {}
+"""
+    
+    @pytest.mark.parametrize("parser_class", [CMLParser, CMLStreamParser])
+    def test_rejects_non_numeric_position(self, parser_class):
+        """Test that malformed node fields are reported by field."""
+        with pytest.raises(ValueError, match="node r1: field 'x'"):
+            parser_class().parse_string(self.BAD_POSITION)
+    
+    @pytest.mark.parametrize("parser_class", [CMLParser, CMLStreamParser])
+    def test_validation_can_be_skipped(self, parser_class):
+        """Test that trusted input can be parsed without validation."""
+        topology = parser_class(validate=False).parse_string(self.BAD_POSITION)
+        
+        assert topology.nodes["r1"].x == "left"
+    
+    def test_generated_project_matches_schema(self, tmp_path):
+        """Test that a converted project validates as a whole document."""
+        sample = Path(__file__).parent / "fixtures" / "cml_samples" / "sample_topology.yaml"
+        result = Converter().convert(sample, tmp_path / "project")
+        
+        with open(result["project_file"]) as f:
+            validate_document("gns3", json.load(f))
+
+
+class TestNodeSelection:
+    """Test cases for converting a selection of nodes."""
+    
+    # A chain r1 - r2 - r3 - r4 with a large configuration on r4
+    CHAIN = """
+topology:
+  name: chain
+  nodes:
+    r1: {label: edge-1, node_definition: iosv, x: 0, y: 0, configuration: hostname edge-1}
+    r2: {label: core-1, node_definition: csr1000v, x: 100, y: 0, configuration: hostname core-1}
+    r3: {label: core-2, node_definition: csr1000v, x: 200, y: 0, configuration: hostname core-2}
+    r4: {label: edge-2, node_definition: iosv, x: 300, y: 0, configuration: hostname edge-2 with a long configuration}
+  links:
+    l1: {node_a: r1, interface_a: Gi0/0, node_b: r2, interface_b: Gi0/0}
+    l2: {node_a: r2, interface_a: Gi0/1, node_b: r3, interface_b: Gi0/1}
+    l3: {node_a: r3, interface_a: Gi0/0, node_b: r4, interface_b: Gi0/0}
+"""
+    
+    @pytest.mark.parametrize("parser_class", [CMLParser, CMLStreamParser])
+    def test_selects_by_label(self, parser_class):
+        """Test that only matching nodes and links between them are kept."""
+        topology = parser_class().parse_string(self.CHAIN, selection=NodeSelection(["core-*"]))
+        
+        assert set(topology.nodes) == {"r2", "r3"}
+        assert set(topology.links) == {"l2"}
+    
+    @pytest.mark.parametrize("parser_class", [CMLParser, CMLStreamParser])
+    def test_expands_by_hops(self, parser_class):
+        """Test that the selection grows along links."""
+        selection = NodeSelection(["id:r1"], hops=2)
+        topology = parser_class().parse_string(self.CHAIN, selection=selection)
+        
+        assert set(topology.nodes) == {"r1", "r2", "r3"}
+        assert set(topology.links) == {"l1", "l2"}
+    
+    @pytest.mark.parametrize("parser_class", [CMLParser, CMLStreamParser])
+    def test_cut_links_end_on_clouds(self, parser_class):
+        """Test that links leaving the selection keep a Cloud stand-in."""
+        selection = NodeSelection(["type:csr*"], cut="cloud")
+        topology = parser_class().parse_string(self.CHAIN, selection=selection)
+        
+        assert set(topology.links) == {"l1", "l2", "l3"}
+        assert topology.nodes["r1"].node_type == CLOUD_NODE_TYPE
+        assert topology.nodes["r1"].label == "edge-1 (external)"
+        assert topology.nodes["r4"].configuration == ""
+    
+    def test_unselected_configurations_are_not_spilled(self, tmp_path):
+        """Test that the streaming parser only spills selected nodes."""
+        selection = NodeSelection(["id:r1"], hops=1)
+        topology = CMLStreamParser(spill_threshold=10).parse_string(
+            self.CHAIN, spill_dir=tmp_path, selection=selection
+        )
+        
+        assert set(topology.nodes) == {"r1", "r2"}
+        assert len(list(tmp_path.iterdir())) == 2
+    
+    def test_rejects_invalid_filter(self):
+        """Test that malformed attribute filters are reported."""
+        with pytest.raises(ValueError):
+            NodeSelection(["attr:role"])
+
+
+class TestBundleScan:
+    """Test cases for finding the documents of a YAML bundle."""
+    
+    def test_document_boundaries(self, tmp_path):
+        """Test that markers split documents and empty documents are skipped."""
+        bundle_file = tmp_path / "bundle.yaml"
+        bundle_file.write_text(
+            "lab: one\n"
+            "config: |\n  ---\n  --- not a marker\n"
+            "---\n# only a comment\n"
+            "--- \n...\n"
+            "---\nlab: two\n"
+            "---text: three\n"
+        )
+        
+        documents = [yaml.safe_load(read_document(bundle_file, *document))
+                     for document in scan_documents(bundle_file)]
+        
+        assert documents == [
+            {"lab": "one", "config": "---\n--- not a marker\n"},
+            {"lab": "two", "---text": "three"}
+        ]
+    
+    def test_empty_bundle(self, tmp_path):
+        """Test that an empty file holds no documents."""
+        bundle_file = tmp_path / "bundle.yaml"
+        bundle_file.write_text("")
+        
+        assert scan_documents(bundle_file) == []
+
+
+class TestGNS3Parser:
+    """Test cases for the GNS3Parser class."""
+    
+    @pytest.fixture
+    def gns3_project_file(self, tmp_path):
+        """Project file as written by GNS3, with a large drawing."""
+        project = {
+            "auto_close": True,
+            "name": "branch",
+            "project_id": "0d6e4b4c-5c4b-4f5e-9a3e-6f7b5d0c1a11",
+            "topology": {
+                "computes": [],
+                "drawings": [{"svg": "<svg>" + "x" * 300000 + "</svg>", "x": 0, "y": 0}],
+                "links": [{
+                    "link_id": "l-1",
+                    "nodes": [
+                        {"node_id": "r1", "adapter_number": 2, "port_number": 0},
+                        {"node_id": "sw", "adapter_number": 0, "port_number": 3}
+                    ]
+                }],
+                "nodes": [
+                    {"node_id": "r1", "name": "R1", "node_type": "qemu", "console_type": "telnet",
+                     "console": 5001, "x": -10.5, "y": 20, "properties": {"ram": 512}},
+                    {"node_id": "sw", "name": "SW", "node_type": "ethernet_switch", "x": 0, "y": 0}
+                ]
+            },
+            "type": "topology"
+        }
+        project_file = tmp_path / "branch.gns3"
+        project_file.write_text(json.dumps(project, indent=4))
+        return project_file
+    
+    @pytest.mark.parametrize("use_ijson", [True, False])
+    def test_reads_nodes_and_links(self, gns3_project_file, monkeypatch, use_ijson):
+        """Test that both JSON readers build the same project models."""
+        if use_ijson:
+            pytest.importorskip("ijson")
+        else:
+            monkeypatch.setattr(json_stream, "ijson", None)
+            monkeypatch.setattr(json_stream, "CHUNK_SIZE", 7)
+        
+        project = GNS3Parser().parse(gns3_project_file)
+        
+        assert (project.name, project.project_id) == ("branch", "0d6e4b4c-5c4b-4f5e-9a3e-6f7b5d0c1a11")
+        router = project.nodes["r1"]
+        assert (router.name, router.node_type, router.console, router.x, router.properties) == (
+            "R1", "qemu", 5001, -10, {"ram": 512}
+        )
+        link = project.links["l-1"]
+        assert (link.node1_id, link.adapter1, link.interface1) == ("r1", 2, 0)
+        assert (link.node2_id, link.adapter2, link.interface2) == ("sw", 0, 3)
+    
+    def test_invalid_project(self, tmp_path):
+        """Test that truncated and malformed projects are rejected."""
+        project_file = tmp_path / "broken.gns3"
+        project_file.write_text('{"name": "x", "topology": {"nodes": [{"node_id": "a"}, ')
+        with pytest.raises(ValueError, match="Error parsing GNS3 project file"):
+            GNS3Parser().parse(project_file)
+        
+        project_file.write_text('{"topology": {"links": [{"link_id": "l", "nodes": []}]}}')
+        with pytest.raises(ValueError, match="does not connect two nodes"):
+            GNS3Parser().parse(project_file)
+
+
+def _cml_document(node_count=2, link_count=1, config="hostname r"):
+    """Build a CML document of numbered nodes, all links joining the first two."""
+    lines = ["topology:", "  name: limits", "  nodes:"]
+    for i in range(node_count):
+        lines += [f"    n{i}:", f"      label: r{i}", "      node_definition: iosv",
+                  f"      configuration: {json.dumps(config)}"]
+    lines.append("  links:" if link_count else "  links: {}")
+    for i in range(link_count):
+        lines += [f"    l{i}:", "      node_a: n0", "      node_b: n1",
+                  "      interface_a: eth0", "      interface_b: eth0"]
+    return "\n".join(lines) + "\n"
+
+
+class TestParseLimits:
+    """Test cases for the parse limits enforced by the parsers."""
+    
+    CML_PARSERS = [CMLParser, CMLStreamParser]
+    
+    @pytest.mark.parametrize("parser_class", CML_PARSERS)
+    def test_within_limits(self, parser_class, tmp_path):
+        """Test that input within every limit parses as before."""
+        limits = ParseLimits(max_bytes=10000, max_depth=5, max_aliases=0, max_nodes=2, max_links=1,
+                             max_config_size=100, max_seconds=60)
+        cml_file = tmp_path / "lab.yaml"
+        cml_file.write_text(_cml_document())
+        
+        topology = parser_class(limits=limits).parse(cml_file)
+        
+        assert len(topology.nodes) == 2
+        assert len(topology.links) == 1
+    
+    @pytest.mark.parametrize("parser_class", CML_PARSERS)
+    @pytest.mark.parametrize("limits, content", [
+        (ParseLimits(max_nodes=2), _cml_document(node_count=3)),
+        (ParseLimits(max_links=1), _cml_document(link_count=2)),
+        (ParseLimits(max_config_size=50), _cml_document(config="x" * 51)),
+        (ParseLimits(max_bytes=100), _cml_document()),
+        (ParseLimits(max_depth=20), "topology:\n  notes: " + "[" * 30 + "]" * 30 + "\n"),
+    ])
+    def test_limit_exceeded(self, parser_class, limits, content, tmp_path):
+        """Test that input crossing a limit is rejected from a file and from a string."""
+        cml_file = tmp_path / "lab.yaml"
+        cml_file.write_text(content)
+        parser = parser_class(validate=False, limits=limits)
+        
+        with pytest.raises(ParseLimitExceeded):
+            parser.parse(cml_file)
+        with pytest.raises(ParseLimitExceeded):
+            parser.parse_string(content)
+    
+    @pytest.mark.parametrize("parser_class", CML_PARSERS)
+    def test_elements_counted_while_loading(self, parser_class):
+        """Test that excess nodes and links are rejected before the rest of the document is read."""
+        # The unclosed sequence would fail the parse if it were reached
+        nodes = _cml_document(node_count=3, link_count=0).replace("  links: {}\n", "") + "  notes: [unclosed\n"
+        links = _cml_document(link_count=3) + "  notes: [unclosed\n"
+        
+        with pytest.raises(ParseLimitExceeded, match="nodes"):
+            parser_class(limits=ParseLimits(max_nodes=2)).parse_string(nodes)
+        with pytest.raises(ParseLimitExceeded, match="links"):
+            parser_class(limits=ParseLimits(max_links=2)).parse_string(links)
+    
+    def test_aliased_nodes_counted(self):
+        """Test that nodes brought in through an alias are counted too."""
+        content = "spare: &spare {n0: {}, n1: {}, n2: {}}\ntopology:\n  nodes: *spare\n"
+        
+        with pytest.raises(ParseLimitExceeded, match="nodes"):
+            CMLParser(validate=False, limits=ParseLimits(max_nodes=2)).parse_string(content)
+    
+    @pytest.mark.parametrize("parser_class", CML_PARSERS)
+    def test_alias_bomb(self, parser_class):
+        """Test that nested aliases are rejected before they could be expanded."""
+        lines = ["a0: &a0 [lol, lol, lol, lol, lol, lol, lol, lol, lol]"]
+        for i in range(1, 9):
+            lines.append(f"a{i}: &a{i} [" + ", ".join([f"*a{i - 1}"] * 9) + "]")
+        content = "\n".join(lines) + "\ntopology:\n  name: bomb\n"
+        
+        with pytest.raises(ParseLimitExceeded, match="aliases"):
+            parser_class(limits=ParseLimits(max_aliases=20)).parse_string(content)
+    
+    @pytest.mark.parametrize("parser_class", CML_PARSERS)
+    def test_time_limit(self, parser_class, monkeypatch):
+        """Test that a parse running past its deadline is stopped."""
+        limits = ParseLimits(max_seconds=1)
+        clock = iter(range(0, 1000, 10))
+        monkeypatch.setattr("netbridge.utils.limits.time.monotonic", lambda: next(clock))
+        
+        with pytest.raises(ParseLimitExceeded, match="seconds"):
+            parser_class(limits=limits).parse_string(_cml_document(node_count=300, link_count=0))
+    
+    def test_virl_limits(self, tmp_path):
+        """Test that VIRL elements are counted as they are fed to the XML parser."""
+        devices = "".join(f'<node name="r{i}" type="SIMPLE"><config>{"x" * i}</config></node>' for i in range(3))
+        content = f'<topology xmlns="http://www.cisco.com/VIRL">{devices}</topology>'
+        virl_file = tmp_path / "lab.virl"
+        virl_file.write_text(content)
+        
+        assert len(VIRLParser(limits=ParseLimits(max_nodes=3, max_config_size=2)).parse(virl_file).nodes) == 3
+        with pytest.raises(ParseLimitExceeded, match="nodes"):
+            VIRLParser(limits=ParseLimits(max_nodes=2)).parse(virl_file)
+        with pytest.raises(ParseLimitExceeded, match="characters"):
+            VIRLParser(limits=ParseLimits(max_config_size=1)).parse_string(content)
+        with pytest.raises(ParseLimitExceeded, match="nested"):
+            VIRLParser(limits=ParseLimits(max_depth=2)).parse(virl_file)
+    
+    def test_virl_entities_rejected(self, tmp_path, monkeypatch):
+        """Test that document type declarations are rejected, even split between chunks."""
+        monkeypatch.setattr("netbridge.parsers.virl_parser.CHUNK_SIZE", 4)
+        content = ('<?xml version="1.0"?><!DOCTYPE lolz [<!ENTITY lol "lol">]>'
+                   '<topology><node name="&lol;"/></topology>')
+        virl_file = tmp_path / "lab.virl"
+        virl_file.write_text(content)
+        
+        with pytest.raises(ValueError, match="Document type"):
+            VIRLParser().parse(virl_file)
+        with pytest.raises(ValueError, match="Document type"):
+            VIRLParser().parse_string(content)
+    
+    def test_converter_limits(self, tmp_path):
+        """Test that the converter passes its limits to the parsers."""
+        cml_file = tmp_path / "lab.yaml"
+        cml_file.write_text(_cml_document(node_count=3))
+        
+        with pytest.raises(ParseLimitExceeded):
+            Converter(limits=ParseLimits(max_nodes=2)).convert(cml_file, tmp_path / "out")
+    
+    def test_invalid_limit(self):
+        """Test that limits cannot be negative."""
+        with pytest.raises(ValueError):
+            ParseLimits(max_nodes=-1)
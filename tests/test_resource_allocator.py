@@ -0,0 +1,128 @@
+"""
+Tests for console port and MAC address allocation.
+"""
+import json
+import pytest
+import multiprocessing
+from pathlib import Path
+from netbridge.converter import Converter
+from netbridge.utils.config import DEFAULT_NODE_MAPPINGS
+from netbridge.utils.resource_allocator import ResourceAllocator
+
+
+def _reserve_in_process(state_file, owner, queue):
+    reservation = ResourceAllocator(state_file, console_range=(5000, 5999)).reserve(owner, 50)
+    queue.put([reservation.console_port(i) for i in range(len(reservation))])
+
+
+class TestResourceAllocator:
+    """Test cases for the ResourceAllocator class."""
+    
+    @pytest.fixture
+    def state_file(self, tmp_path):
+        """Allocation state file."""
+        return tmp_path / "resources.json"
+    
+    def test_reservations_are_disjoint(self, state_file):
+        """Test that projects get distinct ports and MAC blocks."""
+        allocator = ResourceAllocator(state_file, console_range=(5000, 5099), mac_block=16)
+        reservations = allocator.reserve_many({"lab1": 30, "lab2": 40})
+        reservations["lab3"] = ResourceAllocator(state_file, console_range=(5000, 5099), mac_block=16).reserve(
+            "lab3", 30
+        )
+        
+        ports = [r.console_port(i) for r in reservations.values() for i in range(len(r))]
+        macs = [r.mac_address(i) for r in reservations.values() for i in range(len(r))]
+        assert sorted(ports) == list(range(5000, 5100))
+        assert len(set(macs)) == 100
+        assert reservations["lab1"].mac_address(0) == "02:4e:42:00:00:00"
+        assert reservations["lab1"].mac_address(1) == "02:4e:42:00:00:10"
+        
+        with pytest.raises(ValueError, match="Cannot reserve"):
+            allocator.reserve("lab4", 1)
+    
+    def test_release_and_reuse(self, state_file):
+        """Test that released ranges are merged back and handed out again."""
+        allocator = ResourceAllocator(state_file, console_range=(5000, 5009))
+        allocator.reserve_many({"a": 3, "b": 4, "c": 3})
+        
+        assert allocator.release("b") and not allocator.release("b")
+        assert allocator.release("a")
+        reservation = allocator.reserve("d", 7)
+        assert reservation.console == [(5000, 5007)]
+        assert set(allocator.reservations()) == {"c", "d"}
+    
+    def test_same_owner_is_stable(self, state_file):
+        """Test that reserving again for an owner keeps its resources until its size changes."""
+        allocator = ResourceAllocator(state_file)
+        first = allocator.reserve("lab", 5)
+        allocator.reserve("other", 5)
+        
+        assert allocator.reserve("lab", 5).console == first.console
+        resized = allocator.reserve("lab", 8)
+        assert len(resized) == 8
+        assert resized.console_port(0) == first.console_port(0)
+        assert resized.console == [(5000, 5005), (5010, 5013)]
+    
+    def test_concurrent_processes_never_collide(self, state_file):
+        """Test that processes sharing the state file get distinct ports."""
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        processes = [context.Process(target=_reserve_in_process, args=(state_file, f"lab{i}", queue))
+                     for i in range(6)]
+        for process in processes:
+            process.start()
+        ports = [port for _ in processes for port in queue.get(timeout=30)]
+        for process in processes:
+            process.join()
+        
+        assert len(ports) == len(set(ports)) == 300
+        assert len(json.loads(state_file.read_text())["owners"]) == 6
+    
+    def test_mismatched_ranges(self, state_file):
+        """Test that a state file is only used with the ranges it was created with."""
+        ResourceAllocator(state_file).reserve("lab", 1)
+        
+        with pytest.raises(ValueError, match="console_range"):
+            ResourceAllocator(state_file, console_range=(2000, 3000)).reserve("lab", 1)
+    
+    def test_converted_nodes_get_resources(self, state_file, tmp_path):
+        """Test that converted GNS3 nodes carry their reserved port and MAC address."""
+        sample_cml_file = Path(__file__).parent / "fixtures" / "cml_samples" / "sample_topology.yaml"
+        converter = Converter(node_mappings=DEFAULT_NODE_MAPPINGS, allocator=ResourceAllocator(state_file))
+        
+        result = converter.convert(sample_cml_file, tmp_path / "project")
+        
+        with open(result["project_file"]) as f:
+            nodes = json.load(f)["topology"]["nodes"]
+        assert [node["console"] for node in nodes] == [5000, 5001, 5002]
+        assert [node["properties"]["mac_address"] for node in nodes] == [
+            "02:4e:42:00:00:00", "02:4e:42:00:00:40", "02:4e:42:00:00:80"
+        ]
+        
+        result = converter.convert(sample_cml_file, tmp_path / "other")
+        with open(result["project_file"]) as f:
+            assert json.load(f)["topology"]["nodes"][0]["console"] == 5003
+    
+    def test_only_nodes_using_resources_get_them(self, state_file, tmp_path):
+        """Test that clouds and nodes without a console are not given unused resources."""
+        input_file = tmp_path / "lab.yaml"
+        input_file.write_text(
+            "topology:\n  name: lab\n  nodes:\n"
+            "    n1: {node_definition: external_connector, label: uplink}\n"
+            "    n2: {node_definition: headless, label: probe}\n"
+            "    n3: {node_definition: iosv, label: r1}\n"
+            "  links: {}\n"
+        )
+        mappings = dict(DEFAULT_NODE_MAPPINGS, headless={"gns3_template": "Linux", "console_type": "none"})
+        allocator = ResourceAllocator(state_file)
+        
+        result = Converter(node_mappings=mappings, allocator=allocator).convert(input_file, tmp_path / "project")
+        
+        with open(result["project_file"]) as f:
+            nodes = {node["name"]: node for node in json.load(f)["topology"]["nodes"]}
+        assert [nodes[name].get("console") for name in ("uplink", "probe", "r1")] == [None, None, 5000]
+        assert "mac_address" not in nodes["uplink"].get("properties", {})
+        assert nodes["probe"]["properties"]["mac_address"] == "02:4e:42:00:00:00"
+        assert nodes["r1"]["properties"]["mac_address"] == "02:4e:42:00:00:40"
+        assert len(allocator.reservations()[str((tmp_path / "project").resolve())]) == 2
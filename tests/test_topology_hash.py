@@ -0,0 +1,153 @@
+"""
+Tests for topology element hashes and structural diffs.
+"""
+import os
+import json
+import pytest
+from click.testing import CliRunner
+from netbridge import cli
+from netbridge.parsers.cml_stream_parser import CMLStreamParser
+from netbridge.utils.topology_hash import TopologyHashes, hash_topology, sidecar_path
+
+BASELINE = """
+topology:
+  name: lab
+  description: baseline
+  nodes:
+    r1: {label: r1, node_definition: iosv, x: 0, y: 0, configuration: hostname r1}
+    r2: {label: r2, node_definition: iosv, x: 100, y: 0, configuration: hostname r2}
+    r3: {label: r3, node_definition: iosv, x: 200, y: 0, interfaces: [{id: i0, label: Gi0/0}]}
+  links:
+    l1: {node_a: r1, interface_a: Gi0/0, node_b: r2, interface_b: Gi0/0}
+    l2: {node_a: r2, interface_a: Gi0/1, node_b: r3, interface_b: Gi0/0}
+"""
+
+CHANGED = """
+topology:
+  name: lab
+  description: changed
+  nodes:
+    r1: {label: r1, node_definition: iosv, x: 0, y: 0, configuration: hostname core-1}
+    r2: {label: r2, node_definition: iosv, x: 150, y: 0, configuration: hostname r2}
+    r4: {label: r4, node_definition: iosv, x: 300, y: 0}
+  links:
+    l1: {node_a: r1, interface_a: Gi0/0, node_b: r2, interface_b: Gi0/0}
+    l3: {node_a: r2, interface_a: Gi0/1, node_b: r4, interface_b: Gi0/0}
+"""
+
+
+@pytest.fixture
+def versions(tmp_path):
+    """Baseline and changed version of a lab."""
+    old_file = tmp_path / "old.yaml"
+    new_file = tmp_path / "new.yaml"
+    old_file.write_text(BASELINE)
+    new_file.write_text(CHANGED)
+    return old_file, new_file
+
+
+class TestTopologyHashes:
+    """Test cases for the TopologyHashes class."""
+    
+    def test_iter_elements_keeps_raw_fields(self, versions):
+        """Test that elements are read with every field, models or not."""
+        elements = list(CMLStreamParser().iter_elements(versions[0]))
+        
+        assert ("topology", "description", "baseline") in elements
+        assert ("node", "r3", {"label": "r3", "node_definition": "iosv", "x": 200, "y": 0,
+                               "interfaces": [{"id": "i0", "label": "Gi0/0"}]}) in elements
+        assert [element_id for kind, element_id, _ in elements if kind == "link"] == ["l1", "l2"]
+    
+    def test_diff(self, versions):
+        """Test that added, removed and modified elements are reported apart."""
+        parser = CMLStreamParser()
+        old, new = (hash_topology(path, parser, sidecar=False) for path in versions)
+        
+        changes = old.diff(new)
+        
+        assert changes.topology == ["description"]
+        assert (changes.nodes_added, changes.nodes_removed) == (["r4"], ["r3"])
+        assert changes.nodes_modified == ["r2"]
+        assert changes.configs_modified == ["r1"]
+        assert (changes.links_added, changes.links_removed, changes.links_modified) == (["l3"], ["l2"], [])
+    
+    def test_equal_versions(self, versions, tmp_path):
+        """Test that the same content hashes equal however it is written."""
+        reordered = tmp_path / "reordered.yaml"
+        reordered.write_text(
+            "topology:\n  nodes:\n"
+            "    r2: {y: 0, x: 100, configuration: hostname r2, node_definition: iosv, label: r2}\n"
+            "    r1: {label: r1, node_definition: iosv, x: 0, y: 0, configuration: hostname r1}\n"
+            "    r3: {label: r3, node_definition: iosv, x: 200, y: 0, interfaces: [{label: Gi0/0, id: i0}]}\n"
+            "  links:\n"
+            "    l2: {node_a: r2, interface_a: Gi0/1, node_b: r3, interface_b: Gi0/0}\n"
+            "    l1: {node_a: r1, interface_a: Gi0/0, node_b: r2, interface_b: Gi0/0}\n"
+            "  description: baseline\n  name: lab\n"
+        )
+        parser = CMLStreamParser()
+        
+        old = hash_topology(versions[0], parser, sidecar=False)
+        new = hash_topology(reordered, parser, sidecar=False)
+        
+        assert old.root == new.root
+        assert not any(old.diff(new))
+    
+    def test_sidecar_reused_until_changed(self, versions, monkeypatch):
+        """Test that a fresh sidecar skips rehashing and a stale one does not."""
+        old_file = versions[0]
+        first = hash_topology(old_file, CMLStreamParser())
+        assert sidecar_path(old_file).exists()
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("file was parsed again")
+        
+        parser = CMLStreamParser()
+        monkeypatch.setattr(parser, "iter_elements", fail)
+        assert hash_topology(old_file, parser).root == first.root
+        
+        old_file.write_text(CHANGED)
+        os.utime(old_file, ns=(0, 0))
+        monkeypatch.undo()
+        assert hash_topology(old_file, CMLStreamParser()).root != first.root
+    
+    def test_sidecar_round_trip(self, versions, tmp_path):
+        """Test that saved hashes diff the same as freshly computed ones."""
+        parser = CMLStreamParser()
+        old, new = (hash_topology(path, parser, sidecar=False) for path in versions)
+        old.save(tmp_path / "old.hashes.json")
+        
+        loaded = TopologyHashes.load(tmp_path / "old.hashes.json")
+        
+        assert loaded.root == old.root
+        assert loaded.diff(new) == old.diff(new)
+        assert TopologyHashes.load(tmp_path / "missing.hashes.json") is None
+
+
+class TestDiffCommand:
+    """Test cases for the diff command."""
+    
+    def test_report(self, versions):
+        """Test the printed summary and the exit code option."""
+        old_file, new_file = versions
+        
+        result = CliRunner().invoke(cli.cli, ["diff", "--old", str(old_file), "--new", str(new_file)])
+        
+        assert result.exit_code == 0, result.output
+        assert "Nodes: 1 added, 1 removed, 2 modified" in result.output
+        assert "  ~ r1 (configuration)" in result.output
+        assert "  ~ r2 (fields)" in result.output
+        assert "Links: 1 added, 1 removed, 0 modified" in result.output
+        
+        result = CliRunner().invoke(cli.cli, ["diff", "--old", str(sidecar_path(old_file)), "--new", str(new_file),
+                                              "--json", "--exit-code"])
+        assert result.exit_code == 1
+        assert json.loads(result.output)["nodes_added"] == ["r4"]
+    
+    def test_no_differences(self, versions):
+        """Test that identical versions are reported as such."""
+        result = CliRunner().invoke(cli.cli, ["diff", "--old", str(versions[0]), "--new", str(versions[0]),
+                                              "--no-sidecar", "--exit-code"])
+        
+        assert result.exit_code == 0
+        assert "No differences" in result.output
+        assert not sidecar_path(versions[0]).exists()